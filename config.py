@@ -8,6 +8,34 @@ TEST_CONFIG = {
     / "meetask0303测试.xlsx",
     "output_dir": Path(__file__).parent / "tests" / "test_results",
     "continue_from_last": True,
+    # 测试结果格式: xlsx 或 parquet，parquet 保留嵌套字段类型，可用
+    # python -m core.common.result_format to-excel 按需转换为Excel
+    "result_format": "xlsx",
+    "defer_token_count": False,  # 是否将token计数延迟到导出时批量计算
+    # conversation_info 解析结果的落盘缓存目录，为None时只缓存在内存中；
+    # 重跑时复用可设为 Path(__file__).parent / "tests" / "test_cache"
+    "conversation_info_cache_dir": None,
+    # 落盘缓存的版本号，extracted_fields 结构变化时修改，使旧的缓存记录失效
+    "conversation_info_cache_version": 1,
+    "meetask_max_turns": 5,  # MeetAsk单个用例最多对话轮数(含首轮)
+    "meetask_case_time_budget": 300,  # MeetAsk单个用例追问的总耗时预算(秒)
+    # AdsHub 方案结果导出方式: flat 每个广告组一行并冗余用例/请求/广告系列字段，
+    # normalized 按 cases/requests/campaigns/adgroups 分表导出并通过键关联
+    "adshub_export_mode": "flat",
+    "adshub_denormalized_view": True,  # normalized 模式合并结果时是否附加宽表视图
+    # ModelFactory 模型后端: pydantic 或 slots，slots 只生成带 __slots__ 的轻量记录类
+    "model_backend": "pydantic",
+    # 模板注册表缓存文件，为None时每次启动都读取全部模板
+    "model_registry_cache": Path(__file__).parent
+    / "tests"
+    / "test_cache"
+    / "model_registry.json",
+    "template_watch_interval": None,  # 模板热加载检查间隔(秒)，为None时不监听
+    # 测试结束时是否将连接池监控数据写入 output_dir，只在实际创建过连接池时写入
+    "dump_db_pool_stats": True,
+    # RAG评估时是否将共享上下文的claim按token预算打包为一次LLM请求
+    "rag_pack_claims": False,
+    "rag_max_prompt_tokens": 6000,  # 打包claim时单个prompt的token上限
 }
 
 # 数据库配置
@@ -29,3 +57,27 @@ DB_CONFIG = {
     "database": "ai_service",
     "charset": "utf8mb4",
 }
+
+# 数据库连接池配置，total_connections 为所有 xdist worker 共用的连接总预算
+DB_POOL_CONFIG = {
+    "total_connections": 48,  # 所有worker合计的最大连接数
+    "max_connections_per_worker": 10,  # 单个worker的最大连接数上限
+    # 每个worker的连接中分给异步连接池(AsyncDBPool)的比例，其余给同步连接池
+    "async_connection_ratio": 0.25,
+    "mincached": 1,  # 初始化时创建的空闲连接数
+    "maxcached": 5,  # 连接池最大空闲连接数
+    "maxshared": 0,  # 共享连接数，0表示连接不共享
+    "ping": 1,  # 取出连接时ping服务端确保连接可用
+    "blocking": True,  # 连接池满时是否阻塞等待
+}
+
+# 日志配置
+LOG_CONFIG = {
+    "use_queue": True,  # 在后台线程中格式化和写出日志，调用线程只负责入队
+    "max_message_chars": 5000,  # 单条日志最大字符数，0表示不截断
+    "compress": True,  # 轮转的日志文件压缩为 .gz
+    "max_bytes": 10 * 1024 * 1024,  # 单个日志文件最大大小
+    "backup_count": 10,  # 保留的日志文件数量
+    # 子日志记录器的采样比例，payload 记录完整的请求体和响应体
+    "sample_rates": {"payload": 1.0},
+}
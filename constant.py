@@ -1,12 +1,24 @@
+import os
+
 ### API_URL ##
 
 # pre_api
 # meetask_api_env = "https://n-pre-ai-service.meetsocial.cn/"
 # test_api
-MEETASK_URL = "https://o-test-ai-service.meetsocial.cn"
-AI_TURNING_URL = "http://ai-turing.data:8080"
-AI_ADSHUB_URL = "http://sino-ai-adshub.background:8080"
-OPENAI_URL = "http://o-test-aiadapter.meetsocial.cn/proxy/openai/v1/chat/completions"
+# 以下地址均可通过同名环境变量覆盖，例如指向本地的 scripts/stub_server.py
+MEETASK_URL = os.environ.get("MEETASK_URL", "https://o-test-ai-service.meetsocial.cn")
+AI_TURNING_URL = os.environ.get("AI_TURNING_URL", "http://ai-turing.data:8080")
+AI_ADSHUB_URL = os.environ.get("AI_ADSHUB_URL", "http://sino-ai-adshub.background:8080")
+AI_GATEWAY_URL = os.environ.get(
+    "AI_GATEWAY_URL", "https://test-ai-api-gateway.meetsocial.cn"
+)
+OPENAI_URL = os.environ.get(
+    "OPENAI_URL",
+    "http://o-test-aiadapter.meetsocial.cn/proxy/openai/v1/chat/completions",
+)
+
+# RAG 评估使用的 Deepseek key，由 rag_checker.build_evaluator 写入环境变量
+DEEPSEEK_API_KEY = "sk-aa65646ca63a4e1189c4bc71f24b4d26"
 
 ADSHUB_PRE_EC_AGENT_CODEDE = "PRE_AD_PLACEMENT"
 ADSHUB_PRE_APP_AGENT_CODEDE = "PRE_AD_PLACEMENT_APP_GAME"
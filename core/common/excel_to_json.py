@@ -1,8 +1,9 @@
-import pandas as pd
 import json
 from typing import Dict, List, Any
 import logging
 
+from core.common.result_format import read_results
+
 
 def excel_to_rag_json(
     excel_path: str,
@@ -12,10 +13,10 @@ def excel_to_rag_json(
     context_col: str = "all_source",
 ) -> str:
     """
-    将Excel文件转换为RAG评估所需的JSON格式
+    将Excel或Parquet结果文件转换为RAG评估所需的JSON格式
 
     参数:
-        excel_path: Excel文件路径
+        excel_path: Excel文件路径，.parquet 结果按列式格式读取
         query_col: 查询列名
         response_col: 响应列名
         gt_answer_col: 标准答案列名
@@ -25,13 +26,18 @@ def excel_to_rag_json(
         JSON字符串
     """
     try:
-        # 读取Excel文件
-        df = pd.read_excel(excel_path)
+        # 读取结果文件，Parquet中的上下文保留为列表，无需再解析JSON
+        df = read_results(excel_path)
 
         results = []
         for idx, row in df.iterrows():
             if context_col in df.columns:
-                context_data = json.loads(str(row[context_col]))
+                context_data = row[context_col]
+                if hasattr(context_data, "tolist"):
+                    # Parquet中的列表逐行读取时为numpy数组
+                    context_data = context_data.tolist()
+                if not isinstance(context_data, (list, dict)):
+                    context_data = json.loads(str(context_data))
 
             # 构建单个查询结果
             result = {
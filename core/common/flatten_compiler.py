@@ -0,0 +1,188 @@
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from core.common.json_to_excel import flatten_json, is_simple
+from core.model.factory import ModelFactory, factory
+from core.utils.logger import logger
+
+_MISSING = object()
+
+
+class _FlattenerCompiler:
+    """
+    将模型模板编译为专用的扁平化函数
+
+    生成的函数按模板字段顺序逐个取值并直接写入结果，不再逐层递归判断结构；
+    结果与 flatten_json 一致，模板之外的字段或与模板类型不符的值回退到 flatten_json。
+    """
+
+    def __init__(self, sep: str):
+        self.sep = sep
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {
+            "_MISSING": _MISSING,
+            "flatten_json": flatten_json,
+            "is_simple": is_simple,
+        }
+        self.counter = 0
+
+    def compile(self, template: Dict, parent_key: str = "") -> str:
+        """生成一个字典模板的扁平化函数，返回函数名"""
+        name = f"_flatten_{self.counter}"
+        self.counter += 1
+        known = f"{name}_known"
+        self.namespace[known] = frozenset(template)
+        parent = repr(parent_key)
+        sep = repr(self.sep)
+
+        body = ["    out = {}", "    matched = 0"]
+        for key, template_value in template.items():
+            new_key = f"{parent_key}{self.sep}{key}" if parent_key else key
+            fallback = f"out.update(flatten_json({{{key!r}: v}}, {parent}, {sep}))"
+            body += [
+                f"    v = obj.get({key!r}, _MISSING)",
+                "    if v is not _MISSING:",
+                "        matched += 1",
+            ]
+            if isinstance(template_value, dict) and template_value:
+                child = self.compile(template_value, new_key)
+                body += [
+                    "        if isinstance(v, dict):",
+                    f"            out.update({child}(v))",
+                    "        else:",
+                    f"            {fallback}",
+                ]
+            elif isinstance(template_value, list):
+                # 列表元素取模板中所有字典元素的字段并集
+                element: Dict = {}
+                for item in template_value:
+                    if isinstance(item, dict):
+                        element.update({k: item[k] for k in item if k not in element})
+                element_call = (
+                    f"{self.compile(element, new_key)}(sub) if isinstance(sub, dict) else "
+                    if element
+                    else ""
+                )
+                body += [
+                    "        if isinstance(v, list):",
+                    "            if is_simple(v):",
+                    f"                out[{key!r}] = ','.join([str(ele) for ele in v])",
+                    "            else:",
+                    f"                out[{key!r}] = [{element_call}"
+                    f"flatten_json(sub, {new_key!r}, {sep}) for sub in v]",
+                    "        else:",
+                    f"            {fallback}",
+                ]
+            else:
+                body += [
+                    "        if isinstance(v, (dict, list)):",
+                    f"            {fallback}",
+                    "        else:",
+                    f"            out[{new_key!r}] = v",
+                ]
+        # 模板之外的字段按原顺序走动态扁平化
+        body += [
+            "    if matched != len(obj):",
+            "        for k, v in obj.items():",
+            f"            if k not in {known}:",
+            f"                out.update(flatten_json({{k: v}}, {parent}, {sep}))",
+            "    return out",
+        ]
+        self.lines += [f"def {name}(obj):"] + body + [""]
+        return name
+
+    def build(self, template: Dict) -> Callable[[Dict], Dict]:
+        entry = self.compile(template)
+        source = "\n".join(self.lines)
+        exec(compile(source, f"<flattener:{entry}>", "exec"), self.namespace)
+        flattener = self.namespace[entry]
+        flattener.__source__ = source
+        return flattener
+
+
+def compile_flattener(template: Dict, sep: str = "_") -> Callable[[Dict], Dict]:
+    """
+    根据模板生成专用的扁平化函数
+
+    Args:
+        template: 字典模板，描述数据的字段和结构
+        sep: 键名分隔符
+
+    Returns:
+        与 flatten_json(obj, sep=sep) 结果一致、字段按模板顺序输出的函数
+    """
+    return _FlattenerCompiler(sep).build(template)
+
+
+def template_columns(template: Dict, parent_key: str = "", sep: str = "_") -> List[str]:
+    """按模板顺序列出扁平化后的固定列"""
+    columns = []
+    for key, value in template.items():
+        new_key = f"{parent_key}{sep}{key}" if parent_key else key
+        if isinstance(value, dict) and value:
+            columns += template_columns(value, new_key, sep)
+        elif isinstance(value, list):
+            columns.append(key)
+        else:
+            columns.append(new_key)
+    return columns
+
+
+_flatteners: Dict[Tuple[str, str], Callable[[Dict], Dict]] = {}
+_flatteners_lock = Lock()
+
+
+def get_flattener(model_name: str, sep: str = "_") -> Callable[[Dict], Dict]:
+    """获取模型对应的扁平化函数，每个模型只编译一次，模板不存在时返回 flatten_json"""
+    key = (model_name.lower(), sep)
+    flattener = _flatteners.get(key)
+    if flattener is None:
+        template = factory.get_template(model_name)
+        with _flatteners_lock:
+            flattener = _flatteners.get(key)
+            if flattener is None:
+                if template:
+                    flattener = compile_flattener(template, sep)
+                    logger.debug(f"已编译模型扁平化函数: {model_name}")
+                else:
+                    logger.warning(f"模型模板不存在，使用动态扁平化: {model_name}")
+                    flattener = partial(flatten_json, sep=sep)
+                _flatteners[key] = flattener
+    return flattener
+
+
+def _drop_flatteners(changed: List[str]) -> None:
+    """模板重新加载后丢弃对应模型已编译的扁平化函数"""
+    with _flatteners_lock:
+        for key in [k for k in _flatteners if k[0] in changed]:
+            _flatteners.pop(key)
+
+
+ModelFactory.add_reload_listener(_drop_flatteners)
+
+
+def flatten_records(
+    model_name: str, records: List[Dict], sep: str = "_"
+) -> pd.DataFrame:
+    """
+    使用模型的专用扁平化函数批量扁平化记录
+
+    Args:
+        model_name: 模型名称，对应 core/template/model 下的模板
+        records: 待扁平化的记录
+        sep: 键名分隔符
+
+    Returns:
+        DataFrame，模板字段按模板顺序固定在前，额外字段按出现顺序在后
+    """
+    flattener = get_flattener(model_name, sep)
+    rows = [flattener(record) for record in records]
+    columns = dict.fromkeys(template_columns(factory.get_template(model_name), sep=sep))
+    for row in rows:
+        for column in row:
+            if column not in columns:
+                columns[column] = None
+    return pd.DataFrame(rows, columns=list(columns))
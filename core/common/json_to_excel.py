@@ -1,4 +1,3 @@
-from copy import deepcopy
 import os
 import json
 import pandas as pd
@@ -57,53 +56,153 @@ def flatten_json(json_obj: Dict, parent_key: str = "", sep: str = "_") -> Dict:
     return items
 
 
-def flatten_dict_list_to_rows(handle_item: Dict, parent_item: List = None) -> str:
+class _Block:
+    """展开过程中的列式数据块，exploded 表示行来自列表展开，合并时按位置对齐而非重复"""
+
+    __slots__ = ("columns", "length", "exploded")
+
+    def __init__(self, columns: Dict[str, List[Any]], length: int, exploded: bool):
+        self.columns = columns
+        self.length = length
+        self.exploded = exploded
+
+
+def _stack_blocks(blocks: List[_Block]) -> _Block:
+    """纵向拼接列表元素展开得到的数据块，缺失的列补None"""
+    length = sum(block.length for block in blocks)
+    columns: Dict[str, List[Any]] = {}
+    offset = 0
+    for block in blocks:
+        for name, values in block.columns.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * offset
+            column.extend(values)
+        offset += block.length
+        for column in columns.values():
+            if len(column) < offset:
+                column.extend([None] * (offset - len(column)))
+    return _Block(columns, length, True)
+
+
+def _zip_blocks(blocks: List[_Block]) -> _Block:
+    """横向合并兄弟字段：列表展开的字段按下标对齐，较短的补None，非列表字段在每行重复"""
+    length = max(block.length for block in blocks)
+    columns: Dict[str, List[Any]] = {}
+    for block in blocks:
+        for name, values in block.columns.items():
+            if block.length == length:
+                columns[name] = values
+            elif not block.exploded and block.length == 1:
+                columns[name] = values * length
+            else:
+                columns[name] = values + [None] * (length - block.length)
+    return _Block(columns, length, any(block.exploded for block in blocks))
+
+
+def _product_blocks(blocks: List[_Block]) -> _Block:
+    """横向合并兄弟字段：各列表展开的字段做笛卡尔积"""
+    length = 1
+    for block in blocks:
+        length *= block.length
+    columns: Dict[str, List[Any]] = {}
+    inner = length
+    for block in blocks:
+        # 当前块之前的块为外层循环，之后的块为内层循环
+        inner //= block.length
+        outer = length // (block.length * inner)
+        for name, values in block.columns.items():
+            repeated = (
+                [v for v in values for _ in range(inner)] if inner > 1 else values
+            )
+            columns[name] = repeated * outer
+    return _Block(columns, length, any(block.exploded for block in blocks))
+
+
+def _explode(
+    value: Any,
+    path: str,
+    sep: str,
+    mode: str,
+    key: Optional[str] = None,
+    prefix_items: bool = True,
+) -> _Block:
+    if isinstance(value, dict):
+        blocks = [
+            _explode(sub, f"{path}{sep}{k}" if path else k, sep, mode, k, prefix_items)
+            for k, sub in value.items()
+        ]
+        blocks = [block for block in blocks if block.columns]
+        if not blocks:
+            return _Block({}, 1, False)
+        if len(blocks) == 1:
+            return blocks[0]
+        if mode == "cartesian":
+            return _product_blocks(blocks)
+        return _zip_blocks(blocks)
+    if isinstance(value, list):
+        if is_simple(value):
+            # 简单列表与 flatten_json 一致，以叶子键名合并为逗号分隔的字符串
+            name = path if key is None else key
+            return _Block({name: [",".join(str(ele) for ele in value)]}, 1, False)
+        # 已扁平化的输入中，列表元素的键已带有前缀，不再重复添加
+        item_path = path if prefix_items else ""
+        return _stack_blocks(
+            [_explode(item, item_path, sep, mode, None, prefix_items) for item in value]
+        )
+    return _Block({path: [value]}, 1, False)
+
+
+def explode_to_frame(
+    data: Union[Dict, List],
+    sep: str = "_",
+    mode: str = "zip",
+    prefix_items: bool = True,
+) -> pd.DataFrame:
     """
-    将字典中的列表字段转换为Excel的多行，其他字段在每行重复
+    将嵌套JSON展开为多行的DataFrame，一次遍历按列构建，不复制整行数据
+
+    列名与 flatten_json 一致：嵌套字典的键用sep连接为列名；元素为字典或列表的列表
+    展开为多行，任意层级的嵌套列表都会继续展开；简单列表以叶子键名作为列名，
+    合并为逗号分隔的字符串
 
     Args:
-        data: 包含列表字段的字典
-        output_path: 输出Excel文件路径
-        list_fields: 要转换为多行的列表字段，如果为None则自动检测所有列表
-        sheet_name: Excel工作表名称
+        data: JSON数据，字典或字典列表
+        sep: 列名分隔符
+        mode: 同一层级多个列表的合并方式：
+            - "zip": 按下标对齐，较短的列表补None（默认）
+            - "cartesian": 笛卡尔积
+        prefix_items: 是否为列表元素的键添加列表路径前缀，输入已经过
+            flatten_json 扁平化时传False
 
     Returns:
-        输出文件路径
+        展开后的DataFrame
     """
-    # 扁平化非列表字段
-    handle_item = handle_item
-    list_data = parent_item if parent_item else []
+    if mode not in ("zip", "cartesian"):
+        raise ValueError(f"不支持的展开方式: {mode}")
+    block = _explode(data, "", sep, mode, prefix_items=prefix_items)
+    return pd.DataFrame(block.columns, columns=list(block.columns))
 
-    # 如果未指定列表字段，则自动检测
-    list_fields = []
-    for key, value in handle_item.items():
-        if isinstance(value, list):
-            list_fields.append(key)
-
-    # 找到list_fields中最长的list
-    max_list_length = 0
-    for field in list_fields:
-        if field in handle_item and isinstance(handle_item[field], list):
-            max_list_length = max(max_list_length, len(handle_item[field]))
-
-    # 分离列表字段和非列表字段
-    for i in range(max_list_length):
-        row_data = deepcopy(handle_item)
-        for field in list_fields:
-            if field in row_data and isinstance(row_data[field], list):
-                index = list(row_data.keys()).index(field)
-                items = list(row_data.items())
-                try:
-                    value = row_data.pop(field)
-                    items.insert(index, (field, value[i]))
-                except IndexError:
-                    items.insert(index, (field, None))
-                finally:
-                    row_data = dict(items)
-                if is_simple(row_data):
-                    list_data.append(row_data)
-                else:
-                    flatten_dict_list_to_rows(row_data)
+
+def flatten_dict_list_to_rows(
+    handle_item: Dict, parent_item: List = None, mode: str = "zip"
+) -> List[Dict]:
+    """
+    将字典中的列表字段转换为多行，其他字段在每行重复
+
+    Args:
+        handle_item: 包含列表字段的字典，通常为 flatten_json 的输出，
+            列表元素的键已带有前缀
+        parent_item: 追加结果的已有行列表
+        mode: 多个列表的合并方式，见 explode_to_frame
+
+    Returns:
+        展开后的行列表
+    """
+    list_data = parent_item if parent_item is not None else []
+    list_data.extend(
+        explode_to_frame(handle_item, mode=mode, prefix_items=False).to_dict("records")
+    )
     return list_data
 
 
@@ -163,73 +262,93 @@ def analyze_json_structure(
     return paths
 
 
+def _list_paths(value: List, parent_path: str) -> set:
+    """收集列表下所有字典键的路径，与 analyze_json_structure 的规则一致"""
+    paths = set()
+    stack = [(value, parent_path)]
+    while stack:
+        current, path = stack.pop()
+        if isinstance(current, dict):
+            for key, sub in current.items():
+                sub_path = f"{path}.{key}"
+                paths.add(sub_path)
+                if isinstance(sub, (dict, list)):
+                    stack.append((sub, sub_path))
+        else:
+            stack.extend(
+                (item, path) for item in current if isinstance(item, (dict, list))
+            )
+    return paths
+
+
+def _fill_tree_row(
+    obj: Dict, parent_path: str, columns: Dict[str, List[Any]], index: int, size: int
+) -> None:
+    """
+    一次遍历填充一条记录的所有路径
+
+    字典路径的值为None；列表路径的值为列表本身，列表下的所有路径取该列表元素拼接的字符串
+    """
+    stack = [(obj, parent_path)]
+    while stack:
+        current, parent = stack.pop()
+        for key, value in current.items():
+            path = f"{parent}.{key}" if parent else key
+            column = columns.get(path)
+            if column is None:
+                column = columns[path] = [None] * size
+            if isinstance(value, dict):
+                stack.append((value, path))
+                continue
+            column[index] = value
+            if isinstance(value, list):
+                sub_paths = _list_paths(value, path)
+                if sub_paths:
+                    joined = ", ".join(str(x) for x in value)
+                    for sub_path in sub_paths:
+                        sub_column = columns.get(sub_path)
+                        if sub_column is None:
+                            sub_column = columns[sub_path] = [None] * size
+                        sub_column[index] = joined
+
+
 def json_to_tree_columns(data: Union[Dict, List]) -> pd.DataFrame:
     """
     将JSON数据转换为树状结构的DataFrame
 
+    每条记录只遍历一次，同时推断列和填充预分配的列数组。列顺序为第一条记录的
+    路径排序，之后记录新增的路径排序追加在后
+
     Args:
         data: JSON数据
 
     Returns:
         树状结构的DataFrame
     """
+    if isinstance(data, dict):
+        records = [data]
+    elif isinstance(data, list):
+        records = [item for item in data if isinstance(item, dict)]
+    else:
+        return None
+    if not records:
+        return pd.DataFrame()
 
-    def get_value_by_path(obj: Union[Dict, List], path: str) -> Any:
-        """获取指定路径的值"""
-        try:
-            current = obj
-            for part in path.split("."):
-                if isinstance(current, dict):
-                    current = current.get(part)
-                elif isinstance(current, list):
-                    # 如果是列表，返回所有元素组成的字符串
-                    return ", ".join(str(x) for x in current)
-                else:
-                    return None
-                if current is None:
-                    return None
-            return current if not isinstance(current, dict) else None
-        except:
-            return None
-
-    # 如果是列表类型的根节点，处理每个元素
-    if isinstance(data, list):
-        all_rows = []
-        for item in data:
-            if isinstance(item, dict):
-                # 获取当前元素的所有可能路径
-                paths = analyze_json_structure(item)
-                paths = sorted(list(paths))
-
-                # 获取当前元素的值
-                row = {path: get_value_by_path(item, path) for path in paths}
-                all_rows.append(row)
-
-        # 合并所有行的列
-        all_columns = set()
-        for row in all_rows:
-            all_columns.update(row.keys())
-
-        # 确保所有行都有相同的列
-        for row in all_rows:
-            for col in all_columns:
-                if col not in row:
-                    row[col] = None
-
-        return pd.DataFrame(all_rows)
-
-    # 如果是字典类型的根节点
-    elif isinstance(data, dict):
-        # 获取所有可能的路径
-        paths = analyze_json_structure(data)
-        paths = sorted(list(paths))
+    columns: Dict[str, List[Any]] = {}
+    first_paths: List[str] = []
+    for index, record in enumerate(records):
+        _fill_tree_row(record, "", columns, index, len(records))
+        if index == 0:
+            first_paths = sorted(columns)
 
-        # 创建数据行
-        row = {path: get_value_by_path(data, path) for path in paths}
-        return pd.DataFrame([row])
+    first = set(first_paths)
+    order = first_paths + sorted(path for path in columns if path not in first)
+    return pd.DataFrame({path: columns[path] for path in order}, columns=order)
 
 
-def json_to_excel(data, output_path, sheet_name="Sheet1", format_type="row"):
+def json_to_excel(
+    data, output_path, sheet_name="Sheet1", format_type="row", model=None
+):
     """
     将JSON数据转换为Excel文件
 
@@ -241,6 +360,7 @@ def json_to_excel(data, output_path, sheet_name="Sheet1", format_type="row"):
             - "row": 按行展开（默认）
             - "column": 按列展开
             - "tree": 树状结构展开
+        model: 模型名称，指定时"column"格式使用按模板预编译的扁平化函数
 
     Returns:
         输出文件路径
@@ -252,12 +372,16 @@ def json_to_excel(data, output_path, sheet_name="Sheet1", format_type="row"):
         else:
             df = json_to_tree_columns(data)
     else:
-        flat_data = flatten_json(data)
         if format_type == "column":
-            list_data = [flatten_dict_list_to_columns(flat_data)]
+            if model:
+                from core.common.flatten_compiler import get_flattener
+
+                flat_data = get_flattener(model)(data)
+            else:
+                flat_data = flatten_json(data)
+            df = pd.DataFrame([flatten_dict_list_to_columns(flat_data)])
         else:
-            list_data = flatten_dict_list_to_rows(flat_data)
-        df = pd.DataFrame(list_data)
+            df = explode_to_frame(data)
 
     # 创建输出目录（如果不存在）
     os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
@@ -265,53 +389,196 @@ def json_to_excel(data, output_path, sheet_name="Sheet1", format_type="row"):
     return output_path
 
 
-# 示例数据
-test_data = {
-    "result": [
-        {
-            "项目名称": "测试项目1",
-            "基本信息": {
-                "版本": "2.0",
-                "创建时间": "2024-01-01",
-                "标签": ["开发", "测试", "生产"],
-            },
-            "配置项": [
-                {
-                    "数据库": {
-                        "host": "localhost",
-                        "port": 3306,
-                        "参数": {"超时时间": 30, "最大连接数": 100},
+EXCEL_MAX_ROWS = 1048576  # Excel单个工作表的最大行数(含表头)
+
+
+def _element_rows(
+    item: Any, format_type: str, flattener: Optional[Any] = None, path: str = ""
+) -> List[Dict]:
+    """将顶层数组中的一个元素转换为一行或多行，path 为 "row" 格式下元素的列名前缀"""
+    if not isinstance(item, dict):
+        return []
+    if format_type == "tree":
+        columns: Dict[str, List[Any]] = {}
+        _fill_tree_row(item, "", columns, 0, 1)
+        return [{path: values[0] for path, values in sorted(columns.items())}]
+    if format_type == "column":
+        flat_data = flattener(item) if flattener else flatten_json(item)
+        return [flatten_dict_list_to_columns(flat_data)]
+    block = _explode(item, path, "_", "zip")
+    names = list(block.columns)
+    return [
+        dict(zip(names, values))
+        for values in zip(*(block.columns[name] for name in names))
+    ]
+
+
+def _cell_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def write_rows_streaming(
+    rows_factory,
+    output_path,
+    columns: Optional[List[str]] = None,
+    sheet_name: str = "Sheet1",
+    max_rows: int = EXCEL_MAX_ROWS,
+    sort_new_columns: bool = False,
+) -> str:
+    """
+    使用openpyxl只写模式逐行写入Excel，内存占用与行数无关
+
+    Args:
+        rows_factory: 无参函数，每次调用返回一个新的行迭代器
+        output_path: 输出Excel文件路径
+        columns: 列顺序，为None时先完整遍历一遍行推断所有列
+        sheet_name: 工作表名称，超过行数上限时依次新建 sheet_name_2、sheet_name_3...
+        max_rows: 单个工作表的最大行数(含表头)
+        sort_new_columns: 推断列时第一行之后新增的列是否排序，与树状展开的列顺序一致
+
+    Returns:
+        输出文件路径
+    """
+    from openpyxl import Workbook
+
+    if columns is None:
+        # 第一遍只收集列名，不保留行数据
+        seen: Dict[str, None] = {}
+        first_count = None
+        for row in rows_factory():
+            for key in row:
+                if key not in seen:
+                    seen[key] = None
+            if first_count is None:
+                first_count = len(seen)
+        columns = list(seen)
+        if sort_new_columns and first_count is not None:
+            columns = columns[:first_count] + sorted(columns[first_count:])
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_count = 0
+    sheet_rows = max_rows
+    for row in rows_factory():
+        if sheet_rows >= max_rows:
+            sheet_count += 1
+            title = sheet_name if sheet_count == 1 else f"{sheet_name}_{sheet_count}"
+            sheet = workbook.create_sheet(title=title)
+            sheet.append(columns)
+            sheet_rows = 1
+        sheet.append([_cell_value(row.get(column)) for column in columns])
+        sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet(title=sheet_name).append(columns)
+    workbook.save(output_path)
+    return output_path
+
+
+def json_to_excel_stream(
+    input_path,
+    output_path,
+    sheet_name: str = "Sheet1",
+    format_type: str = "tree",
+    prefix: str = "result.item",
+    model: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    max_rows: int = EXCEL_MAX_ROWS,
+) -> str:
+    """
+    流式将大型JSON文件转换为Excel，逐个读取顶层数组元素并立即写出
+
+    未指定columns时读取两遍文件：第一遍推断列，第二遍写入行；
+    内存占用只与单个元素大小有关，超过Excel行数上限时自动新建工作表
+
+    Args:
+        input_path: JSON文件路径
+        output_path: 输出Excel文件路径
+        sheet_name: 工作表名称
+        format_type: 元素展开方式，同 json_to_excel 的 "tree"/"column"/"row"
+        prefix: ijson路径，默认读取顶层 result 数组，顶层即数组时为 "item"
+        model: 模型名称，"column"格式下使用按模板预编译的扁平化函数
+        columns: 指定列顺序，跳过推断列的第一遍读取
+        max_rows: 单个工作表的最大行数(含表头)
+
+    Returns:
+        输出文件路径
+    """
+    import ijson
+
+    flattener = None
+    if model and format_type == "column":
+        from core.common.flatten_compiler import get_flattener
+
+        flattener = get_flattener(model)
+    # "row" 格式与 json_to_excel 一致，列名带上数组所在的键路径，例如 result_id
+    path = "_".join(key for key in prefix.split(".") if key != "item")
+
+    def rows_factory():
+        with open(input_path, "rb") as f:
+            for item in ijson.items(f, prefix, use_float=True):
+                yield from _element_rows(item, format_type, flattener, path)
+
+    return write_rows_streaming(
+        rows_factory,
+        output_path,
+        columns,
+        sheet_name=sheet_name,
+        max_rows=max_rows,
+        sort_new_columns=format_type == "tree",
+    )
+
+
+if __name__ == "__main__":
+    # 示例数据
+    test_data = {
+        "result": [
+            {
+                "项目名称": "测试项目1",
+                "基本信息": {
+                    "版本": "2.0",
+                    "创建时间": "2024-01-01",
+                    "标签": ["开发", "测试", "生产"],
+                },
+                "配置项": [
+                    {
+                        "数据库": {
+                            "host": "localhost",
+                            "port": 3306,
+                            "参数": {"超时时间": 30, "最大连接数": 100},
+                        },
+                        "缓存": ["Redis", "Memcached"],
                     },
-                    "缓存": ["Redis", "Memcached"],
+                    {
+                        "数据库": {
+                            "host": "localhost",
+                            "port": 3307,
+                            "参数": {"超时时间": 30, "最大连接数": 100},
+                        },
+                        "缓存": ["Redis", "Memcached"],
+                    },
+                ],
+            },
+            {
+                "项目名称": "测试项目2",
+                "基本信息": {
+                    "版本": "2.0",
+                    "创建时间": "2024-01-01",
+                    "标签": ["开发", "测试", "生产"],
                 },
-                {
+                "配置项": {
                     "数据库": {
                         "host": "localhost",
-                        "port": 3307,
+                        "port": 3306,
                         "参数": {"超时时间": 30, "最大连接数": 100},
                     },
                     "缓存": ["Redis", "Memcached"],
                 },
-            ],
-        },
-        {
-            "项目名称": "测试项目2",
-            "基本信息": {
-                "版本": "2.0",
-                "创建时间": "2024-01-01",
-                "标签": ["开发", "测试", "生产"],
-            },
-            "配置项": {
-                "数据库": {
-                    "host": "localhost",
-                    "port": 3306,
-                    "参数": {"超时时间": 30, "最大连接数": 100},
-                },
-                "缓存": ["Redis", "Memcached"],
             },
-        },
-    ]
-}
+        ]
+    }
 
-# 使用树状结构展开
-json_to_excel(test_data, "output.xlsx", format_type="tree")
+    # 使用树状结构展开
+    json_to_excel(test_data, "output.xlsx", format_type="tree")
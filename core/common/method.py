@@ -1,21 +1,19 @@
 import json
 from typing import Optional, Tuple
-import pandas as pd
 import time
-import tiktoken
+from core.common.tokenizer import TokenizerService, resolve_token_counts
 from core.utils.logger import logger
 from dataclasses import dataclass
 from functools import wraps
 
 
-def export_excel_result(data, path):
-    """
-    增量导出测试结果到Excel文件，保持列顺序不变
+def _to_frame(data):
+    """将导出行转换为DataFrame，字典和列表字段序列化为JSON字符串"""
+    import pandas as pd
+
+    # 批量计算延迟的token数
+    resolve_token_counts(data)
 
-    Args:
-        data: 新的测试数据
-        path: Excel文件路径
-    """
     # 处理JSON数据
     processed_data = []
     for item in data:
@@ -27,37 +25,55 @@ def export_excel_result(data, path):
                 processed_item[key] = value
         processed_data.append(processed_item)
 
-    # 将新数据转换为DataFrame
-    new_df = pd.DataFrame(processed_data)
+    return pd.DataFrame(processed_data)
 
-    # 如果文件已存在，读取现有数据
-    if path.exists():
-        try:
-            existing_df = pd.read_excel(path)
 
-            # 使用现有DataFrame的列顺序作为基准
-            base_columns = existing_df.columns.tolist()
+def _append_frame(existing_df, new_df):
+    """以现有DataFrame的列顺序为基准追加新数据，新列添加到末尾"""
+    import pandas as pd
+
+    # 使用现有DataFrame的列顺序作为基准
+    base_columns = existing_df.columns.tolist()
 
-            # 找出新DataFrame中的新列
-            new_columns = [col for col in new_df.columns if col not in base_columns]
+    # 找出新DataFrame中的新列
+    new_columns = [col for col in new_df.columns if col not in base_columns]
 
-            # 将新列添加到列列表末尾
-            all_columns = base_columns + new_columns
+    # 将新列添加到列列表末尾
+    all_columns = base_columns + new_columns
 
-            # 为缺失的列填充空值
-            for col in all_columns:
-                if col not in existing_df.columns:
-                    existing_df[col] = None
-                if col not in new_df.columns:
-                    new_df[col] = None
+    # 为缺失的列填充空值
+    for col in all_columns:
+        if col not in existing_df.columns:
+            existing_df[col] = None
+        if col not in new_df.columns:
+            new_df[col] = None
 
-            # 使用确定的列顺序
-            existing_df = existing_df[all_columns]
-            new_df = new_df[all_columns]
+    # 使用确定的列顺序
+    existing_df = existing_df[all_columns]
+    new_df = new_df[all_columns]
 
-            # 合并数据
-            df = pd.concat([existing_df, new_df], ignore_index=True)
+    # 合并数据
+    return pd.concat([existing_df, new_df], ignore_index=True)
 
+
+def export_excel_result(data, path):
+    """
+    增量导出测试结果到Excel文件，保持列顺序不变
+
+    Args:
+        data: 新的测试数据
+        path: Excel文件路径
+    """
+    import pandas as pd
+
+    # 将新数据转换为DataFrame
+    new_df = _to_frame(data)
+
+    # 如果文件已存在，读取现有数据
+    if path.exists():
+        try:
+            existing_df = pd.read_excel(path)
+            df = _append_frame(existing_df, new_df)
         except Exception as e:
             logger.warning(f"读取或处理现有Excel文件失败: {e}")
             df = new_df
@@ -69,14 +85,86 @@ def export_excel_result(data, path):
     logger.info(f"测试用例结果已增量导出到: {path}")
 
 
+def export_result(data, path):
+    """按结果文件后缀导出测试结果，.parquet 为列式存储目录，其余为Excel"""
+    if path.suffix == ".parquet":
+        from core.common.result_format import export_parquet_result
+
+        export_parquet_result(data, path)
+    else:
+        export_excel_result(data, path)
+
+
+def export_tables_result(tables, path):
+    """
+    增量导出规范化的多表测试结果，每张表一个工作表
+
+    Args:
+        tables: 表名 -> 行列表，例如 cases/requests/campaigns/adgroups
+        path: Excel文件路径
+    """
+    import pandas as pd
+
+    new_frames = {name: _to_frame(rows) for name, rows in tables.items() if rows}
+    if not new_frames:
+        return
+
+    sheets = {}
+    if path.exists():
+        try:
+            sheets = pd.read_excel(path, sheet_name=None)
+        except Exception as e:
+            logger.warning(f"读取现有Excel文件失败: {e}")
+
+    for name, new_df in new_frames.items():
+        existing_df = sheets.get(name)
+        sheets[name] = (
+            new_df if existing_df is None else _append_frame(existing_df, new_df)
+        )
+
+    with pd.ExcelWriter(path) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    logger.info(f"规范化测试结果已增量导出到: {path}")
+
+
+def denormalize_tables(sheets):
+    """
+    将规范化的 cases/requests/campaigns/adgroups 表按键关联为逐广告组一行的宽表
+
+    列顺序与非规范化导出一致：用例字段、request_*、campaign_*、adgroup_*；
+    没有生成广告组的用例保留一行，广告字段为空。
+
+    Args:
+        sheets: 表名 -> DataFrame
+
+    Returns:
+        DataFrame
+    """
+    import pandas as pd
+
+    def table(name, *keys):
+        df = sheets.get(name)
+        if df is None:
+            return pd.DataFrame(columns=list(keys))
+        return df
+
+    df = table("cases", "case_key")
+    df = df.merge(table("requests", "case_key"), on="case_key", how="left")
+    df = df.merge(
+        table("campaigns", "case_key", "campaign_key"), on="case_key", how="left"
+    )
+    df = df.merge(
+        table("adgroups", "campaign_key", "adgroup_key"),
+        on="campaign_key",
+        how="left",
+    )
+    return df.drop(columns=["case_key", "campaign_key", "adgroup_key"])
+
+
 def num_tokens_from_string(string, model="gpt-4-1106-preview"):
     """Returns the number of tokens in a text string."""
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
+    return TokenizerService.get_instance(model).count(string)
 
 
 def receive_stream_content(response):
@@ -0,0 +1,176 @@
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from core.template.prompt.prompt import rag_joint_check_prompt
+from core.utils.logger import logger
+
+Claim = Union[str, Sequence[str]]
+
+LABEL_PATTERN = re.compile(
+    r"^\s*(\d+)\s*[.、:：)]\s*(entailment|neutral|contradiction)\b"
+)
+BARE_LABEL_PATTERN = re.compile(
+    r"\b(entailment|neutral|contradiction)\b", re.IGNORECASE
+)
+
+
+@dataclass
+class ClaimCheckItem:
+    """一组待检查的claim及其共同的检索上下文"""
+
+    question: str
+    reference: str
+    claims: List[Claim]
+
+
+@dataclass
+class PackedPrompt:
+    """打包后的单个prompt，members记录每个claim对应的(item下标, claim下标)"""
+
+    prompt: str
+    members: List[Tuple[int, int]] = field(default_factory=list)
+    tokens: int = 0
+
+
+def format_claim(claim: Claim) -> str:
+    """与refchecker一致的claim文本格式"""
+    if isinstance(claim, (list, tuple)) and len(claim) == 3:
+        return f'("{claim[0]}", "{claim[1]}", "{claim[2]}")'
+    return str(claim)
+
+
+def parse_labels(text: Optional[str], claim_num: int) -> List[Optional[str]]:
+    """
+    将LLM返回的结构化结果拆分为逐条标签
+
+    优先按编号回填，编号缺失时按出现顺序回填；调用失败或未返回的标签为None，
+    不能当作Neutral，否则接口异常会被计入指标
+
+    Args:
+        text: LLM返回内容
+        claim_num: 该prompt中的claim数量
+
+    Returns:
+        长度为claim_num的标签列表
+    """
+    labels: List[Optional[str]] = [None] * claim_num
+    if text:
+        numbered = False
+        for line in text.splitlines():
+            match = LABEL_PATTERN.match(line.lower())
+            if match:
+                numbered = True
+                index = int(match.group(1)) - 1
+                if 0 <= index < claim_num and labels[index] is None:
+                    labels[index] = match.group(2).title()
+        if not numbered:
+            for index, label in enumerate(BARE_LABEL_PATTERN.findall(text)[:claim_num]):
+                labels[index] = label.title()
+    return labels
+
+
+class ClaimPacker:
+    """
+    按token预算打包claim检查请求
+
+    共享同一问题和检索上下文的claim合并进同一个prompt，直到达到token预算或
+    单个prompt的claim上限，从而减少调用次数和重复发送的上下文token
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        max_prompt_tokens: int = 6000,
+        max_claims_per_prompt: int = 20,
+        template: str = rag_joint_check_prompt,
+    ):
+        self.count_tokens = count_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_claims_per_prompt = max_claims_per_prompt
+        self.template = template
+
+    def _render(self, question: str, reference: str, claim_lines: List[str]) -> str:
+        prompt = self.template.replace("[QUESTION]", question or "")
+        prompt = prompt.replace("[REFERENCE]", reference)
+        return prompt.replace("[CLAIMS]", "\n".join(claim_lines))
+
+    def pack(self, items: Sequence[ClaimCheckItem]) -> List[PackedPrompt]:
+        """
+        将检查项打包为prompt列表
+
+        Args:
+            items: 检查项列表
+
+        Returns:
+            打包后的prompt列表
+        """
+        # 按(问题, 上下文)分组，相同上下文只发送一次
+        groups: Dict[Tuple[str, str], List[Tuple[int, int, str]]] = {}
+        for item_idx, item in enumerate(items):
+            key = (item.question or "", item.reference)
+            members = groups.setdefault(key, [])
+            for claim_idx, claim in enumerate(item.claims):
+                members.append((item_idx, claim_idx, format_claim(claim)))
+
+        packed: List[PackedPrompt] = []
+        for (question, reference), members in groups.items():
+            base_tokens = self.count_tokens(self._render(question, reference, []))
+            chunk: List[Tuple[int, int, str]] = []
+            chunk_tokens = base_tokens
+
+            def flush():
+                lines = [f"{i + 1}. {text}" for i, (_, _, text) in enumerate(chunk)]
+                packed.append(
+                    PackedPrompt(
+                        prompt=self._render(question, reference, lines),
+                        members=[
+                            (item_idx, claim_idx) for item_idx, claim_idx, _ in chunk
+                        ],
+                        tokens=chunk_tokens,
+                    )
+                )
+
+            for member in members:
+                # 编号前缀和换行按固定开销估算
+                claim_tokens = self.count_tokens(member[2]) + 4
+                over_budget = chunk_tokens + claim_tokens > self.max_prompt_tokens
+                if chunk and (over_budget or len(chunk) >= self.max_claims_per_prompt):
+                    flush()
+                    chunk, chunk_tokens = [], base_tokens
+                chunk.append(member)
+                chunk_tokens += claim_tokens
+            if chunk:
+                flush()
+
+        claim_total = sum(len(item.claims) for item in items)
+        logger.info(
+            f"claim打包完成: {claim_total} 条claim, {len(items)} 个检查项, "
+            f"打包为 {len(packed)} 个prompt"
+        )
+        return packed
+
+    def unpack(
+        self,
+        items: Sequence[ClaimCheckItem],
+        packed: Sequence[PackedPrompt],
+        responses: Sequence[Optional[str]],
+    ) -> List[List[Optional[str]]]:
+        """
+        将打包请求的返回结果拆回到每个检查项的每条claim，缺失的标签为None
+
+        Args:
+            items: 打包时的检查项列表
+            packed: pack返回的prompt列表
+            responses: 与packed一一对应的LLM返回内容
+
+        Returns:
+            每个检查项的逐条claim标签
+        """
+        labels = [[None] * len(item.claims) for item in items]
+        for prompt, response in zip(packed, responses):
+            for (item_idx, claim_idx), label in zip(
+                prompt.members, parse_labels(response, len(prompt.members))
+            ):
+                labels[item_idx][claim_idx] = label
+        return labels
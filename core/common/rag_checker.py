@@ -1,35 +1,152 @@
 import asyncio
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
 from ragchecker import RAGResults, RAGChecker
-from ragchecker.metrics import all_metrics
+from ragchecker.metrics import all_metrics, METRIC_GROUP_MAP, METRIC_REQUIREMENTS
+import numpy as np
+import pandas as pd
 from typing import List, Dict, Any, Optional, Tuple
-from litellm import completion
 import aiofiles
 
 from config import TEST_CONFIG
+from constant import DEEPSEEK_API_KEY
 from core.common.excel_to_json import excel_to_rag_json
+from core.common.method import num_tokens_from_string
+from core.common.prompt_packer import ClaimCheckItem, ClaimPacker
+from core.common.rag_metrics import (
+    METRIC_COLUMNS,
+    compute_rag_metrics,
+    select_for_llm_check,
+    summarize_rag_metrics,
+)
+from core.utils.logger import logger
 
-# 设置 Deepseek API key
-os.environ["DEEPSEEK_API_KEY"] = "sk-aa65646ca63a4e1189c4bc71f24b4d26"
+# 各检查类型对应的 (待检查claim字段, 参考内容字段, 是否合并多段上下文)
+CHECK_TYPE_SPECS = {
+    "answer2response": ("response", "gt_answer", True),
+    "response2answer": ("gt_answer", "response", True),
+    "retrieved2answer": ("gt_answer", "retrieved_context", False),
+    "retrieved2response": ("response", "retrieved_context", False),
+}
 
 
 class CustomRAGChecker(RAGChecker):
-    def __init__(self, custom_llm_func, **kwargs):
+    def __init__(
+        self,
+        custom_llm_func,
+        max_concurrency: int = 8,
+        pack_claims: bool = False,
+        max_prompt_tokens: int = 6000,
+        max_claims_per_prompt: int = 20,
+        **kwargs,
+    ):
+        # ragchecker 通过同步回调批量下发prompt，这里统一转到自定义异步函数
+        kwargs.setdefault("custom_llm_api_func", self._dispatch_prompts)
         super().__init__(**kwargs)
         self.custom_llm_func = custom_llm_func
+        self.max_concurrency = max_concurrency
+        self.packer = (
+            ClaimPacker(
+                count_tokens=num_tokens_from_string,
+                max_prompt_tokens=max_prompt_tokens,
+                max_claims_per_prompt=max_claims_per_prompt,
+            )
+            if pack_claims
+            else None
+        )
+
+    def check_claims(self, results: RAGResults, check_type="answer2response"):
+        """
+        检查claim，开启pack_claims时按token预算将共享上下文的claim打包发送
+
+        结果格式与RAGChecker.check_claims一致：合并上下文时为每条claim一个标签，
+        否则为每条claim对应每段检索上下文的标签列表。打包请求失败或返回不完整的结果
+        不写入标签，改由RAGChecker逐条重新检查
+        """
+        if self.packer is None:
+            return super().check_claims(results, check_type)
+        if check_type not in CHECK_TYPE_SPECS:
+            raise ValueError(f"Invalid check_type: {check_type}")
+
+        claim_field, reference_field, merge_psg = CHECK_TYPE_SPECS[check_type]
+        pending = [ret for ret in results.results if getattr(ret, check_type) is None]
+        if not pending:
+            return
+        self.extract_claims(pending, extract_type=claim_field)
+
+        items: List[ClaimCheckItem] = []
+        item_index: List[Tuple[int, int]] = []
+        for ret_idx, ret in enumerate(pending):
+            claims = getattr(ret, f"{claim_field}_claims") or []
+            if merge_psg:
+                references = [getattr(ret, reference_field)]
+            else:
+                references = [doc.text for doc in ret.retrieved_context or []]
+            if not claims:
+                continue
+            for ref_idx, reference in enumerate(references):
+                items.append(ClaimCheckItem(ret.query, reference, claims))
+                item_index.append((ret_idx, ref_idx))
+
+        logging.info(f"Checking {check_type} for {len(pending)} RAG results (packed).")
+        packed = self.packer.pack(items)
+        responses = (
+            self._dispatch_prompts([prompt.prompt for prompt in packed])
+            if packed
+            else []
+        )
+        item_labels = self.packer.unpack(items, packed, responses)
+
+        # 按 [claim][reference] 重组，与refchecker返回格式一致
+        checking_results = []
+        for ret in pending:
+            claims = getattr(ret, f"{claim_field}_claims") or []
+            if merge_psg:
+                checking_results.append([None] * len(claims))
+            else:
+                ref_num = len(ret.retrieved_context or [])
+                checking_results.append([[None] * ref_num for _ in claims])
+        for (ret_idx, ref_idx), labels in zip(item_index, item_labels):
+            for claim_idx, label in enumerate(labels):
+                if merge_psg:
+                    checking_results[ret_idx][claim_idx] = label
+                else:
+                    checking_results[ret_idx][claim_idx][ref_idx] = label
+
+        incomplete = 0
+        for ret, labels in zip(pending, checking_results):
+            flat = labels if merge_psg else [x for row in labels for x in row]
+            if any(label is None for label in flat):
+                incomplete += 1
+                continue
+            setattr(ret, check_type, labels)
+
+        if incomplete:
+            logging.warning(
+                f"{incomplete} 条结果的打包检查失败或标签不完整，改为逐条检查 {check_type}"
+            )
+            super().check_claims(results, check_type)
 
     async def _call_llm(self, prompts: List[str], **kwargs) -> List[str]:
-        """重写 _call_llm 方法以使用自定义 LLM 函数"""
-        responses = []
-        for prompt in prompts:
-            response = await self.custom_llm_func(prompt)
-            responses.append(response)
-        return responses
+        """重写 _call_llm 方法以使用自定义 LLM 函数，按max_concurrency并发调用"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _call(prompt: str) -> str:
+            async with semaphore:
+                return await self.custom_llm_func(prompt)
+
+        return list(await asyncio.gather(*(_call(prompt) for prompt in prompts)))
+
+    def _dispatch_prompts(self, prompts: List[str]) -> List[str]:
+        """ragchecker 的同步回调入口，在当前进程自己的事件循环中并发调度"""
+        return asyncio.run(self._call_llm(prompts))
 
 
 async def deepseek_llm_function(prompt: str) -> str:
     """使用 Deepseek 模型的 LLM 函数"""
+    from litellm import completion
+
     try:
         # 将同步调用包装在 asyncio.to_thread 中
         response = await asyncio.to_thread(
@@ -44,36 +161,149 @@ async def deepseek_llm_function(prompt: str) -> str:
         return None
 
 
-def evaluate_rag(file_path: str, is_excel: bool = False):
+def build_evaluator(**kwargs) -> CustomRAGChecker:
+    """
+    初始化自定义评估器，kwargs透传给CustomRAGChecker(如pack_claims)
+
+    未指定的 pack_claims 和 max_prompt_tokens 取 TEST_CONFIG 中的 rag_* 配置
+    """
+    kwargs.setdefault("pack_claims", TEST_CONFIG.get("rag_pack_claims", False))
+    kwargs.setdefault(
+        "max_prompt_tokens", TEST_CONFIG.get("rag_max_prompt_tokens", 6000)
+    )
+    # 设置 Deepseek API key，环境变量中已有时不覆盖
+    os.environ.setdefault("DEEPSEEK_API_KEY", DEEPSEEK_API_KEY)
+    return CustomRAGChecker(
+        custom_llm_func=deepseek_llm_function,
+        batch_size_extractor=32,
+        batch_size_checker=32,
+        extractor_name="deepseek/deepseek-chat",
+        checker_name="deepseek/deepseek-chat",
+        **kwargs,
+    )
+
+
+def load_rag_results(
+    file_path: str,
+    is_excel: bool = False,
+    prefilter: bool = False,
+    pass_threshold: float = 0.6,
+) -> Tuple[RAGResults, List[bool]]:
+    """
+    读取评估数据并计算低成本指标
+
+    参数:
+        file_path: 输入文件路径 (Excel或JSON)
+        is_excel: 是否为Excel文件
+        prefilter: 是否只将低分或存疑的结果送入LLM评估
+        pass_threshold: 低成本指标的通过阈值，达到该值的结果不再调用LLM
+
+    返回:
+        全部结果(每条结果的metrics中已写入低成本指标)，以及每条结果是否需要LLM评估
+    """
+    if is_excel:
+        # 如果是Excel文件，先转换为JSON
+        json_str = excel_to_rag_json(file_path)
+        rag_results = RAGResults.from_json(json_str)
+    else:
+        # 直接读取JSON文件
+        with open(file_path) as fp:
+            content = fp.read()
+            rag_results = RAGResults.from_json(content)
+
+    # 先批量计算低成本指标，写入每条结果的metrics
+    cheap_metrics = compute_rag_metrics(
+        [result.to_dict() for result in rag_results.results]
+    )
+    for result, row in zip(rag_results.results, cheap_metrics.to_dict("records")):
+        result.metrics.update(row)
+    logger.info(f"低成本指标: {summarize_rag_metrics(cheap_metrics)}")
+
+    if prefilter:
+        needs_check = select_for_llm_check(
+            cheap_metrics, pass_threshold=pass_threshold
+        ).tolist()
+    else:
+        needs_check = [True] * len(rag_results.results)
+    return rag_results, needs_check
+
+
+def _llm_subset(rag_results: RAGResults, needs_check: List[bool]) -> RAGResults:
+    return RAGResults(
+        results=[
+            result for result, flag in zip(rag_results.results, needs_check) if flag
+        ]
+    )
+
+
+def _with_cheap_metrics(
+    llm_metrics: Dict, rag_results: RAGResults, needs_check: List[bool]
+) -> Dict:
+    """
+    prefilter 时合并评估结果：LLM指标只覆盖送检的结果，低成本指标覆盖全部结果，
+    通过筛选的结果不会从输出中消失
+    """
+    cheap_metrics = pd.DataFrame(
+        [
+            {col: result.metrics[col] for col in METRIC_COLUMNS}
+            for result in rag_results.results
+        ],
+        columns=list(METRIC_COLUMNS),
+    )
+    return {
+        **llm_metrics,
+        "cheap_metrics": summarize_rag_metrics(cheap_metrics),
+        "llm_checked": sum(needs_check),
+        "prefilter_passed": len(needs_check) - sum(needs_check),
+    }
+
+
+def _evaluator_kwargs(
+    pack_claims: Optional[bool], max_prompt_tokens: Optional[int]
+) -> Dict[str, Any]:
+    """入口参数中显式指定的评估器参数，未指定的由 build_evaluator 取配置"""
+    kwargs = {"pack_claims": pack_claims, "max_prompt_tokens": max_prompt_tokens}
+    return {key: value for key, value in kwargs.items() if value is not None}
+
+
+def evaluate_rag(
+    file_path: str,
+    is_excel: bool = False,
+    prefilter: bool = False,
+    pass_threshold: float = 0.6,
+    pack_claims: Optional[bool] = None,
+    max_prompt_tokens: Optional[int] = None,
+):
     """
     评估RAG系统的性能
 
     参数:
         file_path: 输入文件路径 (Excel或JSON)
         is_excel: 是否为Excel文件
+        prefilter: 是否先计算低成本指标，只将低分或存疑的结果送入LLM评估；
+            返回的指标中附带全部结果的低成本指标和送检/通过的数量
+        pass_threshold: 低成本指标的通过阈值，达到该值的结果不再调用LLM
+        pack_claims: 是否打包检查claim，为None时取 TEST_CONFIG["rag_pack_claims"]
+        max_prompt_tokens: 打包时单个prompt的token上限，为None时取配置
     """
     try:
-        if is_excel:
-            # 如果是Excel文件，先转换为JSON
-            json_str = excel_to_rag_json(file_path)
-            rag_results = RAGResults.from_json(json_str)
-        else:
-            # 直接读取JSON文件
-            with open(file_path) as fp:
-                content = fp.read()
-                rag_results = RAGResults.from_json(content)
-
-        # 初始化自定义评估器
-        evaluator = CustomRAGChecker(
-            custom_llm_func=deepseek_llm_function,
-            batch_size_extractor=32,
-            batch_size_checker=32,
-            extractor_name="deepseek/deepseek-chat",
-            checker_name="deepseek/deepseek-chat",
+        all_results, needs_check = load_rag_results(
+            file_path, is_excel, prefilter, pass_threshold
         )
+        rag_results = _llm_subset(all_results, needs_check)
+        results = {}
+        if rag_results.results:
+            # 初始化自定义评估器
+            evaluator = build_evaluator(
+                **_evaluator_kwargs(pack_claims, max_prompt_tokens)
+            )
 
-        # 使用所有指标进行评估
-        results = evaluator.evaluate(rag_results, all_metrics)
+            # 使用所有指标进行评估
+            results = evaluator.evaluate(rag_results, all_metrics)
+        else:
+            logger.info("所有结果均通过低成本指标筛选，跳过LLM评估")
+        if prefilter:
+            results = _with_cheap_metrics(results, all_results, needs_check)
 
         # 打印评估结果
         print("评估结果:")
@@ -86,5 +316,138 @@ def evaluate_rag(file_path: str, is_excel: bool = False):
         raise
 
 
+def _resolve_metrics(metrics) -> set:
+    """将指标或指标组展开为具体指标集合，与RAGChecker.evaluate保持一致"""
+    if isinstance(metrics, str):
+        metrics = [metrics]
+    ret_metrics = set()
+    for metric in metrics:
+        if metric not in METRIC_REQUIREMENTS:
+            if metric not in METRIC_GROUP_MAP:
+                raise ValueError(f"Invalid metric: {metric}.")
+            ret_metrics.update(METRIC_GROUP_MAP[metric])
+        else:
+            ret_metrics.add(metric)
+    return ret_metrics
+
+
+def _evaluate_shard(
+    shard_json: str, metrics, evaluator_kwargs: Optional[Dict[str, Any]] = None
+) -> str:
+    """在子进程中评估单个分片，返回带中间结果与单条指标的JSON"""
+    rag_results = RAGResults.from_json(shard_json)
+    evaluator = build_evaluator(**(evaluator_kwargs or {}))
+    evaluator.evaluate(rag_results, metrics)
+    return rag_results.to_json()
+
+
+def merge_rag_results(shards: List[RAGResults], metrics=all_metrics) -> RAGResults:
+    """
+    按分片顺序合并评估结果，并按单进程相同的口径重新聚合总体指标
+
+    参数:
+        shards: 各分片的评估结果，顺序即原始结果顺序
+        metrics: 评估时使用的指标
+    """
+    merged = RAGResults(
+        results=[result for shard in shards for result in shard.results]
+    )
+    ret_metrics = _resolve_metrics(metrics)
+    for group, group_metrics in METRIC_GROUP_MAP.items():
+        if group == all_metrics:
+            continue
+        for metric in group_metrics:
+            if metric in ret_metrics:
+                merged.metrics[group][metric] = round(
+                    np.mean([result.metrics[metric] for result in merged.results])
+                    * 100,
+                    1,
+                )
+    return merged
+
+
+def evaluate_rag_sharded(
+    file_path: str,
+    is_excel: bool = False,
+    num_workers: Optional[int] = None,
+    metrics=all_metrics,
+    save_path: Optional[str] = None,
+    pack_claims: Optional[bool] = None,
+    max_prompt_tokens: Optional[int] = None,
+    **load_kwargs,
+):
+    """
+    多进程分片评估RAG系统的性能，输出格式与evaluate_rag一致
+
+    结果按原始顺序切分为连续分片，每个子进程独立运行自己的异步LLM调度，
+    完成后按分片顺序合并，因此输出与单进程运行的顺序和口径相同。
+
+    参数:
+        file_path: 输入文件路径 (Excel或JSON)
+        is_excel: 是否为Excel文件
+        num_workers: 进程数，默认使用CPU核数
+        metrics: 评估指标
+        save_path: 合并后完整结果的保存路径
+        pack_claims: 是否打包检查claim，为None时取 TEST_CONFIG["rag_pack_claims"]
+        max_prompt_tokens: 打包时单个prompt的token上限，为None时取配置
+        load_kwargs: 透传给load_rag_results的低成本筛选参数
+    """
+    try:
+        all_results, needs_check = load_rag_results(file_path, is_excel, **load_kwargs)
+        prefilter = load_kwargs.get("prefilter", False)
+        rag_results = _llm_subset(all_results, needs_check)
+        if not rag_results.results:
+            logger.info("所有结果均通过低成本指标筛选，跳过LLM评估")
+            return _with_cheap_metrics({}, all_results, needs_check)
+
+        num_workers = max(
+            1, min(num_workers or os.cpu_count() or 1, len(rag_results.results))
+        )
+        shard_size = -(-len(rag_results.results) // num_workers)
+        shard_jsons = [
+            RAGResults(results=rag_results.results[i : i + shard_size]).to_json()
+            for i in range(0, len(rag_results.results), shard_size)
+        ]
+        logger.info(f"RAG评估分为 {len(shard_jsons)} 个分片，使用 {num_workers} 个进程")
+
+        evaluator_kwargs = _evaluator_kwargs(pack_claims, max_prompt_tokens)
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            shard_outputs = list(
+                executor.map(
+                    _evaluate_shard,
+                    shard_jsons,
+                    [metrics] * len(shard_jsons),
+                    [evaluator_kwargs] * len(shard_jsons),
+                )
+            )
+
+        merged = merge_rag_results(
+            [RAGResults.from_json(output) for output in shard_outputs], metrics
+        )
+        results = merged.metrics
+        if prefilter:
+            results = _with_cheap_metrics(results, all_results, needs_check)
+        if save_path is not None:
+            # 通过筛选的结果只带低成本指标，与LLM评估的结果按原始顺序一起保存
+            checked = iter(merged.results)
+            saved = RAGResults(
+                results=[
+                    next(checked) if flag else result
+                    for result, flag in zip(all_results.results, needs_check)
+                ]
+            )
+            saved.metrics = merged.metrics
+            with open(save_path, "w") as f:
+                f.write(saved.to_json(indent=2))
+
+        logger.info(f"评估结果: {results}")
+
+        return results
+
+    except Exception as e:
+        logging.error(f"RAG分片评估过程中发生错误: {str(e)}")
+        raise
+
+
 if __name__ == "__main__":
     evaluate_rag("tests/test_results/test_results_20250114_101852.xlsx", True)
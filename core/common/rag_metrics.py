@@ -0,0 +1,268 @@
+import json
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from core.utils.logger import logger
+
+# 英文/数字按词切分，中文按单字切分
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[一-鿿]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+METRIC_COLUMNS = [
+    "lexical_overlap",
+    "ngram_similarity",
+    "context_hit_rate",
+    "duplicate_chunk_ratio",
+]
+
+
+def _normalize_text(text: Any) -> str:
+    """统一转为小写并压缩空白"""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ""
+    return WHITESPACE_PATTERN.sub(" ", str(text)).strip().lower()
+
+
+def _lexical_tokens(text: str) -> List[str]:
+    """词法切分"""
+    return TOKEN_PATTERN.findall(text)
+
+
+def _char_ngrams(text: str, ngram_range: Tuple[int, int]) -> List[str]:
+    """字符n-gram切分，文本短于n时退化为整段文本"""
+    text = text.replace(" ", "")
+    grams = []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        grams.extend(text[i : i + n] for i in range(len(text) - n + 1))
+    if not grams and text:
+        grams.append(text)
+    return grams
+
+
+def _parse_contexts(value: Any) -> List[Dict[str, Any]]:
+    """将上下文字段统一为 [{"doc_id":..., "text":...}] 列表"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return [{"doc_id": None, "text": value}]
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+
+    contexts = []
+    for item in value:
+        if isinstance(item, dict):
+            contexts.append(
+                {
+                    "doc_id": item.get("doc_id", item.get("id")),
+                    "text": item.get("text", item.get("answerOrContent", "")),
+                }
+            )
+        elif item is not None:
+            contexts.append({"doc_id": None, "text": str(item)})
+    return contexts
+
+
+def _build_matrix(
+    docs: Sequence[List[str]], vocab: Dict[str, int], binary: bool = False
+) -> sparse.csr_matrix:
+    """将切分结果按共享词表构建为CSR矩阵(词表在构建过程中增量扩充)"""
+    indptr = [0]
+    indices: List[int] = []
+    for tokens in docs:
+        for token in tokens:
+            indices.append(vocab.setdefault(token, len(vocab)))
+        indptr.append(len(indices))
+
+    data = np.ones(len(indices), dtype=np.float64)
+    matrix = sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+        shape=(len(docs), max(len(vocab), 1)),
+    )
+    # 重复token在CSR中累加为词频
+    matrix.sum_duplicates()
+    if binary:
+        matrix.data[:] = 1.0
+    return matrix
+
+
+def _resize(matrix: sparse.csr_matrix, n_cols: int) -> sparse.csr_matrix:
+    """补齐列数，使不同批次构建的矩阵可相乘"""
+    matrix.resize((matrix.shape[0], n_cols))
+    return matrix
+
+
+def _l2_normalize(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """按行L2归一化"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sparse.diags(1.0 / norms) @ matrix).tocsr()
+
+
+def _row_dot(a: sparse.csr_matrix, b: sparse.csr_matrix) -> np.ndarray:
+    """逐行点积"""
+    return np.asarray(a.multiply(b).sum(axis=1)).ravel()
+
+
+def compute_rag_metrics(
+    records: Sequence[Dict[str, Any]],
+    response_key: str = "response",
+    gt_key: str = "gt_answer",
+    context_key: str = "retrieved_context",
+    ngram_range: Tuple[int, int] = (2, 3),
+    hit_threshold: float = 0.1,
+) -> pd.DataFrame:
+    """
+    批量计算低成本的检索/回答指标，无需调用LLM
+
+    指标说明:
+        lexical_overlap: 标准答案中的词(中文为单字)被回答覆盖的比例
+        ngram_similarity: 回答与标准答案的字符n-gram余弦相似度
+        context_hit_rate: 与标准答案n-gram相似度不低于hit_threshold的召回片段占比
+        duplicate_chunk_ratio: 召回片段中重复片段(相同id或相同文本)的占比
+
+    Args:
+        records: 记录列表，如RAG评估JSON中的results或导出的测试结果行
+        response_key: 回答字段名
+        gt_key: 标准答案字段名
+        context_key: 召回上下文字段名，支持列表或JSON字符串
+        ngram_range: 字符n-gram长度范围
+        hit_threshold: 判定片段命中的相似度阈值
+
+    Returns:
+        与records逐行对应的指标DataFrame
+    """
+    n = len(records)
+    if n == 0:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+
+    responses = [_normalize_text(r.get(response_key)) for r in records]
+    gt_answers = [_normalize_text(r.get(gt_key)) for r in records]
+
+    # 展开所有召回片段，owner记录片段所属的行
+    chunk_texts: List[str] = []
+    chunk_keys: List[str] = []
+    owner: List[int] = []
+    for row_idx, record in enumerate(records):
+        for ctx in _parse_contexts(record.get(context_key)):
+            text = _normalize_text(ctx["text"])
+            chunk_texts.append(text)
+            doc_id = ctx["doc_id"]
+            chunk_keys.append(f"id:{doc_id}" if doc_id else f"text:{text}")
+            owner.append(row_idx)
+    owner_arr = np.asarray(owner, dtype=np.int64)
+    chunk_counts = np.bincount(owner_arr, minlength=n).astype(np.float64)
+
+    # 词法重合度
+    lex_vocab: Dict[str, int] = {}
+    gt_lex = _build_matrix([_lexical_tokens(t) for t in gt_answers], lex_vocab, True)
+    resp_lex = _build_matrix([_lexical_tokens(t) for t in responses], lex_vocab, True)
+    gt_lex = _resize(gt_lex, len(lex_vocab) or 1)
+    resp_lex = _resize(resp_lex, len(lex_vocab) or 1)
+    gt_sizes = np.asarray(gt_lex.sum(axis=1)).ravel()
+    lexical_overlap = np.divide(
+        _row_dot(gt_lex, resp_lex),
+        gt_sizes,
+        out=np.zeros(n),
+        where=gt_sizes > 0,
+    )
+
+    # 字符n-gram相似度
+    ngram_vocab: Dict[str, int] = {}
+    gt_ng = _build_matrix(
+        [_char_ngrams(t, ngram_range) for t in gt_answers], ngram_vocab
+    )
+    resp_ng = _build_matrix(
+        [_char_ngrams(t, ngram_range) for t in responses], ngram_vocab
+    )
+    chunk_ng = _build_matrix(
+        [_char_ngrams(t, ngram_range) for t in chunk_texts], ngram_vocab
+    )
+    n_cols = len(ngram_vocab) or 1
+    gt_ng = _l2_normalize(_resize(gt_ng, n_cols))
+    resp_ng = _l2_normalize(_resize(resp_ng, n_cols))
+    ngram_similarity = _row_dot(gt_ng, resp_ng)
+
+    # 上下文命中率
+    if len(chunk_texts):
+        chunk_ng = _l2_normalize(_resize(chunk_ng, n_cols))
+        chunk_sims = _row_dot(chunk_ng, gt_ng[owner_arr])
+        hits = np.bincount(
+            owner_arr,
+            weights=(chunk_sims >= hit_threshold).astype(np.float64),
+            minlength=n,
+        )
+    else:
+        hits = np.zeros(n)
+    context_hit_rate = np.divide(
+        hits, chunk_counts, out=np.zeros(n), where=chunk_counts > 0
+    )
+
+    # 重复片段占比
+    if len(chunk_keys):
+        dup_flags = (
+            pd.DataFrame({"owner": owner_arr, "key": chunk_keys})
+            .duplicated()
+            .to_numpy(dtype=np.float64)
+        )
+        dups = np.bincount(owner_arr, weights=dup_flags, minlength=n)
+    else:
+        dups = np.zeros(n)
+    duplicate_chunk_ratio = np.divide(
+        dups, chunk_counts, out=np.zeros(n), where=chunk_counts > 0
+    )
+
+    return pd.DataFrame(
+        {
+            "lexical_overlap": lexical_overlap,
+            "ngram_similarity": np.clip(ngram_similarity, 0.0, 1.0),
+            "context_hit_rate": context_hit_rate,
+            "duplicate_chunk_ratio": duplicate_chunk_ratio,
+        }
+    )
+
+
+def select_for_llm_check(
+    metrics: pd.DataFrame,
+    score_col: str = "ngram_similarity",
+    pass_threshold: float = 0.6,
+    max_disagreement: float = 0.3,
+) -> pd.Series:
+    """
+    根据低成本指标筛选需要送入LLM评估的行
+
+    分数低于pass_threshold，或词法/n-gram指标差异超过max_disagreement视为存疑，
+    需要LLM复核；其余行直接通过。
+
+    Args:
+        metrics: compute_rag_metrics的返回结果
+        score_col: 用于分档的指标列
+        pass_threshold: 通过阈值
+        max_disagreement: 词法与n-gram指标允许的最大差异
+
+    Returns:
+        布尔Series，True表示需要LLM评估
+    """
+    scores = metrics[score_col]
+    disagreement = (metrics["lexical_overlap"] - metrics["ngram_similarity"]).abs()
+    needs_check = (scores < pass_threshold) | (disagreement > max_disagreement)
+
+    logger.info(
+        f"低成本指标筛选: 共 {len(metrics)} 行, 需LLM复核 {int(needs_check.sum())} 行"
+    )
+    return needs_check
+
+
+def summarize_rag_metrics(metrics: pd.DataFrame) -> Dict[str, float]:
+    """汇总指标均值(百分制，保留一位小数，与RAGChecker输出保持一致)"""
+    if metrics.empty:
+        return {col: 0.0 for col in METRIC_COLUMNS}
+    return {col: round(float(metrics[col].mean()) * 100, 1) for col in METRIC_COLUMNS}
@@ -0,0 +1,243 @@
+"""
+测试结果的列式存储(Parquet/Arrow)
+
+Parquet 结果以目录保存，每次增量导出写入一个分片文件；嵌套字段保留为
+struct/list 类型而不是 JSON 字符串，读取时按内存映射加载，需要 Excel 时再按需转换。
+
+用法:
+    python -m core.common.result_format to-excel results.parquet results.xlsx
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from core.common.tokenizer import resolve_token_counts
+from core.utils.logger import logger
+
+RESULT_FORMATS = ("xlsx", "parquet")
+PARQUET_SUFFIX = ".parquet"
+
+
+def _json_strings(values: List) -> List[Optional[str]]:
+    """将值序列化为字符串，字典和列表序列化为JSON"""
+    return [
+        (
+            None
+            if value is None
+            else (
+                json.dumps(value, ensure_ascii=False)
+                if isinstance(value, (dict, list))
+                else str(value)
+            )
+        )
+        for value in values
+    ]
+
+
+def _column_array(name: str, values: List):
+    """构建单列Arrow数组，类型无法统一的列回退为JSON字符串"""
+    import pyarrow as pa
+
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        logger.debug(f"列 {name} 的类型不一致，按JSON字符串存储")
+        return pa.array(_json_strings(values), type=pa.string())
+
+
+def rows_to_table(rows: List[Dict]):
+    """
+    将导出行转换为Arrow表，列顺序按字段首次出现的顺序
+
+    Args:
+        rows: 导出行列表，嵌套的字典和列表保留为 struct/list 类型
+
+    Returns:
+        pyarrow.Table
+    """
+    import pyarrow as pa
+
+    # 批量计算延迟的token数
+    resolve_token_counts(rows)
+
+    columns: Dict[str, None] = {}
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                columns[key] = None
+    arrays = [_column_array(c, [row.get(c) for row in rows]) for c in columns]
+    return pa.Table.from_arrays(arrays, names=list(columns))
+
+
+def _part_files(path: Path) -> List[Path]:
+    if path.is_dir():
+        return sorted(path.glob(f"part-*{PARQUET_SUFFIX}"))
+    return [path] if path.exists() else []
+
+
+def export_parquet_result(data: List[Dict], path: Path) -> Optional[Path]:
+    """
+    增量导出测试结果到Parquet目录，每次调用写入一个新分片
+
+    Args:
+        data: 新的测试数据
+        path: 结果目录路径，例如 test_results_xxx.parquet
+
+    Returns:
+        写入的分片文件路径，没有数据时返回None
+    """
+    import pyarrow.parquet as pq
+
+    if not data:
+        return None
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    part_file = path / f"part-{len(_part_files(path)):05d}{PARQUET_SUFFIX}"
+    pq.write_table(rows_to_table(data), part_file)
+    logger.info(f"测试用例结果已增量导出到: {part_file}")
+    return part_file
+
+
+def read_results_table(paths: Union[Path, Iterable[Path]]):
+    """
+    读取一个或多个Parquet结果(目录或文件)为Arrow表
+
+    分片之间的列按名称对齐，缺失列填充空值，数值类型按需提升；同一列在不同分片中
+    类型无法统一时回退为JSON字符串，与单个分片内的处理一致。文件按内存映射读取。
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    files = [f for p in paths for f in _part_files(Path(p))]
+    if not files:
+        return pa.table({})
+
+    tables = [pq.read_table(f, memory_map=True) for f in files]
+    schema = _unify_schema([table.schema for table in tables])
+    return pa.concat_tables([_conform(table, schema) for table in tables])
+
+
+def _unify_schema(schemas: List):
+    """逐列合并各分片的schema，无法统一类型的列使用字符串类型"""
+    import pyarrow as pa
+
+    field_types: Dict[str, List] = {}
+    for schema in schemas:
+        for field in schema:
+            field_types.setdefault(field.name, []).append(field.type)
+
+    fields = []
+    for name, types in field_types.items():
+        try:
+            field = pa.unify_schemas(
+                [pa.schema([pa.field(name, t)]) for t in types],
+                promote_options="permissive",
+            ).field(name)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            logger.debug(f"列 {name} 在各分片中的类型不一致，按JSON字符串合并")
+            field = pa.field(name, pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def _conform(table, schema):
+    """按统一的schema补齐缺失列、转换列类型并调整列顺序"""
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(table.num_rows, type=field.type))
+            continue
+        column = table.column(field.name)
+        if column.type == field.type:
+            columns.append(column)
+        elif field.type == pa.string() and not pa.types.is_null(column.type):
+            # 类型冲突回退为字符串的列，与 _column_array 使用相同的序列化方式
+            columns.append(
+                pa.array(_json_strings(column.to_pylist()), type=pa.string())
+            )
+        else:
+            columns.append(column.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def read_results(path: Union[str, Path]):
+    """
+    读取测试结果为DataFrame，Parquet结果使用Arrow类型避免复制，其余按Excel读取
+
+    Args:
+        path: Parquet目录/文件或Excel文件路径
+
+    Returns:
+        pandas.DataFrame
+    """
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix == PARQUET_SUFFIX:
+        return read_results_table(path).to_pandas(types_mapper=pd.ArrowDtype)
+    return pd.read_excel(path)
+
+
+def results_to_excel(
+    paths: Union[Path, Iterable[Path]],
+    output_path: Union[str, Path],
+    sheet_name: str = "Sheet1",
+    batch_size: int = 10000,
+) -> str:
+    """
+    按需将Parquet结果转换为Excel，嵌套字段序列化为JSON字符串
+
+    按批次逐行写出，超过Excel行数上限时自动新建工作表
+    """
+    from core.common.json_to_excel import write_rows_streaming
+
+    table = read_results_table(paths)
+
+    def rows_factory():
+        for batch in table.to_batches(max_chunksize=batch_size):
+            yield from batch.to_pylist()
+
+    return write_rows_streaming(
+        rows_factory, output_path, columns=table.column_names, sheet_name=sheet_name
+    )
+
+
+def json_to_parquet(data: Union[Dict, List], output_path: Union[str, Path]) -> Path:
+    """
+    将JSON数据保存为Parquet文件，嵌套结构原样保留，不做展开
+
+    Args:
+        data: JSON数据，字典中的 result 列表或记录列表
+        output_path: 输出Parquet文件路径
+    """
+    import pyarrow.parquet as pq
+
+    if isinstance(data, dict):
+        data = data.get("result", [data])
+    output_path = Path(output_path)
+    pq.write_table(rows_to_table(data), output_path)
+    logger.info(f"已保存Parquet文件: {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测试结果格式转换")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_excel = subparsers.add_parser("to-excel", help="将Parquet结果转换为Excel")
+    to_excel.add_argument("inputs", type=Path, nargs="+", help="Parquet目录或文件")
+    to_excel.add_argument("output", type=Path, help="输出Excel文件")
+    args = parser.parse_args()
+
+    if args.command == "to-excel":
+        results_to_excel(args.inputs, args.output)
+        logger.info(f"已转换为Excel: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.utils.logger import logger
+
+DEFAULT_MODEL = "gpt-4-1106-preview"
+
+
+class DeferredTokenCount:
+    """延迟计算的token数占位符，在导出时统一批量计算"""
+
+    __slots__ = ("text", "model")
+
+    def __init__(self, text: str, model: str = DEFAULT_MODEL):
+        self.text = text
+        self.model = model
+
+    def __repr__(self):
+        return f"DeferredTokenCount(len={len(self.text)}, model={self.model})"
+
+
+class TokenizerService:
+    """
+    token计数服务
+
+    每个进程每种编码只加载一次；按内容哈希缓存计数结果，重复出现的召回文档
+    不会重复编码；批量计数使用 encode_batch 在线程池中并行编码。
+    """
+
+    _encodings: Dict[str, Any] = {}
+    _encoding_lock = Lock()
+    _instances: Dict[str, "TokenizerService"] = {}
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        num_threads: int = 8,
+        cache_size: int = 10000,
+    ):
+        self.model = model
+        self.num_threads = num_threads
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._cache_lock = Lock()
+
+    @classmethod
+    def get_instance(cls, model: str = DEFAULT_MODEL) -> "TokenizerService":
+        """获取指定模型的共享实例"""
+        with cls._encoding_lock:
+            if model not in cls._instances:
+                cls._instances[model] = cls(model)
+            return cls._instances[model]
+
+    @classmethod
+    def get_encoding(cls, model: str = DEFAULT_MODEL):
+        """获取模型对应的编码，每个进程只加载一次"""
+        with cls._encoding_lock:
+            encoding = cls._encodings.get(model)
+            if encoding is None:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+                cls._encodings[model] = encoding
+                logger.debug(f"已加载tokenizer编码: {model}")
+            return encoding
+
+    @staticmethod
+    def _digest(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _cache_get(self, key: bytes) -> Optional[int]:
+        with self._cache_lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+            return count
+
+    def _cache_put(self, key: bytes, count: int) -> None:
+        with self._cache_lock:
+            self._cache[key] = count
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count(self, text: str) -> int:
+        """计算单个文本的token数"""
+        if not text:
+            return 0
+        key = self._digest(text)
+        count = self._cache_get(key)
+        if count is None:
+            count = len(self.get_encoding(self.model).encode(text))
+            self._cache_put(key, count)
+        return count
+
+    def count_batch(self, texts: Iterable[str]) -> List[int]:
+        """批量计算token数，相同内容只编码一次"""
+        texts = list(texts)
+        keys = [self._digest(text) if text else None for text in texts]
+
+        counts: Dict[bytes, int] = {}
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key is None or key in counts or key in missing:
+                continue
+            cached = self._cache_get(key)
+            if cached is None:
+                missing[key] = text
+            else:
+                counts[key] = cached
+
+        if missing:
+            encoded = self.get_encoding(self.model).encode_batch(
+                list(missing.values()), num_threads=self.num_threads
+            )
+            for key, tokens in zip(missing.keys(), encoded):
+                counts[key] = len(tokens)
+                self._cache_put(key, len(tokens))
+
+        return [counts[key] if key is not None else 0 for key in keys]
+
+    def deferred(self, text: str) -> DeferredTokenCount:
+        """返回延迟计数的占位符"""
+        return DeferredTokenCount(text or "", self.model)
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL, defer: bool = False):
+    """计算token数，defer为True时返回占位符，留待resolve_token_counts批量计算"""
+    service = TokenizerService.get_instance(model)
+    if defer:
+        return service.deferred(text)
+    return service.count(text)
+
+
+def resolve_token_counts(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    将记录中所有延迟计数占位符在一次批量计算中替换为token数
+
+    Args:
+        records: 待导出的记录列表，原地修改
+
+    Returns:
+        替换后的记录列表
+    """
+    pending: Dict[str, List[tuple]] = {}
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, DeferredTokenCount):
+                pending.setdefault(value.model, []).append((record, key, value.text))
+
+    for model, items in pending.items():
+        counts = TokenizerService.get_instance(model).count_batch(
+            text for _, _, text in items
+        )
+        for (record, key, _), count in zip(items, counts):
+            record[key] = count
+    return records
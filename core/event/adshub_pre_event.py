@@ -2,11 +2,14 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 import json
 import time
+import uuid
 
 from func_timeout import FunctionTimedOut
+from config import TEST_CONFIG
 from constant import ADSHUB_PRE_APP_AGENT_CODEDE, ADSHUB_PRE_EC_AGENT_CODEDE
 from core.model.adshub_pre_model import AdshubRequest
-from core.model.factory import factory
+from core.model.conversation_info import ConversationInfoLookup
+from core.model.plan_tree import PlanTree
 from core.service.adshub_pre_service import (
     adshub_ad_detail_backend,
     adshub_ad_generate_backend,
@@ -26,6 +29,11 @@ class AdshubPreConfig:
     max_retries: int = 3
     retry_delay: int = 2
     default_language: str = "zh_CN"
+    export_mode: str = TEST_CONFIG.get("adshub_export_mode", "flat")
+
+
+# normalized 导出模式下的表，依次通过 case_key、campaign_key 关联
+EXPORT_TABLES = ("cases", "requests", "campaigns", "adgroups")
 
 
 class DatabaseError(Exception):
@@ -45,6 +53,10 @@ class AdshubPreProcessor:
 
     def __init__(self, config: AdshubPreConfig = AdshubPreConfig()):
         self.config = config
+        self.conversation_info = ConversationInfoLookup(
+            cache_dir=TEST_CONFIG.get("conversation_info_cache_dir"),
+            cache_version=TEST_CONFIG.get("conversation_info_cache_version", 1),
+        )
 
     def _process_fields(self, raw_data: Dict) -> Dict[str, Any]:
         """处理字段,将其转换为扁平结构"""
@@ -58,21 +70,16 @@ class AdshubPreProcessor:
                     result[field_name] = field_data.get("value", "")
         return result
 
-    @retry_decorator(max_retries=3, delay=2)
-    def _query_database(self, conversation_id: str) -> Dict:
-        """查询数据库"""
-        sql = """select extracted_fields from conversation_info 
-                where external_conversation_id="{0}" 
-                order by create_time desc limit 100;""".format(
-            conversation_id
-        )
-        try:
-            data_res = DBPool().query(sql)
-            if not data_res:
-                raise DatabaseError("未找到数据")
-            return data_res[0]
-        except Exception as e:
-            raise DatabaseError(f"数据库查询失败: {str(e)}")
+    @property
+    def normalized(self) -> bool:
+        return self.config.export_mode == "normalized"
+
+    @staticmethod
+    def _tables(request: Any) -> Dict[str, List[Dict]]:
+        """获取会话中的规范化导出表"""
+        if not getattr(request.session, "export_tables", None):
+            request.session.export_tables = {name: [] for name in EXPORT_TABLES}
+        return request.session.export_tables
 
     def collect_request(self, request: Any, agent_code: str, **kwargs) -> Optional[str]:
         """收集请求信息"""
@@ -102,22 +109,26 @@ class AdshubPreProcessor:
         request.session.current_case.update({"conversation_id": conversation_id})
 
         try:
-            data_res = self._query_database(conversation_id)
-            brief = (
-                json.loads(data_res["extracted_fields"])
-                if "extracted_fields" in data_res
-                else {}
-            )
+            brief = self.conversation_info.get(conversation_id)
 
             # 处理数据
             adrequest = self._process_fields(brief)
             request.session.adrequest = adrequest
 
             # 更新导出数据
-            row = {"question": question}
             request_dict = {f"request_{k}": v for k, v in adrequest.items()}
-            row.update(**request_dict)
-            request.session.export_excel.append(row)
+            if self.normalized:
+                case_key = uuid.uuid4().hex[:16]
+                request.session.case_key = case_key
+                tables = self._tables(request)
+                tables["cases"].append(
+                    {"case_key": case_key, **request.session.current_case}
+                )
+                tables["requests"].append({"case_key": case_key, **request_dict})
+            else:
+                row = {"question": question}
+                row.update(**request_dict)
+                request.session.export_excel.append(row)
 
             return conversation_id
         except Exception as e:
@@ -185,42 +196,62 @@ class AdshubPreProcessor:
                 plan_id, _agent_code=agent_code
             )
 
+            success = (
+                ad_detail_response and ad_detail_response.get("planStatus") == "SUCCESS"
+            )
+            if self.normalized:
+                # 用例和请求字段已在 collect_request 中写入，只写入方案数据
+                if success:
+                    self._export_plan_tables(
+                        request, ad_detail_response, request.session.case_key
+                    )
+                return
+
             case_dict = request.session.current_case.copy()
             adrequest = request.session.adrequest.copy()
-            request_dict = {f"request_{k}": v for k, v in adrequest.items()}
 
             # 处理响应
-            if ad_detail_response and ad_detail_response.get("planStatus") == "SUCCESS":
+            if success:
                 self._process_successful_response(
-                    request, ad_detail_response, case_dict, request_dict
+                    request, ad_detail_response, case_dict, adrequest
                 )
             else:
                 row = {}
-                row.update(**request_dict)
+                row.update(**{f"request_{k}": v for k, v in adrequest.items()})
                 request.session.export_excel.append(row)
         except Exception as e:
             logger.error(f"生成广告失败: {str(e)}")
 
     def _process_successful_response(
-        self, request: Any, response: Dict, case_dict: Dict, request_dict: Dict
+        self, request: Any, response: Dict, case_dict: Dict, adrequest: Dict
     ) -> None:
-        """处理成功的响应"""
-        plan_detail = response.get("planDetail", {})
-        ad = factory.create_model("adshubad", **plan_detail)
-
-        for campaign_data in ad.campaignList:
-            campaign = factory.create_model("adshubcampaign", **campaign_data)
-            campaigns_dict = campaign.__dict__.copy()
-            campaigns_dict.pop("adGroupList")
+        """处理成功的响应，每个广告组一行"""
+        tree = PlanTree(response.get("planDetail", {}), request_fields=adrequest)
+        request.session.export_excel.extend(tree.iter_leaf_rows(base=case_dict))
+
+    def _export_plan_tables(self, request: Any, response: Dict, case_key: str) -> None:
+        """normalized 模式下将广告系列和广告组分别写入各自的表，只保留关联键"""
+        tables = self._tables(request)
+        tree = PlanTree(response.get("planDetail", {}))
+
+        for i, campaign in enumerate(tree.campaigns):
+            campaign_key = f"{case_key}_{i}"
+            tables["campaigns"].append(
+                {
+                    "case_key": case_key,
+                    "campaign_key": campaign_key,
+                    **{f"campaign_{k}": v for k, v in campaign.fields().items()},
+                }
+            )
 
-            for adgroup_data in campaign.adGroupList:
-                adgroup = factory.create_model("adshubadgroup", **adgroup_data)
-                row = {}
-                row.update(**case_dict)
-                row.update(**request_dict)
-                row.update(**{f"campaign_{k}": v for k, v in campaigns_dict.items()})
-                row.update(**{f"adgroup_{k}": v for k, v in adgroup.__dict__.items()})
-                request.session.export_excel.append(row)
+            for j, adgroup in enumerate(campaign.children()):
+                tables["adgroups"].append(
+                    {
+                        "campaign_key": campaign_key,
+                        "adgroup_key": f"{campaign_key}_{j}",
+                        **{f"adgroup_{k}": v for k, v in adgroup.fields().items()},
+                    }
+                )
 
 
 # 创建全局处理器实例
@@ -1,8 +1,33 @@
 import uuid
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from core.model.meetask_model import MeetAskModel
+from config import TEST_CONFIG
+from core.model.meetask_model import MeetAskModel, trace_fetcher
 from core.service.meetask_service import meetask_stream_ask_question
+from core.utils.logger import logger
+
+# 单个用例最多的对话轮数(含首轮)和总耗时预算(秒)
+MAX_TURNS = TEST_CONFIG.get("meetask_max_turns", 5)
+CASE_TIME_BUDGET = TEST_CONFIG.get("meetask_case_time_budget", 300)
+
+# 导出结果处理(字段解析、token计数)在后台线程中进行，与下一轮的流式问答重叠
+_export_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="meetask_export"
+)
+
+
+def _export_turn(ma_model, fetch_trace=False):
+    """处理一轮的导出数据，fetch_trace 时先查询该轮的日志，返回导出数据和各阶段耗时"""
+    timings = {}
+    if fetch_trace:
+        start = time.perf_counter()
+        ma_model.query_data()
+        timings["trace_cost"] = time.perf_counter() - start
+    start = time.perf_counter()
+    excel_data = ma_model.to_execl()
+    timings["export_cost"] = time.perf_counter() - start
+    return excel_data, timings
 
 
 def meetask_question_ask(request, **kwargs):
@@ -16,16 +41,60 @@ def meetask_question_ask(request, **kwargs):
 
     question = kwargs.get("query")
     user = request.session.user
+    case_start = time.perf_counter()
+    turns = []  # (导出任务, 本轮耗时)
 
-    response_data = meetask_stream_ask_question(question, user)
-    ma_model = MeetAskModel(**kwargs, **response_data)
-    ma_model.query_data()
-    excel_data = ma_model.to_execl()
-    request.session.export_excel.append(excel_data)
-    while ma_model.should_follow_up():
-        question = ma_model.follow_up_question
-        response_data = meetask_stream_ask_question(question, user)
-        ma_model = MeetAskModel(**kwargs, **response_data)
-        ma_model.query_data()
-        excel_data = ma_model.to_execl()
-        request.session.export_excel.append(excel_data)
+    try:
+        for turn in range(1, MAX_TURNS + 1):
+            timings = {"turn": turn}
+
+            start = time.perf_counter()
+            response_data = meetask_stream_ask_question(question, user)
+            timings["stream_cost"] = time.perf_counter() - start
+
+            ma_model = MeetAskModel(**kwargs, **response_data)
+
+            # 追问判断会调用LLM，先检查轮数和耗时预算
+            elapsed = time.perf_counter() - case_start
+            if turn == MAX_TURNS or elapsed >= CASE_TIME_BUDGET:
+                if turn == MAX_TURNS:
+                    logger.info(f"已达到最大对话轮数 {MAX_TURNS}，不再追问")
+                else:
+                    logger.warning(
+                        f"用例耗时 {elapsed:.1f} 秒超过预算 {CASE_TIME_BUDGET} 秒，停止追问"
+                    )
+                # 最后一轮的日志只用于导出：登记 qa_id 后由导出任务查询，用例循环
+                # 不再同步等待日志写入，与同时进行的日志查询合并为一批
+                trace_fetcher.prefetch([ma_model.qa_id])
+                future = _export_executor.submit(_export_turn, ma_model, True)
+                turns.append((future, timings))
+                break
+
+            start = time.perf_counter()
+            ma_model.query_data()
+            timings["trace_cost"] = time.perf_counter() - start
+
+            turns.append((_export_executor.submit(_export_turn, ma_model), timings))
+
+            start = time.perf_counter()
+            follow_up = ma_model.should_follow_up()
+            timings["follow_up_cost"] = time.perf_counter() - start
+            if not follow_up:
+                break
+            question = ma_model.follow_up_question
+    finally:
+        # 按轮次顺序写入导出数据，附带每轮各阶段耗时
+        for future, timings in turns:
+            try:
+                excel_data, export_timings = future.result()
+            except Exception as e:
+                logger.error(f"第{timings['turn']}轮导出数据处理失败: {str(e)}")
+                continue
+            timings.update(export_timings)
+            timing_row = {
+                f"timing_{k}": round(v, 3) if isinstance(v, float) else v
+                for k, v in timings.items()
+            }
+            logger.info(f"第{timings['turn']}轮耗时: {timing_row}")
+            excel_data.update(timing_row)
+            request.session.export_excel.append(excel_data)
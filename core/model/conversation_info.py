@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional
+
+from core.utils.async_database import AsyncDBPool
+from core.utils.database import DBPool
+from core.utils.logger import logger
+
+conversation_info_sql = """select extracted_fields from conversation_info
+                where external_conversation_id=%s
+                order by create_time desc limit 1;"""
+
+
+class ConversationInfoNotReady(Exception):
+    """会话信息在等待时间内仍未写入"""
+
+    pass
+
+
+class ConversationInfoLookup:
+    """conversation_info 读穿缓存
+
+    只查询最新的一条记录；记录尚未写入时按观测到的写入延迟自适应等待，
+    解析后的 extracted_fields 按 conversation_id 缓存在内存中，
+    指定 cache_dir 时同时落盘，供后续步骤和重跑复用。落盘缓存按行追加本进程新增的
+    记录，每条记录带 cache_version，extracted_fields 结构变化时修改版本号即可使旧记录失效。
+    事件循环中使用 aget，等待记录写入时不阻塞其它协程。
+    """
+
+    def __init__(
+        self,
+        db_pool=DBPool,
+        async_db_pool=AsyncDBPool,
+        max_wait: float = 30.0,
+        min_delay: float = 0.2,
+        max_delay: float = 5.0,
+        ewma_alpha: float = 0.3,
+        cache_dir: Optional[Path] = None,
+        cache_version: int = 1,
+    ):
+        self.db_pool = db_pool
+        self.async_db_pool = async_db_pool
+        self.max_wait = max_wait
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.ewma_alpha = ewma_alpha
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_version = cache_version
+        self.lag_estimate: Optional[float] = None  # 观测到的写入延迟(秒)
+        self._cache: Optional[Dict[str, dict]] = None
+        self._lock = Lock()
+
+    @property
+    def _cache_file(self) -> Path:
+        worker_id = os.environ.get("PYTEST_XDIST_WORKER", "main")
+        return self.cache_dir / f"conversation_info_{worker_id}.jsonl"
+
+    def _load_cache(self) -> Dict[str, dict]:
+        """首次使用时加载缓存，合并所有worker落盘的缓存文件，忽略其它版本的记录"""
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_dir and self.cache_dir.exists():
+                for file_path in sorted(
+                    self.cache_dir.glob("conversation_info_*.jsonl")
+                ):
+                    try:
+                        with open(file_path, "r", encoding="utf-8") as f:
+                            for line in f:
+                                self._load_entry(line)
+                    except OSError as e:
+                        logger.warning(f"读取会话缓存失败 {file_path}: {str(e)}")
+        return self._cache
+
+    def _load_entry(self, line: str) -> None:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            # 进程中断时最后一行可能不完整
+            return
+        if entry.get("version") != self.cache_version:
+            return
+        if entry.get("deleted"):
+            self._cache.pop(entry["key"], None)
+        else:
+            self._cache[entry["key"]] = entry["fields"]
+
+    def _append(self, entry: dict) -> None:
+        """追加一条落盘记录，只写入本进程新增或清除的会话"""
+        if not self.cache_dir:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._cache_file, "a", encoding="utf-8") as f:
+            f.write(
+                json.dumps({"version": self.cache_version, **entry}, ensure_ascii=False)
+                + "\n"
+            )
+
+    def _save(self, conversation_id: str, fields: dict) -> None:
+        self._load_cache()[conversation_id] = fields
+        self._append({"key": conversation_id, "fields": fields})
+
+    def invalidate(self, conversation_id: str) -> None:
+        """清除指定会话的缓存，包括落盘的记录"""
+        with self._lock:
+            if self._load_cache().pop(conversation_id, None) is not None:
+                self._append({"key": conversation_id, "deleted": True})
+
+    def _next_delay(self, elapsed: float, attempt: int) -> float:
+        """首次按历史写入延迟的预估剩余时间等待，之后指数退避"""
+        if attempt == 1 and self.lag_estimate is not None:
+            delay = self.lag_estimate - elapsed
+        else:
+            delay = self.min_delay * 2 ** (attempt - 1)
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def _observe_lag(self, lag: float) -> None:
+        if self.lag_estimate is None:
+            self.lag_estimate = lag
+        else:
+            self.lag_estimate = (
+                self.ewma_alpha * lag + (1 - self.ewma_alpha) * self.lag_estimate
+            )
+
+    def _cached(self, conversation_id: str, refresh: bool) -> Optional[dict]:
+        with self._lock:
+            cache = self._load_cache()
+            if not refresh and conversation_id in cache:
+                logger.debug(f"会话信息命中缓存: {conversation_id}")
+                return cache[conversation_id]
+        return None
+
+    def _wait_delay(self, conversation_id: str, elapsed: float, attempt: int) -> float:
+        """记录尚未写入时返回下一次查询前的等待时间，超时抛出异常"""
+        if elapsed >= self.max_wait:
+            raise ConversationInfoNotReady(
+                f"会话 {conversation_id} 的信息在 {self.max_wait} 秒内未写入"
+            )
+        delay = min(self._next_delay(elapsed, attempt), self.max_wait - elapsed)
+        logger.info(f"会话信息尚未写入，{delay:.1f} 秒后重试")
+        return delay
+
+    def _store(self, conversation_id: str, row: dict, elapsed: float) -> dict:
+        raw = row.get("extracted_fields")
+        fields = json.loads(raw) if raw else {}
+        with self._lock:
+            self._observe_lag(elapsed)
+            self._save(conversation_id, fields)
+        return fields
+
+    def get(self, conversation_id: str, refresh: bool = False) -> dict:
+        """
+        获取会话解析后的 extracted_fields
+
+        Args:
+            conversation_id: 外部会话ID
+            refresh: 是否忽略缓存重新查询
+
+        Returns:
+            解析后的 extracted_fields，字段为空时返回空字典
+        """
+        cached = self._cached(conversation_id, refresh)
+        if cached is not None:
+            return cached
+
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            data_res = self.db_pool.query(conversation_info_sql, (conversation_id,))
+            elapsed = time.monotonic() - start
+            if data_res:
+                return self._store(conversation_id, data_res[0], elapsed)
+            attempt += 1
+            time.sleep(self._wait_delay(conversation_id, elapsed, attempt))
+
+    async def aget(self, conversation_id: str, refresh: bool = False) -> dict:
+        """异步获取会话解析后的 extracted_fields，参数同 get"""
+        cached = self._cached(conversation_id, refresh)
+        if cached is not None:
+            return cached
+
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            data_res = await self.async_db_pool.query(
+                conversation_info_sql, (conversation_id,)
+            )
+            elapsed = time.monotonic() - start
+            if data_res:
+                return self._store(conversation_id, data_res[0], elapsed)
+            attempt += 1
+            await asyncio.sleep(self._wait_delay(conversation_id, elapsed, attempt))
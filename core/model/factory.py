@@ -1,107 +1,426 @@
+import hashlib
 import os
 import json
+import keyword
 from pathlib import Path
-from typing import Dict, Type, Optional
+from threading import Event, RLock, Thread
+from typing import Any, Callable, Dict, Iterable, List, Type, Optional
 from dataclasses import dataclass, field
-from pydantic import BaseModel as PydanticModel, create_model
+from pydantic import BaseModel as PydanticModel, ConfigDict, create_model
 
+from config import TEST_CONFIG
 from core.utils.logger import logger
 
 
+class CustomBaseModel(PydanticModel):
+    """工厂生成模型的基类，不做校验并允许模板之外的字段"""
+
+    model_config = ConfigDict(
+        validate_assignment=False,
+        extra="allow",  # 允许额外字段
+        arbitrary_types_allowed=True,  # 允许任意类型
+    )
+
+    def to_dict(self, include_extra: bool = True) -> Dict[str, Any]:
+        """模板字段和额外字段合并为字典，include_extra 为False时只包含模板字段"""
+        if include_extra and self.__pydantic_extra__:
+            return {**self.__dict__, **self.__pydantic_extra__}
+        return self.__dict__.copy()
+
+
+class SlotsRecord:
+    """
+    slots 后端生成的记录类的基类
+
+    模板字段存放在 __slots__ 中，模板之外的字段存放在 _extra 字典中(没有时为None)；
+    生成的 __init__ 和 to_dict 按模板字段展开，不做任何校验。
+    """
+
+    __slots__ = ("_extra",)
+    _fields: tuple = ()
+
+    def __getattr__(self, name):
+        # 只有模板字段之外的属性才会走到这里
+        extra = object.__getattribute__(self, "_extra")
+        if extra and name in extra:
+            return extra[name]
+        raise AttributeError(f"{type(self).__name__} 没有属性 {name}")
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+
+_RESERVED_FIELDS = frozenset(dir(SlotsRecord)) | {"model_construct"}
+
+
+def _pydantic_model(name: str, template: dict) -> Type:
+    fields = {key: (Optional[type(value)], None) for key, value in template.items()}
+    return create_model(name, **fields, __base__=CustomBaseModel)
+
+
+def _slots_model(name: str, template: dict) -> Type:
+    """根据模板生成 __slots__ 记录类，不能作为属性名的字段按额外字段存放"""
+    fields = tuple(
+        key
+        for key in template
+        if key.isidentifier()
+        and not keyword.iskeyword(key)
+        and key not in _RESERVED_FIELDS
+    )
+    args = "".join(f", {key}=None" for key in fields)
+    assigns = "".join(f"    self.{key} = {key}\n" for key in fields)
+    items = ", ".join(f"{key!r}: self.{key}" for key in fields)
+    source = (
+        f"def __init__(self{args}, **extra):\n"
+        f"{assigns}"
+        "    self._extra = extra or None\n"
+        "\n"
+        "def to_dict(self, include_extra=True):\n"
+        f"    data = {{{items}}}\n"
+        "    if include_extra and self._extra:\n"
+        "        data.update(self._extra)\n"
+        "    return data\n"
+    )
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, f"<record:{name}>", "exec"), namespace)
+    record_class = type(
+        name,
+        (SlotsRecord,),
+        {
+            "__slots__": fields,
+            "_fields": fields,
+            "__init__": namespace["__init__"],
+            "to_dict": namespace["to_dict"],
+        },
+    )
+    # 与Pydantic后端保持相同的构造入口
+    record_class.model_construct = record_class
+    return record_class
+
+
+MODEL_BACKENDS: Dict[str, Callable[[str, dict], Type]] = {
+    "pydantic": _pydantic_model,
+    "slots": _slots_model,
+}
+
+
+REGISTRY_CACHE_VERSION = 1
+
+
+def _file_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: state[k] for k in ("mtime_ns", "size", "hash")}
+
+
+def _decode_json(value: Any) -> Any:
+    """字符串形式的JSON字段解析为对象，解析失败时保留原值"""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _build_converter(template: dict) -> Callable[[Dict], Dict]:
+    """
+    根据模板预先确定需要JSON解析的字段，生成字段转换函数
+
+    模板中为字典或列表的字段，传入字符串时解析为JSON；其余字段(包括模板之外的字段)原样保留。
+    """
+    json_keys = frozenset(
+        key for key, value in template.items() if isinstance(value, (dict, list))
+    )
+    if not json_keys:
+        return lambda kwargs: kwargs
+
+    def convert(kwargs: Dict) -> Dict:
+        pending = [
+            key
+            for key in json_keys.intersection(kwargs)
+            if isinstance(kwargs[key], str)
+        ]
+        if not pending:
+            return kwargs
+        converted = dict(kwargs)
+        for key in pending:
+            converted[key] = _decode_json(converted[key])
+        return converted
+
+    return convert
+
+
 class ModelFactory:
     """模型工厂类,用于管理所有JSON模板"""
 
     _instance = None
     _models: Dict[str, Type] = {}
+    _converters: Dict[str, Callable[[Dict], Dict]] = {}
+    _registrations: Dict[str, str] = {}  # 模型名称 -> 后端
     _templates: Dict[str, dict] = {}
+    _template_state: Dict[str, Dict[str, Any]] = {}  # 模板名 -> 文件状态和哈希
+    _templates_loaded = False
+    _templates_lock = RLock()
+    _reload_listeners: List[Callable[[List[str]], None]] = []
+
+    template_dir = Path(__file__).parent.parent / "template" / "model"
+    # 模板注册表缓存，按模板文件哈希校验，worker 启动时一次读取
+    registry_cache: Optional[Path] = TEST_CONFIG.get("model_registry_cache")
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ModelFactory, cls).__new__(cls)
-            cls._instance._load_templates()
         return cls._instance
 
-    def _load_templates(self):
-        """加载所有JSON模板文件"""
-        template_dir = Path(__file__).parent.parent / "template" / "model"
-        if not template_dir.exists():
-            logger.warning(f"模板目录不存在: {template_dir}")
+    @classmethod
+    def _load_templates(cls) -> Dict[str, dict]:
+        """首次使用时加载所有JSON模板文件，导入模块时不读取磁盘"""
+        if cls._templates_loaded:
+            return cls._templates
+        with cls._templates_lock:
+            if not cls._templates_loaded:
+                cls._sync_templates(cls._read_registry_cache())
+                cls._templates_loaded = True
+        return cls._templates
+
+    @classmethod
+    def _read_registry_cache(cls) -> Dict[str, Dict[str, Any]]:
+        if not cls.registry_cache or not Path(cls.registry_cache).exists():
+            return {}
+        try:
+            with open(cls.registry_cache, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != REGISTRY_CACHE_VERSION:
+                return {}
+            return data["templates"]
+        except Exception as e:
+            logger.warning(f"读取模板注册表缓存失败: {str(e)}")
+            return {}
+
+    @classmethod
+    def _write_registry_cache(cls) -> None:
+        if not cls.registry_cache:
             return
+        path = Path(cls.registry_cache)
+        data = {
+            "version": REGISTRY_CACHE_VERSION,
+            "templates": {
+                name: {**state, "template": cls._templates[name]}
+                for name, state in cls._template_state.items()
+            },
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再替换，多个worker同时写入时不会读到不完整的文件
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"写入模板注册表缓存失败: {str(e)}")
+
+    @classmethod
+    def _sync_templates(cls, cached: Dict[str, Dict[str, Any]] = None) -> List[str]:
+        """
+        按模板文件状态同步模板，返回内容有变化(新增、修改、删除)的模板名
+
+        文件的修改时间和大小与已知状态一致时跳过读取；否则读取并比较哈希，
+        内容未变时只更新文件状态。cached 为注册表缓存中的状态和模板内容。
+        """
+        cached = cached or {}
+        if not cls.template_dir.exists():
+            logger.warning(f"模板目录不存在: {cls.template_dir}")
+            return []
+
+        changed, dirty, seen = [], False, set()
+        for file_path in sorted(cls.template_dir.glob("*.json")):
+            name = file_path.stem
+            seen.add(name)
+            stat = file_path.stat()
+            known = cls._template_state.get(name)
+            if known is None and name in cached:
+                known = cached[name]
+                cls._templates[name] = known["template"]
+            if (
+                known is not None
+                and known["mtime_ns"] == stat.st_mtime_ns
+                and known["size"] == stat.st_size
+            ):
+                cls._template_state[name] = _file_state(known)
+                continue
 
-        for file_path in template_dir.glob("*.json"):
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    template = json.load(f)
-                template_name = file_path.stem
-                self._templates[template_name] = template
-                logger.debug(f"已加载模板: {template_name}")
+                raw = file_path.read_bytes()
+                digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                state = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "hash": digest,
+                }
+                dirty = True
+                if known is not None and known["hash"] == digest:
+                    cls._template_state[name] = state
+                    continue
+                cls._templates[name] = json.loads(raw)
+                cls._template_state[name] = state
+                changed.append(name)
+                logger.debug(f"已加载模板: {name}")
             except Exception as e:
                 logger.error(f"加载模板失败 {file_path}: {str(e)}")
 
+        for name in [n for n in cls._templates if n not in seen]:
+            cls._templates.pop(name)
+            cls._template_state.pop(name, None)
+            changed.append(name)
+            dirty = True
+            logger.info(f"模板已删除: {name}")
+
+        if dirty or (cached and set(cached) != seen):
+            cls._write_registry_cache()
+        return changed
+
     @classmethod
-    def register(cls, model_name: str = None):
-        """注册Model类的装饰器"""
+    def reload(cls) -> List[str]:
+        """
+        重新检查模板文件，只重新编译内容有变化的模板对应的模型
+
+        已通过 register 返回的模型类不会被替换，create_model/create_many 使用新的模型。
+
+        Returns:
+            内容有变化的模板名
+        """
+        with cls._templates_lock:
+            cls._load_templates()
+            changed = cls._sync_templates()
+            for name in changed:
+                if name in cls._registrations:
+                    cls._build(name, cls._registrations[name])
+        if changed:
+            logger.info(f"模板已重新加载: {', '.join(changed)}")
+            for listener in list(cls._reload_listeners):
+                listener(changed)
+        return changed
+
+    @classmethod
+    def add_reload_listener(cls, listener: Callable[[List[str]], None]) -> None:
+        """注册模板重新加载后的回调，参数为有变化的模板名"""
+        cls._reload_listeners.append(listener)
+
+    @classmethod
+    def _build(cls, name: str, backend: str) -> Type:
+        template = cls._load_templates().get(name.lower(), {})
+        model = MODEL_BACKENDS[backend](name, template)
+        cls._models[name] = model
+        cls._converters[name] = _build_converter(template)
+        return model
+
+    @classmethod
+    def register(cls, model_name: str = None, backend: Optional[str] = None):
+        """
+        注册Model类的装饰器
+
+        Args:
+            model_name: 模型名称，默认为类名小写
+            backend: 模型后端，pydantic 或 slots，默认取 TEST_CONFIG 中的 model_backend
+        """
+        backend = backend or TEST_CONFIG.get("model_backend", "pydantic")
+        if backend not in MODEL_BACKENDS:
+            raise ValueError(f"不支持的模型后端: {backend}")
 
         def decorator(model_class: Type):
             name = model_name or model_class.__name__.lower()
-            template = cls._instance._templates.get(name.lower(), {})
-
-            # 先创建一个自定义基类，包含所需配置
-            class CustomBaseModel(PydanticModel):
-                class Config:
-                    validate_assignment = False
-                    extra = "allow"  # 允许额外字段
-                    arbitrary_types_allowed = True  # 允许任意类型
-
-            # 创建Pydantic模型，使用自定义基类
-            fields = {
-                key: (Optional[type(value)], None) for key, value in template.items()
-            }
-            pydantic_model = create_model(
-                name,
-                **fields,
-                __base__=CustomBaseModel,
-            )
-
-            cls._models[name] = pydantic_model
-            return pydantic_model
+            cls._registrations[name] = backend
+            return cls._build(name, backend)
 
         return decorator
 
+    def get_template(self, name: str) -> dict:
+        """获取指定名称的模板，不存在时返回空字典"""
+        return self._load_templates().get(name.lower(), {})
+
+    def _resolve(self, name: str):
+        """获取模型类和预编译的字段转换函数"""
+        key = name.lower()
+        return self._models.get(key), self._converters.get(key)
+
     def create_model(self, name: str, **kwargs) -> Optional[object]:
         """创建指定名称的模型实例"""
-        model_class = self._models.get(name.lower())
+        model_class, converter = self._resolve(name)
         if model_class is None:
             logger.warning(f"模型类不存在: {name}")
             return None
 
         try:
-            # 处理数据类型转换
-            template = self._templates.get(name.lower(), {})
-            processed_kwargs = {}
-
-            for key, value in kwargs.items():
-                if key in template:
-                    template_value = template[key]
-                    if isinstance(template_value, (dict, list)):
-                        if isinstance(value, str):
-                            try:
-                                processed_kwargs[key] = json.loads(value)
-                            except:
-                                processed_kwargs[key] = value
-                        else:
-                            processed_kwargs[key] = value
-                    else:
-                        processed_kwargs[key] = value
-                else:
-                    # 保留不在模板中的字段
-                    processed_kwargs[key] = value
-
-            # 使用construct方法创建模型实例，跳过验证
-            return model_class.construct(**processed_kwargs)
+            # 使用model_construct创建模型实例，跳过验证
+            return model_class.model_construct(**converter(kwargs))
         except Exception as e:
             logger.error(f"创建模型实例失败 {name}: {str(e)}")
             return None
 
+    def create_many(self, name: str, records: Iterable[Dict]) -> List[object]:
+        """
+        批量创建模型实例，模型类和字段转换函数只查找一次
+
+        Args:
+            name: 模型名称
+            records: 字段字典列表
+
+        Returns:
+            模型实例列表，创建失败的记录对应位置为None
+        """
+        model_class, converter = self._resolve(name)
+        if model_class is None:
+            logger.warning(f"模型类不存在: {name}")
+            return []
+
+        construct = model_class.model_construct
+        instances = []
+        for record in records:
+            try:
+                instances.append(construct(**converter(record)))
+            except Exception as e:
+                logger.error(f"创建模型实例失败 {name}: {str(e)}")
+                instances.append(None)
+        return instances
+
 
 factory = ModelFactory()
+
+
+class TemplateWatcher:
+    """
+    后台线程定期检查模板文件，有变化时调用 ModelFactory.reload
+
+    用法:
+        watcher = TemplateWatcher(interval=2.0).start()
+        ...
+        watcher.stop()
+    """
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> "TemplateWatcher":
+        if self._thread is None:
+            self._thread = Thread(
+                target=self._run, name="template_watcher", daemon=True
+            )
+            self._thread.start()
+            logger.info(f"模板热加载已启用，检查间隔 {self.interval} 秒")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                ModelFactory.reload()
+            except Exception as e:
+                logger.error(f"模板热加载失败: {str(e)}")
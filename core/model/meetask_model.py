@@ -1,11 +1,25 @@
+import asyncio
 import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
 from core.model.rag_model import RAGModel
 from core.service.llm_service import chat_gpt_pure_text, create_messages
 from core.utils.database import DBPool
-from core.common.method import num_tokens_from_string
+from core.utils.async_database import AsyncDBPool
+from core.common.tokenizer import count_tokens
+from config import TEST_CONFIG
 from core.utils.logger import logger
 from constant import meetask_db_info
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson 为可选依赖
+    _json_loads = json.loads
+
 
 meet_ask_his = """请你作为用户模拟与广告营销知识问答系统对话
 历史对话：
@@ -16,6 +30,8 @@ meet_ask_his = """请你作为用户模拟与广告营销知识问答系统对
 请用json格式输出,key为q,value为输出结果
 """
 meetask_db_pool = DBPool()
+_MISSING = object()
+DEFER_TOKEN_COUNT = TEST_CONFIG.get("defer_token_count", False)
 meetask_field_dict = {
     "qa_id": "a.id",
     "answer_first_char_time": "answer_first_char_time",
@@ -53,14 +69,296 @@ meetask_field_dict = {
 }
 meetask_field_sql = ",".join(f"{v} as {k}" for k, v in meetask_field_dict.items())
 meetask_sql_template = """select 
-            {0}
+            {0}, c.qa_id as trace_qa_id
             from (select * from sino_ask_qa 
-            where  id = "{1}") a
+            where id in ({1})) a
             left join sino_ask_qa_process_trace c
             on a.id=c.qa_id
             order by a.create_time desc;"""
 
 
+class MeetAskTraceFetcher:
+    """MeetAsk 日志批量查询器
+
+    收集待查询的 qa_id，每批用一条参数化的 IN 查询取回；日志尚未写入的记录
+    按指数退避重试，超过重试次数后退化为返回未关联到日志的记录。
+    多线程同时调用 get 时由一个线程统一发起查询，其余线程等待结果，查询失败时
+    等待的线程同样抛出该异常。预取后一直未被 get 取走的记录超过 max_cached_rows
+    条时按预取顺序淘汰。事件循环中使用 aget，等待日志写入时不阻塞其它协程。
+    """
+
+    def __init__(
+        self,
+        db_pool=meetask_db_pool,
+        async_db_pool=AsyncDBPool,
+        batch_size: int = 50,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_cached_rows: int = 1000,
+    ):
+        self.db_pool = db_pool
+        self.async_db_pool = async_db_pool
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_cached_rows = max_cached_rows
+        self._cond = threading.Condition()
+        self._pending: "OrderedDict[str, int]" = OrderedDict()  # qa_id -> 已重试次数
+        self._rows: "OrderedDict[str, dict]" = OrderedDict()
+        # 查询失败的 qa_id -> 异常
+        self._errors: "OrderedDict[str, Exception]" = OrderedDict()
+        self._stale: Dict[str, dict] = {}  # 日志尚未写入时查到的记录
+        self._resolving = False
+
+    def prefetch(self, qa_ids: Iterable[str]) -> None:
+        """登记待查询的 qa_id，在下一次 get 时一并查询"""
+        with self._cond:
+            for qa_id in qa_ids:
+                if qa_id and str(qa_id) not in self._rows:
+                    self._errors.pop(str(qa_id), None)
+                    self._pending.setdefault(str(qa_id), 0)
+
+    def get(self, qa_id: str) -> Optional[dict]:
+        """获取 qa_id 对应的记录，未找到时返回 None，查询失败时抛出异常"""
+        qa_id = str(qa_id)
+        with self._cond:
+            if qa_id not in self._rows and qa_id not in self._errors:
+                self._pending.setdefault(qa_id, 0)
+            while qa_id in self._pending:
+                if self._resolving:
+                    self._cond.wait()
+                    continue
+                self._resolving = True
+                self._cond.release()
+                try:
+                    self._resolve(qa_id)
+                finally:
+                    self._cond.acquire()
+                    self._resolving = False
+                    self._cond.notify_all()
+            error = self._errors.pop(qa_id, None)
+            row = self._rows.pop(qa_id, None)
+            self._evict()
+            if error is not None:
+                raise error
+            return row
+
+    async def aget(self, qa_id: str) -> Optional[dict]:
+        """异步获取 qa_id 对应的记录，未找到时返回 None"""
+        qa_id = str(qa_id)
+        sql = self._batch_sql([qa_id])
+        stale = None
+        for attempt in range(self.max_retries + 1):
+            data = await self.async_db_pool.query(sql, (qa_id,))
+            # 结果按创建时间倒序，第一条即最新记录
+            row = next((r for r in data if str(r["qa_id"]) == qa_id), None)
+            if row is not None:
+                if row.pop("trace_qa_id", None) is not None:
+                    return row
+                stale = row
+            if attempt < self.max_retries:
+                delay = min(self.base_delay * 2**attempt, self.max_delay)
+                logger.info(f"日志尚未写入，{delay:.1f} 秒后重试")
+                await asyncio.sleep(delay)
+        logger.warning(f"qa_id: {qa_id} 的日志在重试{self.max_retries}次后仍未就绪")
+        return stale
+
+    def iter_rows(self, qa_ids: List[str]) -> Iterable[dict]:
+        """流式导出大批量 qa_id 的日志，不做就绪等待，也不缓存结果"""
+        for i in range(0, len(qa_ids), self.batch_size):
+            batch = [str(qa_id) for qa_id in qa_ids[i : i + self.batch_size]]
+            for row in self.db_pool.iter_query(self._batch_sql(batch), tuple(batch)):
+                row.pop("trace_qa_id", None)
+                yield row
+
+    @staticmethod
+    def _batch_sql(qa_ids: List[str]) -> str:
+        placeholders = ",".join(["%s"] * len(qa_ids))
+        return meetask_sql_template.format(meetask_field_sql, placeholders)
+
+    def _query_batch(self, qa_ids: List[str]) -> Dict[str, dict]:
+        """一次查询一批 qa_id，每个 qa_id 保留最新的一条记录"""
+        sql = self._batch_sql(qa_ids)
+        try:
+            data = self.db_pool.query(sql, tuple(qa_ids))
+        except Exception as e:
+            logger.error(f"数据库查询失败: {str(e)}")
+            logger.error(f"SQL: {sql}, 参数: {qa_ids}")
+            raise
+
+        rows = {}
+        for row in data:
+            rows.setdefault(str(row["qa_id"]), row)
+        return rows
+
+    def _evict(self) -> None:
+        """淘汰最早预取且一直未被取走的记录和查询异常"""
+        for cache in (self._rows, self._errors):
+            while len(cache) > self.max_cached_rows:
+                qa_id, _ = cache.popitem(last=False)
+                logger.debug(f"qa_id: {qa_id} 的预取结果未被使用，已淘汰")
+
+    def _resolve(self, qa_id: str) -> None:
+        """
+        查询进入时待处理的 qa_id，调用方的 qa_id 就绪、失败或超过重试次数后返回
+
+        之后才登记的 qa_id 和仍需重试的其它 qa_id 留给下一个等待的线程查询，
+        避免调用方被无关 qa_id 的退避重试阻塞。
+        """
+        with self._cond:
+            qa_ids = list(self._pending)
+        while True:
+            with self._cond:
+                qa_ids = [
+                    pending_id for pending_id in qa_ids if pending_id in self._pending
+                ]
+            if qa_id not in qa_ids:
+                return
+
+            try:
+                rows = {}
+                for i in range(0, len(qa_ids), self.batch_size):
+                    rows.update(self._query_batch(qa_ids[i : i + self.batch_size]))
+            except Exception as e:
+                # 由各自的 get 抛出，发起查询的线程和等待的线程得到同一个异常
+                with self._cond:
+                    for pending_id in qa_ids:
+                        self._pending.pop(pending_id, None)
+                        self._errors[pending_id] = e
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                for pending_id in qa_ids:
+                    row = rows.get(pending_id)
+                    if row is not None and row.pop("trace_qa_id", None) is not None:
+                        self._rows[pending_id] = row
+                        self._pending.pop(pending_id, None)
+                        self._stale.pop(pending_id, None)
+                        continue
+                    if row is not None:
+                        self._stale[pending_id] = row
+                    attempts = self._pending[pending_id] + 1
+                    if attempts > self.max_retries:
+                        logger.warning(
+                            f"qa_id: {pending_id} 的日志在重试{self.max_retries}次后仍未就绪"
+                        )
+                        stale = self._stale.pop(pending_id, None)
+                        if stale is not None:
+                            self._rows[pending_id] = stale
+                        self._pending.pop(pending_id, None)
+                    else:
+                        self._pending[pending_id] = attempts
+                self._cond.notify_all()
+                retry_count = self._pending.get(qa_id)
+            if retry_count is None:
+                return
+
+            delay = min(self.base_delay * 2 ** (retry_count - 1), self.max_delay)
+            logger.info(f"日志尚未写入，{delay:.1f} 秒后重试")
+            time.sleep(delay)
+
+
+trace_fetcher = MeetAskTraceFetcher()
+
+
+class MeetAskTraceRecord:
+    """MeetAsk 日志记录
+
+    原始行按字段保存，JSON 字段在首次访问时才解析且只解析一次，解析结果、
+    token 数和派生字段保存在按字段下标排列的紧凑列表中。
+    """
+
+    JSON_FIELDS = (
+        "source",
+        "all_source",
+        "faq1_source",
+        "doc_source",
+        "es_doc_source",
+        "faq2_source",
+        "merged_doc_source",
+        "ranked_doc_source",
+    )
+    _FIELD_INDEX = {name: i for i, name in enumerate(JSON_FIELDS)}
+
+    __slots__ = ("_row", "_decoded", "_tokens", "_sources")
+
+    def __init__(self, row: Dict):
+        self._row = row
+        self._decoded = [_MISSING] * len(self.JSON_FIELDS)
+        self._tokens = [_MISSING] * len(self.JSON_FIELDS)
+        self._sources = None
+
+    def __getitem__(self, key):
+        return self._row[key]
+
+    def __contains__(self, key):
+        return key in self._row
+
+    def get(self, key, default=None):
+        return self._row.get(key, default)
+
+    def items(self):
+        return self._row.items()
+
+    def keys(self):
+        return self._row.keys()
+
+    def decoded(self, key):
+        """返回 JSON 字段解析后的值，空值返回 None"""
+        index = self._FIELD_INDEX[key]
+        value = self._decoded[index]
+        if value is _MISSING:
+            raw = self._row.get(key)
+            value = _json_loads(raw) if raw else None
+            self._decoded[index] = value
+        return value
+
+    def token_count(self, key, defer=False):
+        """返回 JSON 字段原文的 token 数，按需计算且只计算一次"""
+        index = self._FIELD_INDEX[key]
+        count = self._tokens[index]
+        if count is _MISSING:
+            count = count_tokens(self._row.get(key) or "", defer=defer)
+            self._tokens[index] = count
+        return count
+
+    def sources(self, key="source"):
+        """返回 source 类字段派生的 (source_data, google_source, all_source)"""
+        if self._sources is None:
+            self._sources = [None, None]
+        index = 0 if key == "source" else 1
+        if self._sources[index] is None:
+            source = self.decoded(key) or {}
+            source_data = source.get("similarityResults", [])
+            google_source = source.get("googleVectorResults", [])
+            # 过滤掉id为xinmeitibaodian的source
+            all_source = source_data + google_source
+            if all_source:
+                all_source = [
+                    {"id": s.get("id"), "text": s.get("answerOrContent")}
+                    for s in all_source
+                    if s.get("id") != "xinmeitibaodian"
+                ]
+            self._sources[index] = (source_data, google_source, all_source)
+        return self._sources[index]
+
+    @property
+    def all_source(self):
+        """优先使用 all_source 字段，否则由 source 字段派生"""
+        if self._row.get("all_source"):
+            return self.sources("all_source")[2]
+        if self._row.get("source"):
+            return self.sources("source")[2]
+        return []
+
+    @property
+    def source_ids(self):
+        return [s.get("id") for s in self.all_source]
+
+
 class MeetAskModel:
 
     def __init__(
@@ -80,44 +378,44 @@ class MeetAskModel:
         self.target_question = target_question
         self.follow_up_question = None
         self.history = []
+        self._output_result = None
 
     def query_data(self):
-        """查询并处理数据"""
+        """查询数据，字段处理推迟到首次导出时"""
         if not self.qa_id:
             logger.error("qa_id 不能为空")
             raise ValueError("qa_id is required")
 
         logger.info(f"正在查询 qa_id: {self.qa_id} 的日志...")
-        debug_sql = meetask_sql_template.format(meetask_field_sql, self.qa_id)
 
-        try:
-            # 使用优化后的查询方法（带重试机制）
-            data = meetask_db_pool.query(debug_sql)
+        # 批量查询器会合并同时待查询的 qa_id，并等待尚未写入的日志
+        data = trace_fetcher.get(self.qa_id)
 
-            if not data:
-                logger.warning(f"未找到 qa_id 为 {self.qa_id} 的记录")
-                return
+        if not data:
+            logger.warning(f"未找到 qa_id 为 {self.qa_id} 的记录")
+            return
 
-            self.sql_result = data[0]
-            logger.info(f"成功查询到记录，qa_id: {self.qa_id}")
+        self.sql_result = MeetAskTraceRecord(data)
+        self._output_result = None
+        logger.info(f"成功查询到记录，qa_id: {self.qa_id}")
 
-            # 处理查询结果
-            self._process_query_result()
+        self.history.append({"Q": self.query})
+        self.history.append({"A": self.sql_result["answer"]})
 
-        except Exception as e:
-            logger.error(f"数据库查询失败: {str(e)}")
-            logger.error(f"SQL: {debug_sql}")
-            raise
+    @property
+    def output_result(self):
+        """导出结果，首次访问时处理查询结果"""
+        if self._output_result is None:
+            self._process_query_result()
+        return self._output_result
 
     def _process_query_result(self):
         """处理查询结果"""
-        self.output_result = {
+        self._output_result = {
             "Respones": self.response,
             "query": self.query,
             "gt_answer": self.gt_answer,
         }
-        self.history.append({"Q": self.query})
-        self.history.append({"A": self.sql_result["answer"]})
 
         for k, v in self.sql_result.items():
             try:
@@ -128,7 +426,7 @@ class MeetAskModel:
 
     def _process_field(self, key, value):
         """处理单个字段"""
-        self.output_result[key] = value
+        self._output_result[key] = value
 
         if not value:
             return
@@ -171,23 +469,29 @@ class MeetAskModel:
             return True
         return False
 
+    def _doc_fields(self, key, name, parsed=True):
+        """
+        文档类字段的解析结果、token数与长度，开启defer_token_count时token数延迟计算
+
+        parsed 为False时按原始字符串导出(如 merged_doc)；解析成功后都从导出结果中
+        去掉原始JSON字符串列，避免同一内容保存两份
+        """
+        doc = self.sql_result.decoded(key)
+        fields = {
+            name: doc if parsed else self.sql_result[key],
+            f"{name}_token": self.sql_result.token_count(key, defer=DEFER_TOKEN_COUNT),
+            f"{name}_len": len(doc or ""),
+        }
+        self._output_result.pop(key, None)
+        return fields
+
     def _process_source(self, value):
         """处理 source 字段"""
         try:
-            source = json.loads(value)
-            source_data = source.get("similarityResults", [])
-            google_source = source.get("googleVectorResults", [])
-            # 过滤掉id为xinmeitibaodian的source
-            all_source = source_data + google_source
-            if all_source:
-                all_source = [
-                    {"id": s.get("id"), "text": s.get("answerOrContent")}
-                    for s in all_source
-                    if s.get("id") != "xinmeitibaodian"
-                ]
+            source_data, google_source, all_source = self.sql_result.sources("source")
             source_ids = [s.get("id") for s in all_source]
 
-            self.output_result.update(
+            self._output_result.update(
                 {
                     "google_source": google_source,
                     "source": source_data,
@@ -201,88 +505,44 @@ class MeetAskModel:
     def _process_all_source(self, value):
         """处理 source 字段"""
         try:
-            source = json.loads(value)
-            source_data = source.get("similarityResults", [])
-            google_source = source.get("googleVectorResults", [])
-            # 过滤掉id为xinmeitibaodian的source
-            all_source = source_data + google_source
-            if all_source:
-                all_source = [
-                    {"id": s.get("id"), "text": s.get("answerOrContent")}
-                    for s in all_source
-                    if s.get("id") != "xinmeitibaodian"
-                ]
-
-            self.output_result.update({"all_source": all_source})
+            all_source = self.sql_result.sources("all_source")[2]
+            self._output_result.update({"all_source": all_source})
         except Exception as e:
             logger.error(f"处理 source 字段失败: {str(e)}")
 
     def _process_faq1(self, value):
         """处理 faq1_source 字段"""
         try:
-            faq_97 = json.loads(value) if value else None
-            self.output_result.update(
-                {
-                    "faq_97": faq_97,
-                    "faq_97_token": num_tokens_from_string(value or ""),
-                    "faq_97_len": len(faq_97 or ""),
-                }
-            )
+            self._output_result.update(self._doc_fields("faq1_source", "faq_97"))
         except Exception as e:
             logger.error(f"处理 faq1_source 字段失败: {str(e)}")
 
     def _process_doc(self, value):
         """处理 doc_source 字段"""
         try:
-            milvus_doc = json.loads(value) if value else None
-            self.output_result.update(
-                {
-                    "milvus_doc": milvus_doc,
-                    "milvus_doc_token": num_tokens_from_string(value or ""),
-                    "milvus_doc_len": len(milvus_doc or ""),
-                }
-            )
+            self._output_result.update(self._doc_fields("doc_source", "milvus_doc"))
         except Exception as e:
             logger.error(f"处理 doc_source 字段失败: {str(e)}")
 
     def _process_es_doc(self, value):
         """处理 es_doc_source 字段"""
         try:
-            es_doc = json.loads(value) if value else None
-            self.output_result.update(
-                {
-                    "es_doc": es_doc,
-                    "es_doc_token": num_tokens_from_string(value or ""),
-                    "es_doc_len": len(es_doc or ""),
-                }
-            )
+            self._output_result.update(self._doc_fields("es_doc_source", "es_doc"))
         except Exception as e:
             logger.error(f"处理 es_doc_source 字段失败: {str(e)}")
 
     def _process_faq2(self, value):
         """处理 faq2_source 字段"""
         try:
-            faq_93 = json.loads(value) if value else None
-            self.output_result.update(
-                {
-                    "faq_93": faq_93,
-                    "faq_93_token": num_tokens_from_string(value or ""),
-                    "faq_93_len": len(faq_93 or ""),
-                }
-            )
+            self._output_result.update(self._doc_fields("faq2_source", "faq_93"))
         except Exception as e:
             logger.error(f"处理 faq2_source 字段失败: {str(e)}")
 
     def _process_merged_doc(self, value):
         """处理 merged_doc_source 字段"""
         try:
-            merged_doc = json.loads(value) if value else None
-            self.output_result.update(
-                {
-                    "merged_doc": value,
-                    "merged_doc_token": num_tokens_from_string(value or ""),
-                    "merged_doc_len": len(merged_doc or ""),
-                }
+            self._output_result.update(
+                self._doc_fields("merged_doc_source", "merged_doc", parsed=False)
             )
         except Exception as e:
             logger.error(f"处理 merged_doc_source 字段失败: {str(e)}")
@@ -290,14 +550,8 @@ class MeetAskModel:
     def _process_ranked_doc(self, value):
         """处理 ranked_doc_source 字段"""
         try:
-            ranked_doc = json.loads(value) if value else None
-
-            self.output_result.update(
-                {
-                    "ranked_doc": ranked_doc,
-                    "ranked_doc_token": num_tokens_from_string(value or ""),
-                    "ranked_doc_len": len(ranked_doc or ""),
-                }
+            self._output_result.update(
+                self._doc_fields("ranked_doc_source", "ranked_doc")
             )
         except Exception as e:
             logger.error(f"处理 ranked_doc_source 字段失败: {str(e)}")
@@ -320,7 +574,7 @@ class MeetAskModel:
                 doc_first_answer_time_cost or 0
             )
 
-            self.output_result.update(
+            self._output_result.update(
                 {
                     "A4_first_char_cost": a4_first_char_cost,
                     "first_char_cost": first_char_cost,
@@ -0,0 +1,137 @@
+from typing import Any, Dict, Iterator, List, Optional
+
+import core.model.adshub_pre_model  # noqa: F401  注册 AdsHub 模型
+from core.model.factory import factory
+
+# 广告方案的树结构: 模型 -> {子列表字段: 子模型}
+PLAN_SCHEMA: Dict[str, Dict[str, str]] = {
+    "adshubad": {"campaignList": "adshubcampaign"},
+    "adshubcampaign": {"adGroupList": "adshubadgroup"},
+    "adshubadgroup": {},
+}
+
+# 展开为叶子行时各层字段的前缀，为None的层不输出字段
+ROW_PREFIXES: Dict[str, Optional[str]] = {
+    "adshubad": None,
+    "adshubcampaign": "campaign_",
+    "adshubadgroup": "adgroup_",
+}
+
+
+class PlanNode:
+    """
+    广告方案树的节点
+
+    子节点在首次访问时才创建，同一列表的子节点模型用 factory.create_many 批量创建，
+    只遍历叶子行时不会为未访问的分支创建对象；子列表字段为JSON字符串时由模型的
+    字段转换函数解析。
+    """
+
+    __slots__ = ("name", "data", "_model", "_children")
+
+    def __init__(self, name: str, data: Dict[str, Any]):
+        self.name = name
+        self.data = data
+        self._model = None
+        self._children: Dict[str, List["PlanNode"]] = {}
+
+    @property
+    def model(self):
+        """节点对应的模型实例"""
+        if self._model is None:
+            self._model = factory.create_model(self.name, **self.data)
+        return self._model
+
+    @property
+    def child_fields(self) -> Dict[str, str]:
+        return PLAN_SCHEMA.get(self.name, {})
+
+    def children(self, field: Optional[str] = None) -> List["PlanNode"]:
+        """
+        子节点列表
+
+        Args:
+            field: 子列表字段，默认为该层唯一的子列表字段
+        """
+        if field is None:
+            if not self.child_fields:
+                return []
+            field = next(iter(self.child_fields))
+        nodes = self._children.get(field)
+        if nodes is None:
+            child_name = self.child_fields[field]
+            items = getattr(self.model, field, None) or []
+            nodes = [
+                PlanNode(child_name, item) for item in items if isinstance(item, dict)
+            ]
+            models = factory.create_many(child_name, (node.data for node in nodes))
+            for node, model in zip(nodes, models):
+                node._model = model
+            self._children[field] = nodes
+        return nodes
+
+    def fields(self) -> Dict[str, Any]:
+        """节点自身的模板字段，不含子列表字段和模板之外的额外字段"""
+        data = self.model.to_dict(include_extra=False)
+        for field in self.child_fields:
+            data.pop(field, None)
+        return data
+
+    def iter_leaf_rows(self, base: Optional[Dict[str, Any]] = None) -> Iterator[Dict]:
+        """
+        深度优先遍历，为每个叶子节点输出一行，包含从根到叶子各层带前缀的字段
+
+        每层的前缀字段只计算一次，由该层下所有叶子行共享；没有子节点的中间层不输出行。
+
+        Args:
+            base: 每行开头的公共字段，例如用例和请求字段
+        """
+        row = dict(base) if base else {}
+        prefix = ROW_PREFIXES.get(self.name)
+        if prefix is not None:
+            row.update({f"{prefix}{k}": v for k, v in self.fields().items()})
+        if not self.child_fields:
+            yield row
+            return
+        for field in self.child_fields:
+            for child in self.children(field):
+                yield from child.iter_leaf_rows(row)
+
+
+class PlanTree:
+    """
+    一次广告方案结果：方案详情树和生成方案时的请求字段
+
+    用法:
+        tree = PlanTree(plan_detail, request_fields=adrequest)
+        for row in tree.iter_leaf_rows(base=case_dict): ...
+    """
+
+    def __init__(
+        self, plan_detail: Dict[str, Any], request_fields: Optional[Dict] = None
+    ):
+        self.root = PlanNode("adshubad", plan_detail or {})
+        self.request_fields = request_fields or {}
+        self._request = None
+
+    @property
+    def request(self):
+        """请求字段对应的 adshubrequest 模型实例"""
+        if self._request is None:
+            self._request = factory.create_model("adshubrequest", **self.request_fields)
+        return self._request
+
+    def request_row(self) -> Dict[str, Any]:
+        """带 request_ 前缀、经 adshubrequest 模型解析的请求字段，只包含实际返回的字段"""
+        if not self.request_fields:
+            return {}
+        data = self.request.to_dict() if self.request is not None else {}
+        return {f"request_{k}": data.get(k, v) for k, v in self.request_fields.items()}
+
+    @property
+    def campaigns(self) -> List[PlanNode]:
+        return self.root.children("campaignList")
+
+    def iter_leaf_rows(self, base: Optional[Dict[str, Any]] = None) -> Iterator[Dict]:
+        """按广告组展开的行：base、request_*、campaign_*、adgroup_*"""
+        return self.root.iter_leaf_rows({**(base or {}), **self.request_row()})
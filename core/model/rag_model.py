@@ -2,8 +2,6 @@ import json
 import os
 from pathlib import Path
 
-import pandas as pd
-
 
 class RAGModel:
     def __init__(
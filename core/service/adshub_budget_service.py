@@ -1,9 +1,8 @@
 import datetime
 import requests
-import json
 from func_timeout import func_set_timeout
 
-from core.utils import logger
+from core.utils.logger import LazyJson, logger, payload_logger
 
 
 @func_set_timeout(180)
@@ -17,11 +16,12 @@ def media_recommendation(data, trace_id, span_id):
         "X-B3-ParentSpanId": "8d68107ef74ced2b",
         "X-B3-Sampled": "8d68107ef74ced2b",
     }
-    logger.info(f"请求服务{url}:请求体:\n{json.dumps(data, ensure_ascii=False)}")
+    logger.info("请求服务%s", url)
+    payload_logger.info("请求体:\n%s", LazyJson(data))
     response = requests.request("POST", url, headers=headers, json=data)
     try:
         result = response.json()["result"]
-        logger.info(f"服务返回：{json.dumps(result, ensure_ascii=False)}")
+        payload_logger.info("服务返回：%s", LazyJson(result))
     except:
         result = None
         logger.warning(f"服务异常：{response.status_code}")
@@ -41,11 +41,12 @@ def budget_allocator(data, trace_id, span_id):
         "X-B3-ParentSpanId": "8d68107ef74ced2b",
         "X-B3-Sampled": "8d68107ef74ced2b",
     }
-    logger.info(f"请求服务{url}:请求体:\n{json.dumps(data, ensure_ascii=False)}")
+    logger.info("请求服务%s", url)
+    payload_logger.info("请求体:\n%s", LazyJson(data))
     response = requests.request("POST", url, headers=headers, json=data)
     try:
         result = response.json()["result"]
-        logger.info(f"服务返回：{result}")
+        payload_logger.info("服务返回：%s", LazyJson(result))
     except:
         result = None
         logger.warning(f"服务异常：{response.status_code}")
@@ -65,11 +66,12 @@ def media_budget_recommendation(data, trace_id, span_id):
         "X-B3-ParentSpanId": "8d68107ef74ced2b",
         "X-B3-Sampled": "8d68107ef74ced2b",
     }
-    logger.info(f"请求服务{url}:请求体:\n{json.dumps(data, ensure_ascii=False)}")
+    logger.info("请求服务%s", url)
+    payload_logger.info("请求体:\n%s", LazyJson(data))
     response = requests.request("POST", url, headers=headers, json=data)
     try:
         result = response.json()["result"]
-        logger.info(f"服务返回：{result}")
+        payload_logger.info("服务返回：%s", LazyJson(result))
     except:
         result = None
         logger.warning(f"服务异常：{response.status_code}")
@@ -4,11 +4,12 @@ import re
 import json
 import requests
 import os
+from functools import lru_cache
 from requests.exceptions import ChunkedEncodingError, RequestException
 from typing import Dict, Optional, Tuple, Any
 
-from core.utils.logger import logger
-from constant import AI_TURNING_URL, AI_ADSHUB_URL
+from core.utils.logger import LazyJson, logger, payload_logger
+from constant import AI_TURNING_URL, AI_ADSHUB_URL, AI_GATEWAY_URL
 from core.common.method import retry_decorator
 
 
@@ -75,7 +76,7 @@ def adshub_ask_question_stream(
         target_items = re.findall(r'(?<="content":)"[\s\S].*?"', response_text)
         content = "".join(str(x).strip().replace('"', "") for x in target_items[2:])
         answer = content.replace("\\n", "\n")
-        logger.info(f"流式接受完毕:\n{content}")
+        payload_logger.info("流式接受完毕:\n%s", content)
 
         try:
             conversation_id = (
@@ -125,13 +126,13 @@ def adshub_ad_generate_v2(data: Dict) -> Dict:
         "accept": "application/json",
         "Content-Type": "application/json",
     }
-    logger.debug(json.dumps(data, ensure_ascii=False))
+    payload_logger.debug("请求体：%s", LazyJson(data))
 
     try:
         response = requests.request("POST", url, headers=headers, json=data)
         response.raise_for_status()
         result = response.json()["result"]
-        logger.info(f"接口返回：{result}")
+        payload_logger.info("接口返回：%s", LazyJson(result))
         return {"result": result, "cost": response.elapsed.total_seconds()}
     except Exception as e:
         logger.error(f"请求失败: {str(e)}")
@@ -147,7 +148,7 @@ def adshub_ad_generate(data: str) -> Tuple[Optional[Dict], float]:
         "accept": "application/json",
         "Content-Type": "application/json",
     }
-    logger.debug(json.dumps(data, ensure_ascii=False))
+    payload_logger.debug("请求体：%s", LazyJson(data))
 
     try:
         response = requests.request(
@@ -155,7 +156,7 @@ def adshub_ad_generate(data: str) -> Tuple[Optional[Dict], float]:
         )
         response.raise_for_status()
         result = response.json()["result"]
-        logger.info(f"接口返回：{result}")
+        payload_logger.info("接口返回：%s", LazyJson(result))
         return result, response.elapsed.total_seconds()
     except Exception as e:
         logger.error(f"请求失败: {str(e)}")
@@ -173,15 +174,16 @@ def adshub_daily_metric_predict(data):
     response = requests.request("POST", url, headers=headers, json=data)
     try:
         result = response.json()["result"]
-        logger.info(f"接口返回：{result}")
+        payload_logger.info("接口返回：%s", LazyJson(result))
     except:
         result = None
         logger.info(f"接口返回：{response.status_code}")
     return result, response.elapsed.total_seconds()
 
 
+@lru_cache(maxsize=None)
 def get_token() -> Optional[str]:
-    """获取token"""
+    """获取token，首次调用时读取配置文件"""
     try:
         with open(
             os.path.join(os.path.dirname(__file__), "../../config/token.json")
@@ -193,9 +195,6 @@ def get_token() -> Optional[str]:
         return None
 
 
-token = get_token()
-
-
 @retry_decorator(max_retries=3, delay=1)
 def adshub_ad_generate_backend(
     conversation_id: str,
@@ -204,12 +203,12 @@ def adshub_ad_generate_backend(
     span_id: Optional[str] = None,
 ) -> Dict:
     """后端广告生成接口"""
-    url = f"https://test-ai-api-gateway.meetsocial.cn/stream/sino-ai-adshub/conversation/generate"
+    url = f"{AI_GATEWAY_URL}/stream/sino-ai-adshub/conversation/generate"
     headers = {
         "accept": "*/*",
         "Content-Type": "application/json",
         "Agent-Code": _agent_code,
-        "x-sino-jwt": token,
+        "x-sino-jwt": get_token(),
         "x-sino-language": "zh-CN",
     }
 
@@ -223,19 +222,19 @@ def adshub_ad_generate_backend(
             }
         )
 
-    logger.debug(json.dumps(conversation_id, ensure_ascii=False))
+    logger.debug("conversation_id：%s", conversation_id)
     payload = json.dumps({"conversationId": conversation_id})
 
     try:
         response = requests.post(url, headers=headers, data=payload)
         response.raise_for_status()
         result = response.json()["result"]
-        logger.info(f"接口返回：{result}")
+        payload_logger.info("接口返回：%s", LazyJson(result))
         return result
     except Exception as e:
         if response.status_code == 200:
             result = response.json()
-            logger.error(f"接口返回：{result}")
+            logger.error("接口返回：%s", result)
             return result
         logger.error(f"接口请求失败：{response.status_code}")
         return {}
@@ -249,12 +248,12 @@ def adshub_ad_detail_backend(
     span_id: Optional[str] = None,
 ) -> Dict:
     """获取广告详情接口"""
-    url = f"https://test-ai-api-gateway.meetsocial.cn/stream/sino-ai-adshub/plan/planInfo?planId={plan_id}"
+    url = f"{AI_GATEWAY_URL}/stream/sino-ai-adshub/plan/planInfo?planId={plan_id}"
     headers = {
         "accept": "*/*",
         "Content-Type": "application/json",
         "Agent-Code": _agent_code,
-        "x-sino-jwt": token,
+        "x-sino-jwt": get_token(),
         "x-sino-language": "zh-CN",
     }
 
@@ -284,7 +283,7 @@ def adshub_ad_detail_backend(
         try:
             result = response.json()["result"]
             if result["planStatus"] == "SUCCESS":
-                logger.info(f"接口返回：{result}")
+                payload_logger.info("接口返回：%s", LazyJson(result))
                 status = 1
             elif result["planStatus"] == "PLAN_FAIL":
                 logger.error("生成方案失败")
@@ -294,7 +293,7 @@ def adshub_ad_detail_backend(
         except:
             if response.status_code == 200:
                 result = response.json()["result"]
-                logger.error(f"接口返回：{result}")
+                logger.error("接口返回：%s", result)
             else:
                 result = {}
                 logger.error(f"接口请求失败：{response.status_code}")
@@ -7,7 +7,7 @@ import requests
 from func_timeout import func_set_timeout
 
 from core.common.method import receive_stream_content
-from core.utils.logger import logger
+from core.utils.logger import logger, payload_logger
 from constant import MEETASK_URL
 
 
@@ -24,5 +24,5 @@ def meetask_stream_ask_question(query, user):
     data = json.loads(content).get("result", {})
     answer = data.get("answer", "")
     qa_id = data.get("qaId", "")
-    logger.info(f"QAID:{qa_id}|MeetAsk回答：{answer}")
+    payload_logger.info("QAID:%s|MeetAsk回答：%s", qa_id, answer)
     return {"response": answer, "qa_id": qa_id}
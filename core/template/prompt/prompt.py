@@ -218,3 +218,30 @@ adshub投前Agent 是广告投放智能引导客服系统,
 操作系统(ios或android),
 关键指标期望(CPI、CPM、CTR、CVR)
 """
+
+rag_joint_check_prompt = """I have a list of claims that made by a language model to a question, please help me for checking whether the claims can be entailed according to the provided reference which is related to the question.
+Each of the claims is numbered and represented as a triplet formatted with ("subject", "predicate", "object") or as a sentence.
+
+If the claim is supported by the reference, answer 'Entailment'.
+If the claim is contradicted with the reference, answer 'Contradiction'.
+If the reference does not contain information to verify the claim, answer 'Neutral'.
+
+Please DO NOT use your own knowledge for the judgement, just compare the reference and the claims to get the answer.
+
+### Question:
+[QUESTION]
+
+### Reference:
+[REFERENCE]
+
+### Claims:
+[CLAIMS]
+
+Your answer should be one line per claim, in the same order, formatted as "<number>. <label>", and each label is a single word in ['Entailment', 'Neutral', 'Contradiction'], for example:
+
+1. Entailment
+2. Neutral
+3. Contradiction
+
+DO NOT add explanations or you own reasoning to the output, only output the label list.
+"""
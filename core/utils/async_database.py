@@ -0,0 +1,168 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Sequence
+
+from config import DB_CONFIG
+from core.utils.database import pool_settings
+from core.utils.logger import logger
+
+try:
+    import aiomysql
+except ImportError:  # aiomysql 仅在使用异步连接池时需要
+    aiomysql = None
+
+
+class AsyncDBPool:
+    """异步数据库连接池，接口与 DBPool 保持一致
+
+    aiomysql 的连接池绑定在创建它的事件循环上，因此按事件循环分别创建连接池，
+    同一事件循环内的查询共用一个连接池。创建连接池时在该事件循环中登记一个关闭任务，
+    asyncio.run 等在退出前取消剩余任务时随之关闭连接池，不会遗留连接和失效的事件循环。
+    同时存在的多个事件循环共用 pool_settings(kind="async") 分配的异步连接数。
+    """
+
+    _pools: Dict[asyncio.AbstractEventLoop, Any] = {}
+    _locks: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+    _closers: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+    @classmethod
+    async def get_pool(cls):
+        """获取或创建当前事件循环的连接池"""
+        if aiomysql is None:
+            raise ImportError("异步数据库访问需要安装 aiomysql")
+        loop = asyncio.get_running_loop()
+        lock = cls._locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            if loop not in cls._pools:
+                settings = pool_settings(kind="async")
+                in_use = sum(pool.maxsize for pool in cls._pools.values())
+                max_connections = settings["maxconnections"] - in_use
+                if max_connections < 1:
+                    raise RuntimeError(
+                        f"异步连接已被 {len(cls._pools)} 个事件循环的连接池占满"
+                    )
+                cls._pools[loop] = await aiomysql.create_pool(
+                    # 初始化时创建的连接数
+                    minsize=min(settings["mincached"], max_connections),
+                    maxsize=max_connections,  # 剩余的异步连接数
+                    pool_recycle=3600,  # 连接最长复用时间(秒)
+                    host=DB_CONFIG["host"],
+                    port=DB_CONFIG["port"],
+                    user=DB_CONFIG["user"],
+                    password=DB_CONFIG["password"],
+                    db=DB_CONFIG["database"],
+                    charset=DB_CONFIG["charset"],
+                    cursorclass=aiomysql.DictCursor,
+                    autocommit=False,
+                )
+                cls._closers[loop] = loop.create_task(cls._close_on_shutdown(loop))
+                logger.info("异步数据库连接池初始化成功")
+        return cls._pools[loop]
+
+    @classmethod
+    async def _close_on_shutdown(cls, loop: asyncio.AbstractEventLoop) -> None:
+        """一直等待到事件循环退出时被取消，随后关闭该事件循环的连接池"""
+        try:
+            await loop.create_future()
+        except asyncio.CancelledError:
+            cls._closers.pop(loop, None)
+            await cls._close_pool(loop, terminate=True)
+            raise
+
+    @classmethod
+    async def _close_pool(
+        cls, loop: asyncio.AbstractEventLoop, terminate: bool = False
+    ) -> None:
+        pool = cls._pools.pop(loop, None)
+        cls._locks.pop(loop, None)
+        if pool is not None:
+            # 事件循环退出时其它任务已被取消，直接关闭仍被占用的连接
+            if terminate:
+                pool.terminate()
+            else:
+                pool.close()
+            await pool.wait_closed()
+            logger.info("异步数据库连接池已关闭")
+
+    @classmethod
+    async def query(cls, sql, params=None):
+        """执行查询，params为参数化查询的参数"""
+        pool = await cls.get_pool()
+        try:
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, params)
+                    result = await cursor.fetchall()
+            logger.info(f"查询返回 {len(result)} 条记录")
+            return list(result)
+        except Exception as e:
+            logger.error(f"查询执行失败: {str(e)}")
+            raise
+
+    @classmethod
+    async def iter_query(
+        cls, sql, params=None, batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """流式查询，使用非缓冲的服务端游标逐批读取
+
+        连接在迭代结束或异步生成器被关闭时归还连接池
+        """
+        pool = await cls.get_pool()
+        count = 0
+        try:
+            async with pool.acquire() as conn:
+                async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+                    await cursor.execute(sql, params)
+                    while True:
+                        rows = await cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        count += len(rows)
+                        for row in rows:
+                            yield row
+            logger.info(f"流式查询返回 {count} 条记录")
+        except Exception as e:
+            logger.error(f"流式查询执行失败: {str(e)}")
+            raise
+
+    @classmethod
+    async def executemany(cls, sql, seq_params: Sequence[Sequence[Any]]) -> int:
+        """批量执行参数化更新，在一个事务内提交"""
+        pool = await cls.get_pool()
+        async with pool.acquire() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.executemany(sql, seq_params)
+                    affected = cursor.rowcount
+                await conn.commit()
+                logger.info(f"批量更新影响 {affected} 行")
+                return affected
+            except Exception as e:
+                await conn.rollback()
+                logger.error(f"批量更新失败: {str(e)}")
+                raise
+
+    @classmethod
+    async def execute(cls, sql, params=None):
+        """执行更新"""
+        pool = await cls.get_pool()
+        async with pool.acquire() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, params or ())
+                    affected = cursor.rowcount
+                await conn.commit()
+                logger.info(f"执行更新影响 {affected} 行")
+                return affected
+            except Exception as e:
+                await conn.rollback()
+                logger.error(f"执行更新失败: {str(e)}")
+                raise
+
+    @classmethod
+    async def close(cls):
+        """关闭当前事件循环的连接池"""
+        loop = asyncio.get_running_loop()
+        closer = cls._closers.pop(loop, None)
+        if closer is not None:
+            closer.cancel()
+        await cls._close_pool(loop)
@@ -0,0 +1,307 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from core.utils.database import DBPool
+from core.utils.logger import logger
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMiss(Exception):
+    """回放模式下没有找到匹配的录制记录"""
+
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    """将数据库返回值转换为可JSON序列化的带类型标记的值"""
+    if isinstance(value, datetime):
+        return {"__type__": "datetime", "value": value.isoformat()}
+    if isinstance(value, date):
+        return {"__type__": "date", "value": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"__type__": "timedelta", "value": value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {"__type__": "decimal", "value": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"__type__": "bytes", "value": base64.b64encode(value).decode()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if not isinstance(value, dict) or "__type__" not in value:
+        return value
+    type_name, raw = value["__type__"], value["value"]
+    if type_name == "datetime":
+        return datetime.fromisoformat(raw)
+    if type_name == "date":
+        return date.fromisoformat(raw)
+    if type_name == "timedelta":
+        return timedelta(seconds=raw)
+    if type_name == "decimal":
+        return Decimal(raw)
+    return base64.b64decode(raw)
+
+
+def _body_bytes(kwargs: Dict) -> bytes:
+    """取出请求体用于匹配，json参数按排序后的键序列化"""
+    if kwargs.get("json") is not None:
+        return json.dumps(kwargs["json"], sort_keys=True, ensure_ascii=False).encode()
+    data = kwargs.get("data")
+    if data is None:
+        return b""
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode()
+    return json.dumps(data, sort_keys=True, ensure_ascii=False).encode()
+
+
+class _ReplayStream:
+    """回放的响应体，按录制时的时间间隔(乘以缩放系数)逐块返回"""
+
+    def __init__(self, chunks: List[List], latency_scale: float):
+        self.chunks = chunks
+        self.latency_scale = latency_scale
+
+    def stream(self, chunk_size=None, decode_content=True) -> Iterator[bytes]:
+        start = time.perf_counter()
+        for offset, data in self.chunks:
+            if self.latency_scale:
+                wait = offset * self.latency_scale - (time.perf_counter() - start)
+                if wait > 0:
+                    time.sleep(wait)
+            yield base64.b64decode(data)
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class Cassette:
+    """
+    HTTP 与数据库交互的录制/回放
+
+    录制模式下透传真实请求，记录 HTTP 响应(含流式分块的到达时间)和 DBPool 查询结果；
+    回放模式下按请求内容依次返回录制结果，latency_scale 为 0 时不等待，
+    为 1 时还原录制时的耗时。xdist 下每个 worker 写入各自的文件，回放时合并读取。
+    """
+
+    def __init__(
+        self, cassette_dir: Path, mode: str = REPLAY, latency_scale: float = 0.0
+    ):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"不支持的cassette模式: {mode}")
+        self.cassette_dir = Path(cassette_dir)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = Lock()
+        self._http: Dict[str, List[Dict]] = {}
+        self._db: Dict[str, List[Dict]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._originals: Dict[str, Any] = {}
+
+    @property
+    def _cassette_file(self) -> Path:
+        worker_id = os.environ.get("PYTEST_XDIST_WORKER", "main")
+        return self.cassette_dir / f"cassette_{worker_id}.json"
+
+    def _load(self) -> None:
+        for file_path in sorted(self.cassette_dir.glob("cassette_*.json")):
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, entries in data.get("http", {}).items():
+                self._http.setdefault(key, []).extend(entries)
+            for key, entries in data.get("db", {}).items():
+                self._db.setdefault(key, []).extend(entries)
+        logger.info(
+            f"已加载cassette: {len(self._http)} 个HTTP请求, {len(self._db)} 个数据库查询"
+        )
+
+    def save(self) -> Optional[Path]:
+        """录制模式下将记录写入文件"""
+        if self.mode != RECORD or not (self._http or self._db):
+            return None
+        self.cassette_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {"http": self._http, "db": self._db}
+            with open(self._cassette_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        logger.info(f"cassette已保存: {self._cassette_file}")
+        return self._cassette_file
+
+    def _next_entry(self, table: Dict[str, List[Dict]], key: str, desc: str) -> Dict:
+        """同一请求按录制顺序依次返回，超出录制次数后重复返回最后一次"""
+        with self._lock:
+            entries = table.get(key)
+            if not entries:
+                raise CassetteMiss(f"cassette中没有匹配的记录: {desc}")
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    @staticmethod
+    def http_key(method: str, url: str, body: bytes) -> str:
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        return f"{method.upper()} {url} {digest}"
+
+    @staticmethod
+    def db_key(sql: str, params: Any) -> str:
+        raw = json.dumps([sql, params], ensure_ascii=False, default=str)
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def _record_http(
+        self, key: str, response: requests.Response, start: float, stream: bool
+    ):
+        entry = {
+            "status_code": response.status_code,
+            "reason": response.reason,
+            "headers": dict(response.headers),
+            "encoding": response.encoding,
+            "chunks": [],
+        }
+        with self._lock:
+            self._http.setdefault(key, []).append(entry)
+
+        if not stream:
+            entry["chunks"].append(
+                [
+                    time.perf_counter() - start,
+                    base64.b64encode(response.content).decode(),
+                ]
+            )
+            return response
+
+        iter_content = response.iter_content
+
+        def recording_iter_content(chunk_size=1, decode_unicode=False):
+            # 记录每块数据相对请求发出时刻的到达时间，回放时据此还原首字延迟
+            for chunk in iter_content(chunk_size=chunk_size, decode_unicode=False):
+                entry["chunks"].append(
+                    [time.perf_counter() - start, base64.b64encode(chunk).decode()]
+                )
+                yield (
+                    chunk.decode(response.encoding or "utf-8")
+                    if decode_unicode
+                    else chunk
+                )
+
+        response.iter_content = recording_iter_content
+        return response
+
+    def _replay_http(self, key: str, method: str, url: str) -> requests.Response:
+        entry = self._next_entry(self._http, key, f"{method} {url}")
+        response = requests.Response()
+        response.status_code = entry["status_code"]
+        response.reason = entry.get("reason")
+        response.headers.update(entry["headers"])
+        response.encoding = entry["encoding"]
+        response.url = url
+        response.raw = _ReplayStream(entry["chunks"], self.latency_scale)
+        return response
+
+    def _patched_request(self, session, method, url, *args, **kwargs):
+        body = _body_bytes(kwargs)
+        if kwargs.get("params"):
+            body += json.dumps(kwargs["params"], sort_keys=True, default=str).encode()
+        key = self.http_key(method, url, body)
+        if self.mode == REPLAY:
+            return self._replay_http(key, method, url)
+        start = time.perf_counter()
+        response = self._originals["http"](session, method, url, *args, **kwargs)
+        return self._record_http(key, response, start, bool(kwargs.get("stream")))
+
+    def _patched_query(self, sql, params=None):
+        key = self.db_key(sql, params)
+        if self.mode == REPLAY:
+            entry = self._next_entry(self._db, key, sql.strip()[:80])
+            if self.latency_scale:
+                time.sleep(entry["latency"] * self.latency_scale)
+            return [
+                {k: _decode_value(v) for k, v in row.items()} for row in entry["rows"]
+            ]
+
+        start = time.perf_counter()
+        rows = self._originals["query"](sql, params)
+        entry = {
+            "latency": time.perf_counter() - start,
+            "rows": [{k: _encode_value(v) for k, v in row.items()} for row in rows],
+        }
+        with self._lock:
+            self._db.setdefault(key, []).append(entry)
+        return rows
+
+    def _patched_iter_query(self, sql, params=None, batch_size: int = 1000):
+        # 流式查询按一次完整查询录制和回放
+        yield from self._patched_query(sql, params)
+
+    def start(self) -> "Cassette":
+        """替换 requests 和 DBPool 的请求入口"""
+        if self._originals:
+            return self
+        if self.mode == REPLAY:
+            self._load()
+        cassette = self
+        self._originals = {
+            "http": requests.Session.request,
+            "query": DBPool.query,
+            # 保留原始描述符，停止时原样还原
+            "query_attr": DBPool.__dict__["query"],
+            "iter_query_attr": DBPool.__dict__["iter_query"],
+        }
+
+        def request(session, method, url, *args, **kwargs):
+            return cassette._patched_request(session, method, url, *args, **kwargs)
+
+        requests.Session.request = request
+        DBPool.query = staticmethod(self._patched_query)
+        DBPool.iter_query = staticmethod(self._patched_iter_query)
+        logger.info(f"cassette已启用: 模式={self.mode}, 目录={self.cassette_dir}")
+        return self
+
+    def stop(self) -> None:
+        """还原请求入口，录制模式下保存记录"""
+        if not self._originals:
+            return
+        requests.Session.request = self._originals["http"]
+        DBPool.query = self._originals["query_attr"]
+        DBPool.iter_query = self._originals["iter_query_attr"]
+        self._originals = {}
+        self.save()
+
+    def __enter__(self) -> "Cassette":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    """
+    根据环境变量创建 cassette，未设置 CASSETTE_MODE 时返回 None
+
+    CASSETTE_MODE: record / replay
+    CASSETTE_DIR: cassette 文件目录
+    CASSETTE_LATENCY_SCALE: 回放耗时缩放系数，0 表示不等待
+    """
+    mode = os.environ.get("CASSETTE_MODE")
+    if not mode:
+        return None
+    cassette_dir = os.environ.get(
+        "CASSETTE_DIR", str(Path(__file__).parents[2] / "tests" / "cassettes")
+    )
+    latency_scale = float(os.environ.get("CASSETTE_LATENCY_SCALE", "0"))
+    return Cassette(cassette_dir, mode=mode.lower(), latency_scale=latency_scale)
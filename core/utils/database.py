@@ -1,29 +1,149 @@
+import bisect
+import json
+import os
+import time
 import pymysql
-from config import DB_CONFIG
+from config import DB_CONFIG, DB_POOL_CONFIG
+from contextlib import contextmanager
 from dbutils.pooled_db import PooledDB
+from pathlib import Path
 from threading import Lock
+from typing import Any, Dict, Iterator, Optional, Sequence
 from core.utils.logger import logger
 
 
+def pool_settings(
+    worker_count: Optional[int] = None, kind: str = "sync"
+) -> Dict[str, Any]:
+    """
+    按 xdist worker 数计算当前进程的连接池参数
+
+    连接总预算在所有worker间平分，单个worker不超过 max_connections_per_worker；
+    每个worker的连接再按 async_connection_ratio 分给同步和异步连接池，两者合计不超过
+    该worker的份额。worker数超过连接总预算时无法分配，抛出 ValueError。
+
+    Args:
+        worker_count: worker数量，默认读取 PYTEST_XDIST_WORKER_COUNT
+        kind: sync 为 DBPool 的参数，async 为 AsyncDBPool 的参数
+
+    Returns:
+        PooledDB 的连接池参数，maxconnections 为该类连接池可用的连接数
+    """
+    if worker_count is None:
+        worker_count = int(os.environ.get("PYTEST_XDIST_WORKER_COUNT") or 1)
+    worker_count = max(worker_count, 1)
+    per_worker = min(
+        DB_POOL_CONFIG["max_connections_per_worker"],
+        DB_POOL_CONFIG["total_connections"] // worker_count,
+    )
+    if per_worker < 1:
+        raise ValueError(
+            f"连接总预算 {DB_POOL_CONFIG['total_connections']} "
+            f"不足以分配给 {worker_count} 个worker"
+        )
+
+    ratio = DB_POOL_CONFIG.get("async_connection_ratio", 0)
+    async_connections = (
+        max(1, int(per_worker * ratio)) if ratio > 0 and per_worker > 1 else 0
+    )
+    if kind == "async":
+        if not async_connections:
+            raise ValueError(f"每个worker只有 {per_worker} 个连接，未分配给异步连接池")
+        max_connections = async_connections
+    else:
+        max_connections = per_worker - async_connections
+    return {
+        "maxconnections": max_connections,
+        "mincached": min(DB_POOL_CONFIG["mincached"], max_connections),
+        "maxcached": min(DB_POOL_CONFIG["maxcached"], max_connections),
+        "maxshared": min(DB_POOL_CONFIG["maxshared"], max_connections),
+        "blocking": DB_POOL_CONFIG["blocking"],
+        "ping": DB_POOL_CONFIG["ping"],
+    }
+
+
+class PoolStats:
+    """连接池监控数据：取连接等待时间、活跃/空闲连接数和查询耗时分布"""
+
+    # 耗时直方图的桶上界(毫秒)，最后一个桶收纳所有更慢的请求
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.active = 0
+            self.peak_active = 0
+            self.checkouts = 0
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+            self.checkout_wait_hist = [0] * (len(self.BUCKETS_MS) + 1)
+            self.query_count = 0
+            self.query_errors = 0
+            self.query_latency_hist = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def _bucket(self, seconds: float) -> int:
+        return bisect.bisect_left(self.BUCKETS_MS, seconds * 1000)
+
+    def on_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            self.checkouts += 1
+            self.checkout_wait_total += wait
+            self.checkout_wait_max = max(self.checkout_wait_max, wait)
+            self.checkout_wait_hist[self._bucket(wait)] += 1
+
+    def on_release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def on_query(self, latency: float, failed: bool = False) -> None:
+        with self._lock:
+            self.query_count += 1
+            self.query_errors += int(failed)
+            self.query_latency_hist[self._bucket(latency)] += 1
+
+    def snapshot(self, pool=None) -> Dict[str, Any]:
+        """返回当前监控数据，pool 为 PooledDB 时附带空闲连接数"""
+        labels = [f"<={b}ms" for b in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            return {
+                "worker": os.environ.get("PYTEST_XDIST_WORKER", "main"),
+                "active": self.active,
+                "peak_active": self.peak_active,
+                "idle": len(getattr(pool, "_idle_cache", ()) or ()),
+                "checkouts": self.checkouts,
+                "checkout_wait_avg_ms": (
+                    round(self.checkout_wait_total / self.checkouts * 1000, 3)
+                    if self.checkouts
+                    else 0.0
+                ),
+                "checkout_wait_max_ms": round(self.checkout_wait_max * 1000, 3),
+                "checkout_wait_hist": dict(zip(labels, self.checkout_wait_hist)),
+                "query_count": self.query_count,
+                "query_errors": self.query_errors,
+                "query_latency_hist": dict(zip(labels, self.query_latency_hist)),
+            }
+
+
 class DBPool:
     _pool = None
     _lock = Lock()
+    stats = PoolStats()
 
     @classmethod
     def get_pool(cls):
-        """获取或创建连接池"""
+        """获取或创建连接池，连接数按worker数量从全局预算中分配"""
         with cls._lock:
             if cls._pool is None:
+                settings = pool_settings()
                 cls._pool = PooledDB(
                     creator=pymysql,
-                    maxconnections=10,  # 最大连接数
-                    mincached=2,  # 初始化时创建的空闲连接数
-                    maxcached=5,  # 连接池最大空闲连接数
-                    maxshared=3,  # 共享连接数
-                    blocking=True,  # 连接池满时是否阻塞等待
                     maxusage=None,  # 一个连接最多被重复使用的次数
                     setsession=[],  # 开始会话前执行的命令
-                    ping=0,  # ping MySQL服务端确保连接可用
                     host=DB_CONFIG["host"],
                     port=DB_CONFIG["port"],
                     user=DB_CONFIG["user"],
@@ -31,52 +151,156 @@ class DBPool:
                     database=DB_CONFIG["database"],
                     charset=DB_CONFIG["charset"],
                     cursorclass=pymysql.cursors.DictCursor,
+                    **settings,
                 )
-                logger.info("数据库连接池初始化成功")
+                logger.info(f"数据库连接池初始化成功: {settings}")
         return cls._pool
 
     @classmethod
-    def query(cls, sql):
-        """执行查询，每次从连接池获取新连接"""
-        conn = None
-        cursor = None
+    @contextmanager
+    def _connection(cls):
+        """从连接池取出连接并记录等待时间，退出时归还连接池"""
+        start = time.perf_counter()
+        conn = cls.get_pool().connection()
+        cls.stats.on_checkout(time.perf_counter() - start)
         try:
-            conn = cls.get_pool().connection()
-            cursor = conn.cursor()
-            # logger.info(f"执行查询: {sql}")
-            cursor.execute(sql)
-            result = cursor.fetchall()
-            logger.info(f"查询返回 {len(result)} 条记录")
-            return result
-        except Exception as e:
-            logger.error(f"查询执行失败: {str(e)}")
-            raise
+            yield conn
         finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()  # 归还连接到连接池
+            conn.close()  # 归还连接到连接池
+            cls.stats.on_release()
+
+    @classmethod
+    def dump_stats(cls, output_dir: Path) -> Optional[Path]:
+        """将当前进程的连接池监控数据写入 output_dir，没有数据库访问时不写入"""
+        snapshot = cls.stats.snapshot(cls._pool)
+        if not snapshot["checkouts"]:
+            return None
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        file_path = output_dir / f"db_pool_stats_{snapshot['worker']}.json"
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        logger.info(
+            f"连接池统计: 取连接 {snapshot['checkouts']} 次, "
+            f"平均等待 {snapshot['checkout_wait_avg_ms']}ms, "
+            f"最大等待 {snapshot['checkout_wait_max_ms']}ms, "
+            f"峰值活跃连接 {snapshot['peak_active']}"
+        )
+        return file_path
+
+    @classmethod
+    def query(cls, sql, params=None):
+        """执行查询，每次从连接池获取新连接，params为参数化查询的参数"""
+        with cls._connection() as conn:
+            cursor = None
+            start = time.perf_counter()
+            failed = False
+            try:
+                cursor = conn.cursor()
+                # logger.info(f"执行查询: {sql}")
+                cursor.execute(sql, params)
+                result = cursor.fetchall()
+                logger.info(f"查询返回 {len(result)} 条记录")
+                return result
+            except Exception as e:
+                failed = True
+                logger.error(f"查询执行失败: {str(e)}")
+                raise
+            finally:
+                cls.stats.on_query(time.perf_counter() - start, failed)
+                if cursor:
+                    cursor.close()
+
+    @classmethod
+    def iter_query(
+        cls, sql, params=None, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """流式查询，使用非缓冲的服务端游标逐批读取，结果不会一次性载入内存
+
+        连接在迭代结束或生成器被关闭时归还连接池
+        """
+        with cls._connection() as conn:
+            cursor = None
+            count = 0
+            start = time.perf_counter()
+            failed = False
+            try:
+                cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    count += len(rows)
+                    yield from rows
+                logger.info(f"流式查询返回 {count} 条记录")
+            except Exception as e:
+                failed = True
+                logger.error(f"流式查询执行失败: {str(e)}")
+                raise
+            finally:
+                cls.stats.on_query(time.perf_counter() - start, failed)
+                if cursor:
+                    cursor.close()
+
+    @classmethod
+    def query_chunks(cls, sql, params=None, chunksize: int = 10000):
+        """流式查询，按chunksize行为一批返回pandas DataFrame"""
+        import pandas as pd
+
+        chunk = []
+        for row in cls.iter_query(sql, params, batch_size=min(chunksize, 1000)):
+            chunk.append(row)
+            if len(chunk) >= chunksize:
+                yield pd.DataFrame(chunk)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk)
+
+    @classmethod
+    def executemany(cls, sql, seq_params: Sequence[Sequence[Any]]) -> int:
+        """批量执行参数化更新，在一个事务内提交"""
+        with cls._connection() as conn:
+            cursor = None
+            start = time.perf_counter()
+            failed = False
+            try:
+                cursor = conn.cursor()
+                cursor.executemany(sql, seq_params)
+                conn.commit()
+                affected = cursor.rowcount
+                logger.info(f"批量更新影响 {affected} 行")
+                return affected
+            except Exception as e:
+                failed = True
+                conn.rollback()
+                logger.error(f"批量更新失败: {str(e)}")
+                raise
+            finally:
+                cls.stats.on_query(time.perf_counter() - start, failed)
+                if cursor:
+                    cursor.close()
 
     @classmethod
     def execute(cls, sql, params=None):
         """执行更新，每次从连接池获取新连接"""
-        conn = None
-        cursor = None
-        try:
-            conn = cls.get_pool().connection()
-            cursor = conn.cursor()
-            cursor.execute(sql, params or ())
-            conn.commit()
-            affected = cursor.rowcount
-            logger.info(f"执行更新影响 {affected} 行")
-            return affected
-        except Exception as e:
-            if conn:
+        with cls._connection() as conn:
+            cursor = None
+            start = time.perf_counter()
+            failed = False
+            try:
+                cursor = conn.cursor()
+                cursor.execute(sql, params or ())
+                conn.commit()
+                affected = cursor.rowcount
+                logger.info(f"执行更新影响 {affected} 行")
+                return affected
+            except Exception as e:
+                failed = True
                 conn.rollback()
-            logger.error(f"执行更新失败: {str(e)}")
-            raise
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()  # 归还连接到连接池
+                logger.error(f"执行更新失败: {str(e)}")
+                raise
+            finally:
+                cls.stats.on_query(time.perf_counter() - start, failed)
+                if cursor:
+                    cursor.close()
@@ -1,7 +1,17 @@
+import atexit
+import gzip
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import random
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Optional
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from config import LOG_CONFIG
 
 
 class ColoredFormatter(logging.Formatter):
@@ -26,12 +36,145 @@ class ColoredFormatter(logging.Formatter):
         return message
 
 
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """首次写入日志时才创建日志目录和文件，导入模块时不产生文件系统副作用"""
+
+    def __init__(self, filename, *args, **kwargs):
+        kwargs["delay"] = True
+        super().__init__(filename, *args, **kwargs)
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+class GzipRotatingFileHandler(LazyRotatingFileHandler):
+    """轮转时将旧日志压缩为 .gz，同样的磁盘空间保留更长的历史"""
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._gzip_rotator
+
+    @staticmethod
+    def _gzip_rotator(source: str, dest: str) -> None:
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+class LazyJson:
+    """
+    日志参数中的JSON延迟序列化，只有日志真正输出时才调用 json.dumps
+
+    用法:
+        logger.info("接口返回：%s", LazyJson(result))
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self):
+        try:
+            return json.dumps(self.obj, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            return str(self.obj)
+
+
+class TruncatingFilter(logging.Filter):
+    """截断过长的日志消息，保留开头并标注原始长度"""
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.max_chars:
+            message = record.getMessage()
+            if len(message) > self.max_chars:
+                record.msg = (
+                    f"{message[: self.max_chars]}...(已截断，共{len(message)}字符)"
+                )
+                record.args = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """按比例采样日志，WARNING及以上级别始终保留"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def _snapshot(value: Any) -> Any:
+    """浅拷贝可变容器，LazyJson 拷贝其包装的对象，仍然延迟序列化"""
+    if isinstance(value, LazyJson):
+        obj = _snapshot(value.obj)
+        return value if obj is value.obj else LazyJson(obj)
+    if isinstance(value, (dict, list, set)):
+        return value.copy()
+    return value
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    将日志记录放入队列，由后台线程格式化和写出
+
+    与 QueueHandler 不同，prepare 不在调用线程中拼接消息，f-string 之外的
+    %s 参数(包括 LazyJson)会在后台线程中格式化；参数中的字典、列表和集合(包括
+    LazyJson 包装的)入队前做浅拷贝，记录日志后修改其顶层内容不影响写出结果，
+    嵌套对象的修改仍然可见。监听线程在第一条日志时才启动。
+    """
+
+    def __init__(self, log_queue, *handlers: logging.Handler):
+        super().__init__(log_queue)
+        self.listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self._started = False
+        self._start_lock = Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            # traceback 需要在抛出异常的线程中格式化
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if isinstance(record.args, dict):
+            record.args = _snapshot(record.args)
+        elif record.args:
+            record.args = tuple(_snapshot(arg) for arg in record.args)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if not self._started:
+            with self._start_lock:
+                if not self._started:
+                    self.listener.start()
+                    atexit.register(self.stop)
+                    self._started = True
+        super().enqueue(record)
+
+    def stop(self) -> None:
+        """写出队列中剩余的日志并停止后台线程"""
+        with self._start_lock:
+            if self._started:
+                self.listener.stop()
+                self._started = False
+
+
 def setup_logger(
     name: str,
     log_file: Optional[str] = None,
     level: int = logging.INFO,
     max_bytes: int = 10 * 1024 * 1024,  # 10MB
     backup_count: int = 5,
+    use_queue: bool = False,
+    max_message_chars: int = 0,
+    compress: bool = False,
+    sample_rates: Optional[Dict[str, float]] = None,
 ) -> logging.Logger:
     """配置并返回一个带颜色的日志记录器
 
@@ -41,6 +184,10 @@ def setup_logger(
         level: 日志级别
         max_bytes: 单个日志文件最大大小
         backup_count: 保留的日志文件数量
+        use_queue: 是否通过队列在后台线程中格式化和写出日志
+        max_message_chars: 单条日志消息的最大字符数，0表示不截断
+        compress: 轮转的日志文件是否压缩为 .gz
+        sample_rates: 子日志记录器名称 -> 采样比例，例如 {"payload": 0.1}
     """
     # 创建日志记录器
     logger = logging.getLogger(name)
@@ -50,6 +197,8 @@ def setup_logger(
     if logger.handlers:
         return logger
 
+    handlers = []
+
     # 控制台handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
@@ -57,11 +206,12 @@ def setup_logger(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
 
     # 文件handler（如果指定了日志文件）
     if log_file:
-        file_handler = RotatingFileHandler(
+        handler_class = GzipRotatingFileHandler if compress else LazyRotatingFileHandler
+        file_handler = handler_class(
             log_file,
             maxBytes=max_bytes,
             backupCount=backup_count,
@@ -72,12 +222,38 @@ def setup_logger(
             "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
         )
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if max_message_chars:
+        truncating_filter = TruncatingFilter(max_message_chars)
+        for handler in handlers:
+            handler.addFilter(truncating_filter)
+
+    if use_queue:
+        logger.addHandler(DeferredQueueHandler(queue.SimpleQueue(), *handlers))
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+
+    # 采样在调用线程中进行，未采中的日志不会格式化也不会进入队列
+    for child, rate in (sample_rates or {}).items():
+        logger.getChild(child).addFilter(SamplingFilter(rate))
 
     return logger
 
 
 log_file = Path(__file__).parent.parent.parent / "logs" / "pytest.log"
-log_file.parent.mkdir(exist_ok=True)  # 确保日志目录存在
 
-logger = setup_logger(name="pytest", log_file=str(log_file), level=logging.DEBUG)
+logger = setup_logger(
+    name="pytest",
+    log_file=str(log_file),
+    level=logging.DEBUG,
+    max_bytes=LOG_CONFIG["max_bytes"],
+    backup_count=LOG_CONFIG["backup_count"],
+    use_queue=LOG_CONFIG["use_queue"],
+    max_message_chars=LOG_CONFIG["max_message_chars"],
+    compress=LOG_CONFIG["compress"],
+    sample_rates=LOG_CONFIG["sample_rates"],
+)
+# 完整请求体/响应体等大段内容使用此子记录器，按 LOG_CONFIG 采样
+payload_logger = logger.getChild("payload")
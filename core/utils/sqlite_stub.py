@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Sequence
+
+from core.utils.database import DBPool
+from core.utils.logger import logger
+
+# MeetAskModel 和 AdshubPreProcessor 读取的表，字段与线上表保持同名
+STUB_SCHEMA = """
+create table if not exists sino_ask_qa (
+    id text primary key,
+    answer text,
+    answer_type integer,
+    source_level text,
+    creator text,
+    adjusted_question text,
+    intent text,
+    ask_time timestamp,
+    answer_time timestamp,
+    answer_first_char_time timestamp,
+    create_time timestamp default current_timestamp
+);
+create table if not exists sino_ask_qa_process_trace (
+    qa_id text primary key,
+    faq1_source text,
+    doc_source text,
+    es_doc_source text,
+    faq2_source text,
+    merged_doc_source text,
+    ranked_doc_source text,
+    source text,
+    all_source text,
+    ask_intent_time_cost real,
+    search_faq_time_cost real,
+    search_doc_time_cost real,
+    search_es_time_cost real,
+    ranking_time_cost real,
+    faq1_ai_time_cost real,
+    decision_ai_time_cost real,
+    doc_ai_time_cost real,
+    doc_first_answer_time_cost real,
+    source_ai_time_cost real,
+    source_and_decision_ai_time_cost real,
+    faq1_llm_response text,
+    doc_llm_response text,
+    answer_trace text,
+    original_dialogue_history text
+);
+create table if not exists conversation_info (
+    external_conversation_id text,
+    extracted_fields text,
+    create_time timestamp default current_timestamp
+);
+"""
+
+# timestamp 列与 MySQL 的 datetime 一样读取为 datetime 对象，耗时字段可以直接相减
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter(
+    "timestamp", lambda value: datetime.fromisoformat(value.decode())
+)
+
+
+class SQLiteDBPool:
+    """
+    SQLite 实现的 DBPool 替身，用于脱离测试库压测
+
+    接口与 DBPool 一致，MySQL 的 %s 占位符会转换为 SQLite 的 ?；
+    每个线程使用独立连接，WAL 模式下桩服务写入与客户端查询可以并发进行。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        self._originals: Dict[str, Any] = {}
+        with self._connect() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.executescript(STUB_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES
+            )
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _convert(sql: str) -> str:
+        return sql.replace("%s", "?")
+
+    def query(self, sql, params=None):
+        """执行查询"""
+        cursor = self._connect().execute(self._convert(sql), params or ())
+        result = [dict(row) for row in cursor.fetchall()]
+        logger.info(f"查询返回 {len(result)} 条记录")
+        return result
+
+    def iter_query(
+        self, sql, params=None, batch_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """流式查询"""
+        cursor = self._connect().execute(self._convert(sql), params or ())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+
+    def execute(self, sql, params=None):
+        """执行更新"""
+        with self._connect() as conn:
+            return conn.execute(self._convert(sql), params or ()).rowcount
+
+    def executemany(self, sql, seq_params: Sequence[Sequence[Any]]) -> int:
+        """批量执行更新"""
+        with self._connect() as conn:
+            return conn.executemany(self._convert(sql), seq_params).rowcount
+
+    def install(self) -> "SQLiteDBPool":
+        """将 DBPool 的查询入口替换为本实例"""
+        if not self._originals:
+            for name in ("query", "iter_query", "execute", "executemany"):
+                self._originals[name] = DBPool.__dict__[name]
+                setattr(DBPool, name, staticmethod(getattr(self, name)))
+            logger.info(f"DBPool 已替换为 SQLite 替身: {self.db_path}")
+        return self
+
+    def uninstall(self) -> None:
+        """还原 DBPool 的查询入口"""
+        for name, attr in self._originals.items():
+            setattr(DBPool, name, attr)
+        self._originals = {}
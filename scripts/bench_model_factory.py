@@ -0,0 +1,129 @@
+"""
+ModelFactory 实例创建的微基准
+
+用法:
+    python scripts/bench_model_factory.py --count 100000 --model adshubadgroup
+
+对比逐个 create_model、批量 create_many 和逐字段判断模板的旧实现，输出每个实例的平均耗时；
+并对比 pydantic 与 slots 两种模型后端的创建耗时、to_dict 耗时和实例内存占用。
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import core.model.adshub_pre_model  # noqa: E402,F401  注册模型
+from core.model.factory import (  # noqa: E402
+    MODEL_BACKENDS,
+    _build_converter,
+    factory,
+)
+
+
+def legacy_create_model(name: str, **kwargs):
+    """重构前的实现：每次调用逐字段查模板并尝试JSON解析，使用已弃用的construct"""
+    model_class = factory._models.get(name.lower())
+    template = factory.get_template(name)
+    processed_kwargs = {}
+    for key, value in kwargs.items():
+        if key in template:
+            template_value = template[key]
+            if isinstance(template_value, (dict, list)) and isinstance(value, str):
+                try:
+                    processed_kwargs[key] = json.loads(value)
+                except Exception:
+                    processed_kwargs[key] = value
+            else:
+                processed_kwargs[key] = value
+        else:
+            processed_kwargs[key] = value
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return model_class.construct(**processed_kwargs)
+
+
+def make_records(name: str, count: int, json_strings: bool) -> List[Dict]:
+    template = factory.get_template(name)
+    record = dict(template)
+    if json_strings:
+        # 模拟数据库返回的JSON字符串字段
+        record = {
+            k: json.dumps(v) if isinstance(v, (dict, list)) else v
+            for k, v in record.items()
+        }
+    return [dict(record, index=i) for i in range(count)]
+
+
+def bench(label: str, func: Callable[[], List], count: int) -> List:
+    start = time.perf_counter()
+    instances = func()
+    elapsed = time.perf_counter() - start
+    assert len(instances) == count
+    per_instance = elapsed / count * 1e6
+    print(f"{label:<28} 总耗时 {elapsed:8.3f}s  每个实例 {per_instance:7.2f}us")
+    return instances
+
+
+def bench_backends(name: str, records: List[Dict]) -> None:
+    """同一模板分别生成两种后端的模型类，对比创建、转字典和内存占用"""
+    template = factory.get_template(name)
+    converter = _build_converter(template)
+    count = len(records)
+    for backend, build in MODEL_BACKENDS.items():
+        construct = build(name, template).model_construct
+        print(f"后端 {backend}")
+        instances = bench(
+            "  创建实例", lambda: [construct(**converter(r)) for r in records], count
+        )
+        bench("  to_dict", lambda: [i.to_dict() for i in instances], count)
+        del instances
+
+        tracemalloc.start()
+        instances = [construct(**converter(r)) for r in records]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"  {'实例内存':<26} 共 {current / 1e6:8.1f}MB  每个实例 {current / count:7.0f}B"
+        )
+        del instances
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ModelFactory 实例创建基准")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--model", default="adshubadgroup")
+    args = parser.parse_args()
+
+    for json_strings in (False, True):
+        records = make_records(args.model, args.count, json_strings)
+        kind = "JSON字符串字段" if json_strings else "已解析字段"
+        print(f"模型 {args.model}，{args.count} 条记录，{kind}")
+        bench(
+            "旧实现 create_model",
+            lambda: [legacy_create_model(args.model, **r) for r in records],
+            args.count,
+        )
+        bench(
+            "create_model",
+            lambda: [factory.create_model(args.model, **r) for r in records],
+            args.count,
+        )
+        bench(
+            "create_many",
+            lambda: factory.create_many(args.model, records),
+            args.count,
+        )
+
+    # 字段已解析，且数据与模板共享对象，内存统计只包含实例本身
+    bench_backends(args.model, make_records(args.model, args.count, False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+检查核心模块的导入耗时，防止重依赖或导入副作用拖慢 xdist worker 启动和用例收集
+
+用法:
+    python scripts/import_budget.py            # 超出预算时返回非0
+    python scripts/import_budget.py --top 10   # 同时列出每个模块耗时最多的依赖
+
+每个模块在独立的解释器中以 -X importtime 导入，统计的是冷启动的累计耗时(毫秒)。
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# 模块 -> 导入耗时预算(毫秒)，pandas 等重依赖只允许出现在真正需要它的模块中
+IMPORT_BUDGETS_MS: Dict[str, int] = {
+    "config": 20,
+    "constant": 20,
+    "core.utils.logger": 50,
+    "core.utils.database": 150,
+    "core.common.tokenizer": 80,
+    "core.common.method": 120,
+    "core.model.factory": 250,
+    "core.service.adshub_pre_service": 300,
+    "core.service.meetask_service": 300,
+    "core.event.meetask_event": 500,
+    "core.event.adshub_pre_event": 600,
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> List[Tuple[str, int, int]]:
+    """在新进程中导入模块，返回 [(依赖名, 缩进层级, 累计耗时us)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            entries.append((match.group(4), len(match.group(3)), int(match.group(2))))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模块导入耗时预算检查")
+    parser.add_argument("modules", nargs="*", help="只检查指定模块")
+    parser.add_argument("--top", type=int, default=0, help="列出耗时最多的依赖")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="预算缩放系数，慢机器上可调大"
+    )
+    args = parser.parse_args()
+
+    modules = args.modules or list(IMPORT_BUDGETS_MS)
+    failed = []
+    for module in modules:
+        entries = measure(module)
+        index = next(i for i, e in enumerate(entries) if e[0] == module and e[1] == 1)
+        total_ms = entries[index][2] / 1000
+        budget = IMPORT_BUDGETS_MS.get(module)
+        over = budget is not None and total_ms > budget * args.scale
+        status = "超出预算" if over else "通过"
+        budget_text = f"{budget * args.scale:.0f}ms" if budget is not None else "-"
+        print(f"{module:<40} {total_ms:8.1f}ms  预算 {budget_text:>7}  {status}")
+        if over:
+            failed.append(module)
+        if args.top:
+            # 只看模块的直接依赖(跳过解释器启动时的导入)，避免同一耗时在嵌套层级中重复出现
+            start = max((i for i in range(index) if entries[i][1] == 1), default=-1)
+            direct = [e for e in entries[start + 1 : index] if e[1] == 3]
+            for name, _, us in sorted(direct, key=lambda e: -e[2])[: args.top]:
+                print(f"    {name:<36} {us / 1000:8.1f}ms")
+
+    if failed:
+        print(f"以下模块导入耗时超出预算: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+AdsHub、MeetAsk 和 OpenAI 代理的本地桩服务，用于脱离外部依赖的压测
+
+用法:
+    python scripts/stub_server.py --port 8900 --db-path /tmp/stub.db --token-rate 50 --ttft 0.8
+
+客户端通过环境变量指向桩服务:
+    AI_TURNING_URL / MEETASK_URL / AI_GATEWAY_URL = http://127.0.0.1:8900
+    OPENAI_URL = http://127.0.0.1:8900/proxy/openai/v1/chat/completions
+    STUB_DB_PATH = /tmp/stub.db  (conftest 据此将 DBPool 替换为 SQLite 替身)
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.utils.logger import logger  # noqa: E402
+from core.utils.sqlite_stub import SQLiteDBPool  # noqa: E402
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[1] / "core" / "template" / "model"
+
+
+@dataclass
+class StubConfig:
+    """桩服务行为配置"""
+
+    token_rate: float = 50.0  # 每秒输出的token数
+    ttft: float = 0.5  # 首token延迟(秒)
+    answer_tokens: int = 40  # 每次回答的token数
+    error_rate: float = 0.0  # 返回500的概率
+    plan_delay: float = 3.0  # 广告方案从PENDING到SUCCESS的时间(秒)
+    write_lag: float = 0.5  # 回答结束后日志/会话信息写入数据库的延迟(秒)
+    llm_latency: float = 0.3  # OpenAI代理非流式响应延迟(秒)
+    follow_up_rate: float = 0.0  # MeetAsk 回答需要追问(answer_type=3)的概率
+    seed: Optional[int] = None
+
+
+def _tokens(n: int) -> List[str]:
+    return [f"词{i}" for i in range(n)]
+
+
+class StubBackend:
+    """桩服务状态：广告方案进度和待写入数据库的记录"""
+
+    def __init__(self, config: StubConfig, db: Optional[SQLiteDBPool] = None):
+        self.config = config
+        self.db = db
+        self.random = random.Random(config.seed)
+        self.plans: Dict[str, float] = {}  # planId -> 创建时间
+        with open(TEMPLATE_DIR / "adshubad.json", "r", encoding="utf-8") as f:
+            self.plan_detail = json.load(f)
+        with open(TEMPLATE_DIR / "adshubrequest.json", "r", encoding="utf-8") as f:
+            request_fields = json.load(f)
+        self.extracted_fields = {
+            "basic": {"fields": {k: {"value": v} for k, v in request_fields.items()}}
+        }
+
+    def should_fail(self) -> bool:
+        return self.random.random() < self.config.error_rate
+
+    def answer_type(self) -> int:
+        """MeetAsk 回答类型，3 表示需要追问"""
+        return 3 if self.random.random() < self.config.follow_up_rate else 1
+
+    async def _write_later(self, sql_list: List[tuple]) -> None:
+        await asyncio.sleep(self.config.write_lag)
+        if self.db is None:
+            return
+        for sql, params in sql_list:
+            self.db.execute(sql, params)
+
+    def schedule_write(self, *sql_list: tuple) -> None:
+        """模拟日志写入延迟，延迟后写入SQLite替身"""
+        asyncio.get_running_loop().create_task(self._write_later(list(sql_list)))
+
+    async def stream_tokens(self, response: web.StreamResponse, events: List[bytes]):
+        """按首token延迟和token速率发送SSE事件"""
+        await asyncio.sleep(self.config.ttft)
+        interval = 1 / self.config.token_rate if self.config.token_rate else 0
+        for event in events:
+            await response.write(event)
+            if interval:
+                await asyncio.sleep(interval)
+
+
+BACKEND_KEY = web.AppKey("backend", StubBackend)
+
+
+def _sse(payload: Dict) -> bytes:
+    # 紧凑格式，客户端按 "key":"value" 正则提取字段
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return f"data:{data}\n\n".encode("utf-8")
+
+
+async def adshub_ask_question(request: web.Request) -> web.StreamResponse:
+    """/dialogue/agentStreamAskQuestion 流式问答"""
+    backend: StubBackend = request.app[BACKEND_KEY]
+    if backend.should_fail():
+        return web.Response(status=500, text="stub error")
+    body = await request.json()
+    conversation_id = body.get("conversationId") or uuid.uuid4().hex
+    trace_id = uuid.uuid4().hex[:16]
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    # 客户端跳过前两个content，首个事件同时携带会话ID和traceId
+    head = {"conversationId": conversation_id, "traceId": trace_id}
+    events = [_sse({**head, "content": "start"}), _sse({**head, "content": "think"})]
+    events += [
+        _sse({**head, "content": token})
+        for token in _tokens(backend.config.answer_tokens)
+    ]
+    await backend.stream_tokens(response, events)
+    await response.write_eof()
+
+    backend.schedule_write(
+        (
+            "insert into conversation_info (external_conversation_id, extracted_fields)"
+            " values (%s, %s)",
+            (conversation_id, json.dumps(backend.extracted_fields, ensure_ascii=False)),
+        )
+    )
+    return response
+
+
+async def adshub_generate(request: web.Request) -> web.Response:
+    """conversation/generate 创建广告方案"""
+    backend: StubBackend = request.app[BACKEND_KEY]
+    if backend.should_fail():
+        return web.Response(status=500, text="stub error")
+    plan_id = uuid.uuid4().hex
+    backend.plans[plan_id] = time.monotonic()
+    return web.json_response({"result": {"planId": plan_id}})
+
+
+async def adshub_plan_info(request: web.Request) -> web.Response:
+    """plan/planInfo 方案生成完成前返回PENDING"""
+    backend: StubBackend = request.app[BACKEND_KEY]
+    if backend.should_fail():
+        return web.Response(status=500, text="stub error")
+    plan_id = request.query.get("planId")
+    created = backend.plans.get(plan_id)
+    if created is None:
+        return web.json_response({"result": {"planStatus": "PLAN_FAIL"}})
+    if time.monotonic() - created < backend.config.plan_delay:
+        return web.json_response({"result": {"planStatus": "PENDING"}})
+    return web.json_response(
+        {"result": {"planStatus": "SUCCESS", "planDetail": backend.plan_detail}}
+    )
+
+
+async def meetask_ask_question(request: web.Request) -> web.StreamResponse:
+    """/meetask/stream/askQuestion 流式问答，最后一个事件携带完整回答和qaId"""
+    backend: StubBackend = request.app[BACKEND_KEY]
+    if backend.should_fail():
+        return web.Response(status=500, text="stub error")
+    body = await request.json()
+    ask_time = datetime.now()
+    qa_id = uuid.uuid4().hex
+    tokens = _tokens(backend.config.answer_tokens)
+    answer = "".join(tokens)
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    events = [_sse({"result": {"answer": token}}) for token in tokens]
+    events.append(_sse({"result": {"answer": answer, "qaId": qa_id}}))
+    await backend.stream_tokens(response, events)
+    await response.write_eof()
+    answer_time = datetime.now()
+    answer_first_char_time = min(
+        ask_time + timedelta(seconds=backend.config.ttft), answer_time
+    )
+
+    source = json.dumps(
+        {
+            "similarityResults": [
+                {"id": "doc1", "answerOrContent": f"{body.get('query', '')}的参考资料"}
+            ],
+            "googleVectorResults": [],
+        },
+        ensure_ascii=False,
+    )
+    backend.schedule_write(
+        (
+            "insert into sino_ask_qa (id, answer, answer_type, creator, ask_time,"
+            " answer_time, answer_first_char_time) values (%s, %s, %s, %s, %s, %s, %s)",
+            (
+                qa_id,
+                answer,
+                backend.answer_type(),
+                body.get("user", ""),
+                ask_time,
+                answer_time,
+                answer_first_char_time,
+            ),
+        ),
+        (
+            "insert into sino_ask_qa_process_trace (qa_id, source, answer_trace)"
+            " values (%s, %s, %s)",
+            (qa_id, source, "stub"),
+        ),
+    )
+    return response
+
+
+async def openai_chat_completions(request: web.Request) -> web.StreamResponse:
+    """OpenAI 代理，支持 stream 参数"""
+    backend: StubBackend = request.app[BACKEND_KEY]
+    if backend.should_fail():
+        return web.Response(status=500, text="stub error")
+    body = await request.json()
+    content = json.dumps({"q": "请继续介绍一下"}, ensure_ascii=False)
+
+    if not body.get("stream"):
+        await asyncio.sleep(backend.config.llm_latency)
+        return web.json_response(
+            {
+                "id": uuid.uuid4().hex,
+                "model": body.get("model"),
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": content}}
+                ],
+            }
+        )
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    events = [
+        f"data: {json.dumps({'choices': [{'delta': {'content': ch}}]}, ensure_ascii=False)}\n\n".encode()
+        for ch in content
+    ]
+    events.append(b"data: [DONE]\n\n")
+    await backend.stream_tokens(response, events)
+    await response.write_eof()
+    return response
+
+
+def create_app(config: StubConfig, db_path: Optional[Path] = None) -> web.Application:
+    """创建桩服务应用"""
+    db = SQLiteDBPool(db_path) if db_path else None
+    app = web.Application()
+    app[BACKEND_KEY] = StubBackend(config, db)
+    app.router.add_post("/dialogue/agentStreamAskQuestion", adshub_ask_question)
+    app.router.add_post("/stream/sino-ai-adshub/conversation/generate", adshub_generate)
+    app.router.add_get("/stream/sino-ai-adshub/plan/planInfo", adshub_plan_info)
+    app.router.add_post("/meetask/stream/askQuestion", meetask_ask_question)
+    app.router.add_post("/proxy/openai/v1/chat/completions", openai_chat_completions)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--db-path", type=Path, default=None, help="SQLite替身路径")
+    parser.add_argument("--token-rate", type=float, default=StubConfig.token_rate)
+    parser.add_argument("--ttft", type=float, default=StubConfig.ttft)
+    parser.add_argument("--answer-tokens", type=int, default=StubConfig.answer_tokens)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--plan-delay", type=float, default=StubConfig.plan_delay)
+    parser.add_argument("--write-lag", type=float, default=StubConfig.write_lag)
+    parser.add_argument("--llm-latency", type=float, default=StubConfig.llm_latency)
+    parser.add_argument(
+        "--follow-up-rate", type=float, default=StubConfig.follow_up_rate
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        token_rate=args.token_rate,
+        ttft=args.ttft,
+        answer_tokens=args.answer_tokens,
+        error_rate=args.error_rate,
+        plan_delay=args.plan_delay,
+        write_lag=args.write_lag,
+        llm_latency=args.llm_latency,
+        follow_up_rate=args.follow_up_rate,
+        seed=args.seed,
+    )
+    logger.info(f"桩服务启动: http://{args.host}:{args.port}, 配置: {config}")
+    web.run_app(create_app(config, args.db_path), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
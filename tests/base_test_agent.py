@@ -4,7 +4,11 @@ import pandas as pd
 import os
 import time
 from config import TEST_CONFIG
-from core.common.method import export_excel_result
+from core.common.method import (
+    denormalize_tables,
+    export_result,
+    export_tables_result,
+)
 from core.common.test_record import TestRecord
 from core.utils.logger import logger
 from tests.conftest import get_actual_test_cases_count, get_last_test_index
@@ -29,7 +33,8 @@ class BaseTestAgent:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         worker_id = os.environ.get("PYTEST_XDIST_WORKER", "")
         # 为每个worker创建单独的输出文件
-        output_file = f"test_results_{timestamp}{worker_id}.xlsx"
+        suffix = TEST_CONFIG.get("result_format", "xlsx")
+        output_file = f"test_results_{timestamp}{worker_id}.{suffix}"
         return output_dir / output_file
 
     @pytest.fixture(scope="session")
@@ -119,7 +124,16 @@ class BaseTestAgent:
             raise
         finally:
             # 导出测试结果
-            export_excel_result(request.session.export_excel, output_path)
+            export_result(request.session.export_excel, output_path)
+            # 规范化导出的各表只追加本用例新增的行
+            export_tables = getattr(request.session, "export_tables", None)
+            if export_tables:
+                # 规范化的多表结果始终为Excel工作簿，与结果格式无关
+                tables_path = output_path.with_name(
+                    output_path.name.replace("test_results_", "test_tables_", 1)
+                ).with_suffix(".xlsx")
+                export_tables_result(export_tables, tables_path)
+                request.session.export_tables = None
             if clear_context:
                 request.session.export_excel = []
             # 保存当前执行位置
@@ -137,6 +151,12 @@ class BaseTestAgent:
         output_dir = TEST_CONFIG["output_dir"]
         timestamp = datetime.now().strftime("%Y%m%d")
 
+        if TEST_CONFIG.get("result_format") == "parquet":
+            merged_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self._merge_parquet(output_dir, timestamp, merged_timestamp)
+            self._merge_tables(output_dir, timestamp, merged_timestamp)
+            return
+
         # 查找当天生成的所有测试结果文件
         result_files = sorted(
             output_dir.glob(f"test_results_{timestamp}*.xlsx"),
@@ -181,6 +201,8 @@ class BaseTestAgent:
         merged_df.to_excel(merged_file, index=False)
         logger.info(f"所有测试结果已合并到: {merged_file}")
 
+        self._merge_tables(output_dir, timestamp, merged_timestamp)
+
         # 可选：删除或归档原始文件
         # for file_path in result_files:
         #     try:
@@ -192,3 +214,46 @@ class BaseTestAgent:
         #         logger.info(f"已归档原始文件: {file_path}")
         #     except Exception as e:
         #         logger.error(f"归档文件 {file_path} 失败: {str(e)}")
+
+    def _merge_tables(self, output_dir, timestamp, merged_timestamp):
+        """合并各worker的规范化多表结果，按配置附加关联后的宽表视图"""
+        table_files = sorted(output_dir.glob(f"test_tables_{timestamp}*.xlsx"))
+        if not table_files:
+            return
+
+        frames = {}
+        for file_path in table_files:
+            try:
+                for name, df in pd.read_excel(file_path, sheet_name=None).items():
+                    frames.setdefault(name, []).append(df)
+            except Exception as e:
+                logger.error(f"读取文件 {file_path} 失败: {str(e)}")
+        sheets = {
+            name: pd.concat(dfs, ignore_index=True) for name, dfs in frames.items()
+        }
+        if TEST_CONFIG.get("adshub_denormalized_view"):
+            sheets["denormalized"] = denormalize_tables(sheets)
+
+        merged_file = output_dir / f"merged_tables_{merged_timestamp}.xlsx"
+        with pd.ExcelWriter(merged_file) as writer:
+            for name, df in sheets.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+        logger.info(f"规范化测试结果已合并到: {merged_file}")
+
+    def _merge_parquet(self, output_dir, timestamp, merged_timestamp):
+        """合并各worker的Parquet结果目录，需要Excel时用 result_format to-excel 转换"""
+        import pyarrow.parquet as pq
+
+        from core.common.result_format import read_results_table
+
+        result_dirs = sorted(output_dir.glob(f"test_results_{timestamp}*.parquet"))
+        if not result_dirs:
+            logger.warning("未找到需要合并的测试结果文件")
+            return
+
+        table = read_results_table(result_dirs)
+        merged_file = output_dir / f"merged_results_{merged_timestamp}.parquet"
+        pq.write_table(table, merged_file)
+        logger.info(
+            f"{len(result_dirs)} 个测试结果目录已合并到: {merged_file}，共 {table.num_rows} 行"
+        )
@@ -1,4 +1,8 @@
 from core.common.test_record import TestRecord
+from core.utils.cassette import cassette_from_env
+from core.model.factory import TemplateWatcher
+from core.utils.database import DBPool
+from core.utils.sqlite_stub import SQLiteDBPool
 from core.utils.logger import logger
 import pytest
 import pandas as pd
@@ -11,7 +15,6 @@ from pathlib import Path
 import filelock
 import tempfile
 
-
 # 全局变量，用于存储实际测试用例数量
 ACTUAL_TEST_CASES_COUNT = 0
 # 全局变量，用于存储上次执行位置
@@ -20,12 +23,29 @@ LAST_TEST_INDEX = 0
 TEST_CASES = []
 # 文件锁路径
 LOCK_FILE = Path(tempfile.gettempdir()) / "pytest_test_cases.lock"
+# 通过 CASSETTE_MODE 环境变量启用的HTTP/数据库录制回放
+CASSETTE = cassette_from_env()
+
+
+def pytest_configure(config):
+    """测试会话开始时启用录制回放，设置 STUB_DB_PATH 时使用 SQLite 替身数据库"""
+    if CASSETTE:
+        CASSETTE.start()
+    if os.environ.get("STUB_DB_PATH"):
+        SQLiteDBPool(os.environ["STUB_DB_PATH"]).install()
+    if TEST_CONFIG.get("template_watch_interval"):
+        TemplateWatcher(TEST_CONFIG["template_watch_interval"]).start()
 
 
 def pytest_sessionfinish(session, exitstatus):
     """测试会话结束时的钩子函数"""
     # 清除测试记录
     TestRecord.clear_record()
+    if CASSETTE:
+        CASSETTE.stop()
+    # 输出当前进程的连接池监控数据，只使用替身或未访问数据库时不输出
+    if TEST_CONFIG.get("dump_db_pool_stats") and DBPool._pool is not None:
+        DBPool.dump_stats(TEST_CONFIG["output_dir"])
 
 
 def pytest_generate_tests(metafunc):
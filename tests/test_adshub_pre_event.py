@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from core.common.method import _to_frame, denormalize_tables, export_tables_result
+from core.event import adshub_pre_event
+from core.event.adshub_pre_event import AdshubPreConfig, AdshubPreProcessor
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[1] / "core" / "template" / "model"
+
+
+class FakeLookup:
+    def get(self, conversation_id):
+        return {
+            "basic": {"fields": {"budget": {"value": 100}, "country": {"value": "US"}}}
+        }
+
+
+@pytest.fixture
+def plan_response(monkeypatch):
+    """两个广告系列，分别包含2个和1个广告组"""
+    plan_detail = json.loads((TEMPLATE_DIR / "adshubad.json").read_text("utf-8"))
+    campaign = plan_detail["campaignList"][0]
+    adgroup = campaign["adGroupList"][0]
+    plan_detail["campaignList"] = [
+        {
+            **campaign,
+            "campaignId": "c1",
+            "adGroupList": [
+                {**adgroup, "adGroupId": "g1"},
+                {**adgroup, "adGroupId": "g2"},
+            ],
+        },
+        {
+            **campaign,
+            "campaignId": "c2",
+            "adGroupList": [{**adgroup, "adGroupId": "g3"}],
+        },
+    ]
+    monkeypatch.setattr(
+        adshub_pre_event,
+        "adshub_ask_question_stream",
+        lambda *args, **kwargs: {"conversation_id": "conv1"},
+    )
+    monkeypatch.setattr(
+        adshub_pre_event,
+        "adshub_ad_generate_backend",
+        lambda *args, **kwargs: {"planId": "plan1"},
+    )
+    monkeypatch.setattr(
+        adshub_pre_event,
+        "adshub_ad_detail_backend",
+        lambda *args, **kwargs: {"planStatus": "SUCCESS", "planDetail": plan_detail},
+    )
+
+
+def _run_case(export_mode):
+    processor = AdshubPreProcessor(AdshubPreConfig(export_mode=export_mode))
+    processor.conversation_info = FakeLookup()
+    request = SimpleNamespace(session=SimpleNamespace(export_excel=[]))
+    conversation_id = processor.collect_request(request, "AGENT", query="投放广告")
+    processor.generate_ads_by_id(request, "AGENT", conversation_id)
+    return request.session
+
+
+def test_normalized_export_tables(plan_response):
+    """测试规范化导出只写入关联键，不冗余上层字段"""
+    session = _run_case("normalized")
+    tables = session.export_tables
+
+    assert session.export_excel == []
+    counts = [len(tables[name]) for name in adshub_pre_event.EXPORT_TABLES]
+    assert counts == [1, 1, 2, 3]
+    case_key = tables["cases"][0]["case_key"]
+    assert tables["cases"][0]["conversation_id"] == "conv1"
+    assert tables["requests"][0] == {
+        "case_key": case_key,
+        "request_budget": 100,
+        "request_country": "US",
+    }
+    assert [row["campaign_key"] for row in tables["adgroups"]] == [
+        f"{case_key}_0",
+        f"{case_key}_0",
+        f"{case_key}_1",
+    ]
+    assert "campaign_campaignId" not in tables["adgroups"][0]
+
+
+def test_denormalized_view_matches_flat_export(plan_response):
+    """测试关联后的宽表与非规范化导出的广告组行一致"""
+    flat = _to_frame(_run_case("flat").export_excel[1:])
+    tables = _run_case("normalized").export_tables
+    sheets = {name: _to_frame(rows) for name, rows in tables.items()}
+
+    view = denormalize_tables(sheets)
+
+    assert list(view.columns) == list(flat.columns)
+    pd.testing.assert_frame_equal(view, flat)
+
+
+def test_export_tables_result_appends_sheets(tmp_path, plan_response):
+    """测试多表增量导出按表追加"""
+    path = tmp_path / "tables.xlsx"
+    export_tables_result(_run_case("normalized").export_tables, path)
+    export_tables_result(_run_case("normalized").export_tables, path)
+
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == list(adshub_pre_event.EXPORT_TABLES)
+    assert [len(df) for df in sheets.values()] == [2, 2, 4, 6]
+    assert sheets["adgroups"]["adgroup_adGroupId"].tolist() == ["g1", "g2", "g3"] * 2
@@ -0,0 +1,219 @@
+import asyncio
+
+import pytest
+
+from core.utils import async_database
+from core.utils.async_database import AsyncDBPool
+
+
+class FakeCursor:
+    """按SQL返回预设结果的游标，fail_on 中的SQL执行时抛出异常"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self._rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+        if sql in self.conn.fail_on:
+            raise RuntimeError("执行失败")
+        self._rows = list(self.conn.results.get(sql, []))
+        self.rowcount = len(self._rows) or 1
+
+    async def executemany(self, sql, seq_params):
+        for params in seq_params:
+            await self.execute(sql, params)
+        self.rowcount = len(seq_params)
+
+    async def fetchall(self):
+        return self._rows
+
+    async def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+
+class FakeConnection:
+    def __init__(self, results=None, fail_on=()):
+        self.results = results or {}
+        self.fail_on = fail_on
+        self.executed = []
+        self.cursor_classes = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_class=None):
+        self.cursor_classes.append(cursor_class)
+        return FakeCursor(self)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeAcquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        self.pool.acquired += 1
+        return self.pool.conn
+
+    async def __aexit__(self, *exc):
+        self.pool.released += 1
+        return False
+
+
+class FakePool:
+    def __init__(self, maxsize=1, conn=None):
+        self.maxsize = maxsize
+        self.conn = conn or FakeConnection()
+        self.acquired = 0
+        self.released = 0
+        self.closed = False
+        self.terminated = False
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+    def close(self):
+        self.closed = True
+
+    def terminate(self):
+        self.terminated = True
+        self.close()
+
+    async def wait_closed(self):
+        pass
+
+
+@pytest.fixture
+def fake_aiomysql(monkeypatch):
+    pools = []
+
+    async def create_pool(**kwargs):
+        pools.append(FakePool(kwargs["maxsize"]))
+        return pools[-1]
+
+    class FakeAiomysql:
+        DictCursor = None
+        SSDictCursor = "SSDictCursor"
+
+    FakeAiomysql.create_pool = staticmethod(create_pool)
+    monkeypatch.setattr(async_database, "aiomysql", FakeAiomysql)
+    for attr in ("_pools", "_locks", "_closers"):
+        monkeypatch.setattr(AsyncDBPool, attr, {})
+    return pools
+
+
+def test_pool_closed_when_loop_shuts_down(fake_aiomysql):
+    """测试每个事件循环一个连接池，asyncio.run 退出时关闭连接池并清除记录"""
+
+    async def use_pool():
+        assert await AsyncDBPool.get_pool() is await AsyncDBPool.get_pool()
+
+    asyncio.run(use_pool())
+    asyncio.run(use_pool())
+
+    assert len(fake_aiomysql) == 2
+    assert all(pool.terminated for pool in fake_aiomysql)
+    assert AsyncDBPool._pools == AsyncDBPool._locks == AsyncDBPool._closers == {}
+
+
+def test_explicit_close(fake_aiomysql):
+    """测试显式关闭连接池后不再重复关闭"""
+
+    async def use_pool():
+        await AsyncDBPool.get_pool()
+        await AsyncDBPool.close()
+
+    asyncio.run(use_pool())
+
+    assert fake_aiomysql[0].closed and not fake_aiomysql[0].terminated
+    assert AsyncDBPool._pools == AsyncDBPool._closers == {}
+
+
+def test_concurrent_loops_share_async_budget(fake_aiomysql, monkeypatch):
+    """测试同时存在的事件循环共用异步连接数"""
+    monkeypatch.setattr(
+        async_database,
+        "pool_settings",
+        lambda kind: {"maxconnections": 3, "mincached": 1},
+    )
+    other_loop = object()
+    AsyncDBPool._pools[other_loop] = FakePool(maxsize=2)
+
+    async def use_pool():
+        return (await AsyncDBPool.get_pool()).maxsize
+
+    assert asyncio.run(use_pool()) == 1
+    AsyncDBPool._pools[other_loop] = FakePool(maxsize=3)
+    with pytest.raises(RuntimeError):
+        asyncio.run(use_pool())
+
+
+@pytest.fixture
+def fake_conn(fake_aiomysql, monkeypatch):
+    """所有事件循环共用的假连接"""
+    conn = FakeConnection(
+        results={"select": [{"id": i} for i in range(5)]}, fail_on=("bad",)
+    )
+
+    async def create_pool(**kwargs):
+        fake_aiomysql.append(FakePool(kwargs["maxsize"], conn))
+        return fake_aiomysql[-1]
+
+    monkeypatch.setattr(
+        async_database.aiomysql, "create_pool", staticmethod(create_pool)
+    )
+    return conn
+
+
+def test_query_and_iter_query(fake_conn, fake_aiomysql):
+    """测试查询返回全部记录，流式查询使用服务端游标逐批读取并归还连接"""
+
+    async def run():
+        rows = await AsyncDBPool.query("select", (1,))
+        streamed = [row async for row in AsyncDBPool.iter_query("select", batch_size=2)]
+        return rows, streamed
+
+    rows, streamed = asyncio.run(run())
+
+    assert rows == streamed == [{"id": i} for i in range(5)]
+    assert fake_conn.executed == [("select", (1,)), ("select", None)]
+    assert fake_conn.cursor_classes == [None, "SSDictCursor"]
+    pool = fake_aiomysql[0]
+    assert pool.acquired == pool.released == 2
+
+
+def test_execute_commits_and_rolls_back(fake_conn):
+    """测试更新成功时提交并返回影响行数，失败时回滚并抛出异常"""
+
+    async def run():
+        affected = await AsyncDBPool.execute("update")
+        many = await AsyncDBPool.executemany("insert", [(1,), (2,), (3,)])
+        with pytest.raises(RuntimeError):
+            await AsyncDBPool.execute("bad", (1,))
+        with pytest.raises(RuntimeError):
+            await AsyncDBPool.executemany("bad", [(1,)])
+        return affected, many
+
+    assert asyncio.run(run()) == (1, 3)
+    assert fake_conn.executed[0] == ("update", ())
+    assert fake_conn.commits == 2
+    assert fake_conn.rollbacks == 2
+
+
+def test_query_error_raised(fake_conn):
+    """测试查询失败时抛出异常"""
+    with pytest.raises(RuntimeError):
+        asyncio.run(AsyncDBPool.query("bad"))
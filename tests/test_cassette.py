@@ -0,0 +1,48 @@
+from datetime import datetime
+from decimal import Decimal
+
+import requests
+from core.utils.cassette import RECORD, REPLAY, Cassette
+from core.utils.database import DBPool
+
+ROWS = [{"id": 1, "ask_time": datetime(2025, 3, 3, 10, 0), "cost": Decimal("1.5")}]
+
+
+class FakeRaw:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, chunk_size=None, decode_content=True):
+        yield from self.chunks
+
+
+def fake_request(session, method, url, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response.encoding = "utf-8"
+    response.raw = FakeRaw([b'data:{"content":', '"你好"}\n\n'.encode()])
+    return response
+
+
+def test_record_then_replay(tmp_path, monkeypatch):
+    """测试录制的流式响应和查询结果可以原样回放"""
+    monkeypatch.setattr(requests.Session, "request", fake_request)
+    monkeypatch.setattr(
+        DBPool, "query", classmethod(lambda cls, sql, params=None: ROWS)
+    )
+
+    with Cassette(tmp_path, mode=RECORD):
+        response = requests.post("http://stub/ask", json={"q": 1}, stream=True)
+        recorded = b"".join(response.iter_content())
+        assert DBPool.query("select 1", (1,)) == ROWS
+
+    # 回放时即使真实入口不可用也能返回录制结果
+    monkeypatch.setattr(requests.Session, "request", None)
+    monkeypatch.setattr(DBPool, "query", None)
+    with Cassette(tmp_path, mode=REPLAY):
+        response = requests.post("http://stub/ask", json={"q": 1}, stream=True)
+        assert b"".join(response.iter_content()) == recorded
+        assert response.status_code == 200
+        assert DBPool.query("select 1", (1,)) == ROWS
+        assert list(DBPool.iter_query("select 1", (1,))) == ROWS
+    assert DBPool.query is None
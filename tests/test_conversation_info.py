@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+from core.model.conversation_info import (
+    ConversationInfoLookup,
+    ConversationInfoNotReady,
+)
+
+
+class FakeDBPool:
+    """第 ready_after 次查询之后才返回记录的假连接池"""
+
+    def __init__(self, ready_after=0, fields=None):
+        self.calls = 0
+        self.ready_after = ready_after
+        self.fields = fields if fields is not None else {"goal": {"value": "拉新"}}
+
+    def query(self, sql, params=None):
+        self.calls += 1
+        if self.calls <= self.ready_after:
+            return []
+        return [{"extracted_fields": json.dumps(self.fields)}]
+
+
+def test_wait_until_ready_and_cache(tmp_path):
+    """测试记录未写入时等待，解析结果缓存并落盘"""
+    db_pool = FakeDBPool(ready_after=2)
+    lookup = ConversationInfoLookup(db_pool=db_pool, min_delay=0.01, cache_dir=tmp_path)
+
+    assert lookup.get("c1") == {"goal": {"value": "拉新"}}
+    assert lookup.get("c1") == {"goal": {"value": "拉新"}}
+    assert db_pool.calls == 3
+    assert lookup.lag_estimate is not None
+
+    # 新实例从落盘缓存中读取，不再查询数据库
+    reloaded = ConversationInfoLookup(db_pool=FakeDBPool(), cache_dir=tmp_path)
+    assert reloaded.get("c1") == {"goal": {"value": "拉新"}}
+    assert reloaded.db_pool.calls == 0
+
+
+def test_cache_appends_own_entries_and_versions(tmp_path, monkeypatch):
+    """测试落盘只追加本进程新增的记录，清除和版本变化使旧记录失效"""
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw0")
+    ConversationInfoLookup(db_pool=FakeDBPool(), cache_dir=tmp_path).get("c1")
+
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw1")
+    lookup = ConversationInfoLookup(db_pool=FakeDBPool(), cache_dir=tmp_path)
+    lookup.get("c1")
+    lookup.get("c2")
+    lookup.invalidate("c1")
+
+    lines = (tmp_path / "conversation_info_gw1.jsonl").read_text("utf-8").splitlines()
+    assert [json.loads(line)["key"] for line in lines] == ["c2", "c1"]
+    assert json.loads(lines[1])["deleted"] is True
+
+    reloaded = ConversationInfoLookup(db_pool=FakeDBPool(), cache_dir=tmp_path)
+    assert set(reloaded._load_cache()) == {"c2"}
+
+    bumped = ConversationInfoLookup(
+        db_pool=FakeDBPool(), cache_dir=tmp_path, cache_version=2
+    )
+    assert bumped._load_cache() == {}
+
+
+def test_not_ready_timeout():
+    """测试超过最长等待时间仍未写入时抛出异常"""
+    lookup = ConversationInfoLookup(
+        db_pool=FakeDBPool(ready_after=100), max_wait=0.05, min_delay=0.01
+    )
+    with pytest.raises(ConversationInfoNotReady):
+        lookup.get("c2")
+
+
+class FakeAsyncDBPool(FakeDBPool):
+    async def query(self, sql, params=None):
+        return FakeDBPool.query(self, sql, params)
+
+
+def test_async_lookup():
+    """测试异步查询与同步查询共用缓存"""
+    async_pool = FakeAsyncDBPool(ready_after=1)
+    lookup = ConversationInfoLookup(
+        db_pool=FakeDBPool(), async_db_pool=async_pool, min_delay=0.01
+    )
+
+    assert asyncio.run(lookup.aget("c3")) == {"goal": {"value": "拉新"}}
+    assert lookup.get("c3") == {"goal": {"value": "拉新"}}
+    assert async_pool.calls == 2
+    assert lookup.db_pool.calls == 0
@@ -0,0 +1,121 @@
+import pytest
+from config import DB_POOL_CONFIG
+from core.utils.database import DBPool, PoolStats, pool_settings
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.executed = []
+        self.closed = False
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def executemany(self, sql, seq_params):
+        self.executed.extend((sql, params) for params in seq_params)
+        self.rowcount = len(seq_params)
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.cursor_classes = []
+        self.committed = False
+        self.closed = False
+
+    def cursor(self, cursor_class=None):
+        self.cursor_classes.append(cursor_class)
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_connection(monkeypatch):
+    cursor = FakeCursor([{"id": i} for i in range(5)])
+    conn = FakeConnection(cursor)
+
+    class FakePool:
+        def connection(self):
+            return conn
+
+    monkeypatch.setattr(DBPool, "_pool", FakePool())
+    return conn
+
+
+def test_iter_query_streams(fake_connection):
+    """测试流式查询使用服务端游标并在结束后归还连接"""
+    rows = DBPool.iter_query("select id from t where a=%s", (1,), batch_size=2)
+    assert next(rows) == {"id": 0}
+    assert not fake_connection.closed
+    assert [row["id"] for row in rows] == [1, 2, 3, 4]
+    assert fake_connection.closed
+    assert fake_connection._cursor.executed == [("select id from t where a=%s", (1,))]
+    assert fake_connection.cursor_classes[0].__name__ == "SSDictCursor"
+
+
+def test_query_chunks(fake_connection):
+    """测试按批返回DataFrame"""
+    chunks = list(DBPool.query_chunks("select id from t", chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+def test_executemany(fake_connection):
+    """测试批量参数化写入"""
+    affected = DBPool.executemany("insert into t values (%s)", [(1,), (2,)])
+    assert affected == 2
+    assert fake_connection.committed
+
+
+def test_pool_settings_split_budget(monkeypatch):
+    """测试连接总预算按worker数量平分，同步和异步连接池合计不超过份额"""
+    monkeypatch.setitem(DB_POOL_CONFIG, "total_connections", 48)
+    monkeypatch.setitem(DB_POOL_CONFIG, "max_connections_per_worker", 10)
+    monkeypatch.setitem(DB_POOL_CONFIG, "async_connection_ratio", 0.25)
+
+    sync = pool_settings(worker_count=1)
+    assert sync["maxconnections"] == 8
+    assert pool_settings(worker_count=1, kind="async")["maxconnections"] == 2
+
+    for workers in (1, 5, 16, 24, 48):
+        total = pool_settings(worker_count=workers)["maxconnections"]
+        if workers <= 24:
+            total += pool_settings(worker_count=workers, kind="async")["maxconnections"]
+        assert total * workers <= 48
+
+    # 每个worker只有1个连接时全部给同步连接池
+    assert pool_settings(worker_count=48)["maxconnections"] == 1
+    with pytest.raises(ValueError):
+        pool_settings(worker_count=48, kind="async")
+    with pytest.raises(ValueError):
+        pool_settings(worker_count=49)
+
+
+def test_pool_stats(fake_connection, monkeypatch, tmp_path):
+    """测试取连接和查询耗时被计入监控数据"""
+    monkeypatch.setattr(DBPool, "stats", PoolStats())
+    list(DBPool.iter_query("select id from t"))
+    DBPool.executemany("insert into t values (%s)", [(1,)])
+
+    snapshot = DBPool.stats.snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["active"] == 0
+    assert snapshot["query_count"] == 2
+    assert sum(snapshot["query_latency_hist"].values()) == 2
+    assert DBPool.dump_stats(tmp_path).exists()
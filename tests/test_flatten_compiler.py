@@ -0,0 +1,47 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+from core.common.flatten_compiler import flatten_records, get_flattener
+from core.common.json_to_excel import flatten_json
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "core" / "template" / "model"
+MODELS = ["adshubad", "adshubcampaign", "adshubadgroup", "adshubrequest"]
+
+
+def load_template(name):
+    with open(TEMPLATE_DIR / f"{name}.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_compiled_matches_dynamic(name):
+    """测试预编译的扁平化结果与 flatten_json 一致"""
+    data = load_template(name)
+    assert get_flattener(name)(data) == flatten_json(data)
+
+
+def test_extra_and_mismatched_fields_fall_back():
+    """测试模板之外的字段和类型不符的值回退到动态扁平化"""
+    data = copy.deepcopy(load_template("adshubcampaign"))
+    data["extra"] = {"a": [{"b": 1}], "c": 2}
+    data["budgetAmount"] = {"value": 40}
+    data["adGroupList"][0]["newField"] = {"x": 1}
+
+    expected = flatten_json(data)
+    flat = get_flattener("adshubcampaign")(data)
+    assert flat == expected
+    assert flat["extra_c"] == 2
+    assert flat["budgetAmount_value"] == 40
+
+
+def test_flatten_records_column_order():
+    """测试批量扁平化按模板固定列顺序输出，额外字段在后"""
+    data = load_template("adshubrequest")
+    shuffled = dict(reversed(list(data.items())))
+    shuffled["extra"] = 1
+
+    df = flatten_records("adshubrequest", [data, shuffled])
+    assert list(df.columns) == list(data) + ["extra"]
+    assert df["extra"].tolist()[1] == 1
@@ -0,0 +1,72 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _import_in_subprocess(code: str, cwd: Path) -> dict:
+    """在新解释器中执行导入代码，返回其打印的JSON结果"""
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        env={"PYTHONPATH": str(ROOT), "PATH": ""},
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "core.common.method",
+        "core.common.tokenizer",
+        "core.service.adshub_pre_service",
+        "core.model.factory",
+    ],
+)
+def test_import_does_not_load_heavy_dependencies(module, tmp_path):
+    """测试导入核心模块时不加载重依赖"""
+    code = (
+        "import json, sys\n"
+        f"import {module}\n"
+        "heavy = ['pandas', 'tiktoken', 'litellm', 'ragchecker']\n"
+        "print(json.dumps([m for m in heavy if m in sys.modules]))"
+    )
+    assert _import_in_subprocess(code, tmp_path) == []
+
+
+def test_import_has_no_side_effects(tmp_path):
+    """测试导入时不写文件、不读取token和模板、不打开日志文件、不启动日志线程"""
+    code = (
+        "import json\n"
+        "import core.common.json_to_excel\n"
+        "from core.model.factory import ModelFactory\n"
+        "from core.service import adshub_pre_service\n"
+        "from core.utils.logger import logger\n"
+        "handlers = list(logger.handlers)\n"
+        "for h in logger.handlers:\n"
+        "    handlers.extend(getattr(getattr(h, 'listener', None), 'handlers', ()))\n"
+        "print(json.dumps({\n"
+        "    'templates_loaded': ModelFactory._templates_loaded,\n"
+        "    'token_loaded': adshub_pre_service.get_token.cache_info().currsize,\n"
+        "    'log_opened': [h.stream is not None for h in handlers\n"
+        "                   if hasattr(h, 'baseFilename')],\n"
+        "    'listener_started': any(getattr(h, '_started', False)\n"
+        "                            for h in logger.handlers),\n"
+        "}))"
+    )
+    result = _import_in_subprocess(code, tmp_path)
+
+    assert result == {
+        "templates_loaded": False,
+        "token_loaded": 0,
+        "log_opened": [False],
+        "listener_started": False,
+    }
+    assert list(tmp_path.iterdir()) == []
@@ -4,7 +4,15 @@ import pandas as pd
 import sys
 import pytest
 from pathlib import Path
-from core.common.json_to_excel import json_to_excel
+from core.common.json_to_excel import (
+    explode_to_frame,
+    flatten_dict_list_to_rows,
+    flatten_json,
+    json_to_excel,
+    json_to_excel_stream,
+    json_to_tree_columns,
+    write_rows_streaming,
+)
 
 # 添加项目根目录到系统路径
 sys.path.append(str(Path(__file__).parent.parent))
@@ -155,3 +163,112 @@ def test_json_to_excel_complex():
     assert len(df) > 0
 
     return df
+
+
+def test_explode_nested_lists():
+    """测试任意层级的嵌套列表按下标对齐展开"""
+    df = explode_to_frame(COMPLEX_TEST_DATA)
+
+    assert len(df) == 4
+    assert df["results_query_id"].tolist() == ["0", "0", "0", "1"]
+    assert df["results_test_data_doc_id"].tolist()[:3] == ["000", "001", "002"]
+    assert df["results_retrieved_context_doc_id"].isna().tolist() == [
+        False,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_explode_cartesian():
+    """测试同一层级的多个列表做笛卡尔积展开"""
+    df = explode_to_frame(TEST_DATA, mode="cartesian")
+
+    assert len(df) == 4
+    assert df["skills"].unique().tolist() == ["Python,JavaScript,SQL"]
+    assert list(zip(df["projects_name"], df["education_degree"])) == [
+        ("项目A", "学士"),
+        ("项目A", "硕士"),
+        ("项目B", "学士"),
+        ("项目B", "硕士"),
+    ]
+
+
+def test_explode_keeps_flatten_json_names():
+    """测试展开后的列名与 flatten_json 一致：简单列表使用叶子键名，已扁平化的输入不重复加前缀"""
+    data = {"a": {"tags": [1, 2]}, "l": [{"x": 1}, {"x": 2}]}
+
+    df = explode_to_frame(data)
+    assert list(df.columns) == ["tags", "l_x"]
+    assert df["tags"].tolist() == ["1,2", "1,2"]
+
+    rows = flatten_dict_list_to_rows(flatten_json(data))
+    assert rows == [{"tags": "1,2", "l_x": 1}, {"tags": "1,2", "l_x": 2}]
+
+
+def test_tree_columns(sample_list_data):
+    """测试树状展开的列顺序和列表路径取值"""
+    df = json_to_tree_columns(sample_list_data + [{"id": 4, "配置": [{"端口": 1}, 2]}])
+
+    assert list(df.columns) == [
+        "id",
+        "name",
+        "price",
+        "tags",
+        "details",
+        "details.color",
+        "details.weight",
+        "配置",
+        "配置.端口",
+    ]
+    assert df["tags"][0] == ["电子", "家电"]
+    assert df["details"].isna().all()
+    assert df["details.color"][2] == "红色"
+    assert df["配置.端口"][3] == "{'端口': 1}, 2"
+
+
+def test_write_rows_streaming_rollover(tmp_path):
+    """测试流式写入推断列并在超过行数上限时新建工作表"""
+    from openpyxl import load_workbook
+
+    def rows():
+        for i in range(5):
+            yield {"id": i, "tags": ["a", "b"]} if i else {"id": i}
+
+    output_path = write_rows_streaming(rows, tmp_path / "stream.xlsx", max_rows=3)
+
+    workbook = load_workbook(output_path)
+    assert workbook.sheetnames == ["Sheet1", "Sheet1_2", "Sheet1_3"]
+    sheet_rows = [list(ws.values) for ws in workbook.worksheets]
+    assert sheet_rows[0] == [("id", "tags"), (0, None), (1, '["a", "b"]')]
+    assert [len(rows) for rows in sheet_rows] == [3, 3, 2]
+
+
+def test_json_to_excel_stream_tree(tmp_path, sample_list_data):
+    """测试流式树状展开与 json_to_tree_columns 结果一致"""
+    pytest.importorskip("ijson")
+    input_path = tmp_path / "data.json"
+    input_path.write_text(json.dumps({"result": sample_list_data}), encoding="utf-8")
+
+    output_path = json_to_excel_stream(input_path, tmp_path / "tree.xlsx")
+
+    df = pd.read_excel(output_path)
+    expected = json_to_tree_columns(sample_list_data)
+    assert list(df.columns) == list(expected.columns)
+    assert df["details.color"].tolist()[2] == "红色"
+
+
+def test_json_to_excel_stream_row_matches_json_to_excel(tmp_path, sample_list_data):
+    """测试流式按行展开与 json_to_excel 的列名一致"""
+    pytest.importorskip("ijson")
+    data = {"result": sample_list_data}
+    input_path = tmp_path / "data.json"
+    input_path.write_text(json.dumps(data), encoding="utf-8")
+
+    streamed = pd.read_excel(
+        json_to_excel_stream(input_path, tmp_path / "stream.xlsx", format_type="row")
+    )
+    expected = pd.read_excel(json_to_excel(data, tmp_path / "row.xlsx"))
+
+    assert list(streamed.columns) == list(expected.columns)
+    assert {"result_id", "result_details_color", "tags"} <= set(streamed.columns)
@@ -0,0 +1,140 @@
+import gzip
+import logging
+import queue
+
+from core.utils.logger import (
+    DeferredQueueHandler,
+    GzipRotatingFileHandler,
+    LazyJson,
+    SamplingFilter,
+    TruncatingFilter,
+    setup_logger,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+def _record(msg, *args, level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+def test_lazy_json_serializes_on_format():
+    """测试LazyJson只在格式化时序列化，中文不转义"""
+    assert str(LazyJson({"a": "中文"})) == '{"a": "中文"}'
+    assert _record("返回：%s", LazyJson([1])).getMessage() == "返回：[1]"
+
+
+def test_truncating_filter():
+    """测试超长消息被截断并标注原始长度，短消息保持不变"""
+    record = _record("%s", "x" * 20)
+    TruncatingFilter(5).filter(record)
+    assert record.getMessage() == "xxxxx...(已截断，共20字符)"
+
+    record = _record("%s", "short")
+    TruncatingFilter(5).filter(record)
+    assert record.getMessage() == "short"
+
+
+def test_sampling_filter_keeps_warnings():
+    """测试采样比例为0时丢弃INFO，保留WARNING"""
+    sampling = SamplingFilter(0)
+    assert not sampling.filter(_record("info"))
+    assert sampling.filter(_record("warning", level=logging.WARNING))
+
+
+def test_queue_handler_defers_formatting():
+    """测试队列模式下参数在后台线程中格式化，且stop后日志全部写出"""
+    target = ListHandler()
+    handler = DeferredQueueHandler(queue.SimpleQueue(), target)
+    logger = logging.getLogger("test_logger.queue")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    formatted = []
+
+    class Payload:
+        def __str__(self):
+            formatted.append(True)
+            return "payload"
+
+    try:
+        logger.warning("返回：%s", Payload())
+    finally:
+        handler.stop()
+        logger.removeHandler(handler)
+
+    assert target.messages == ["返回：payload"]
+    assert len(formatted) == 1
+
+
+def test_queue_handler_snapshots_mutable_args(monkeypatch):
+    """测试可变参数入队前浅拷贝，入队后的修改不影响写出内容，LazyJson 仍在后台序列化"""
+    target = ListHandler()
+    handler = DeferredQueueHandler(queue.SimpleQueue(), target)
+    logger = logging.getLogger("test_logger.snapshot")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    serialized = []
+    lazy_str = LazyJson.__str__
+    monkeypatch.setattr(
+        LazyJson, "__str__", lambda self: serialized.append(1) or lazy_str(self)
+    )
+
+    result = {"status": "running"}
+    items = [1]
+    try:
+        logger.warning("返回：%s", LazyJson(result))
+        logger.warning("字典：%s，列表：%s", result, items)
+        assert serialized == []
+        result["status"] = "done"
+        items.append(2)
+    finally:
+        handler.stop()
+        logger.removeHandler(handler)
+
+    assert target.messages == [
+        '返回：{"status": "running"}',
+        "字典：{'status': 'running'}，列表：[1]",
+    ]
+
+
+def test_setup_logger_samples_child(tmp_path):
+    """测试按子记录器名称配置采样"""
+    logger = setup_logger(
+        "test_logger.sampled",
+        log_file=str(tmp_path / "app.log"),
+        sample_rates={"payload": 0},
+    )
+    logger.propagate = False
+
+    logger.getChild("payload").info("不会写出")
+    logger.info("写出")
+    for handler in logger.handlers:
+        handler.close()
+
+    assert (tmp_path / "app.log").read_text("utf-8").count("写出") == 1
+
+
+def test_gzip_rotation(tmp_path):
+    """测试轮转后的日志文件被压缩"""
+    log_file = tmp_path / "logs" / "app.log"
+    handler = GzipRotatingFileHandler(
+        str(log_file), maxBytes=10, backupCount=2, encoding="utf-8"
+    )
+    handler.emit(_record("第一条日志"))
+    handler.emit(_record("第二条日志"))
+    handler.close()
+
+    rotated = tmp_path / "logs" / "app.log.1.gz"
+    assert rotated.exists()
+    with gzip.open(rotated, "rt", encoding="utf-8") as f:
+        assert "第一条日志" in f.read()
+    assert "第二条日志" in log_file.read_text("utf-8")
@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+from core.event import meetask_event
+
+
+class FakeModel:
+    """每轮都要求追问的假模型，记录追问判断的次数"""
+
+    follow_up_calls = 0
+
+    def __init__(self, query=None, qa_id=None, response=None, **kwargs):
+        self.query = query
+        self.qa_id = qa_id
+        self.follow_up_question = None
+        self.queried = False
+
+    def query_data(self):
+        self.queried = True
+
+    def to_execl(self):
+        return {"query": self.query, "qa_id": self.qa_id, "queried": self.queried}
+
+    def should_follow_up(self):
+        FakeModel.follow_up_calls += 1
+        self.follow_up_question = f"追问{self.qa_id}"
+        return True
+
+
+@pytest.fixture
+def prefetched(monkeypatch):
+    qa_ids = []
+    monkeypatch.setattr(
+        meetask_event, "trace_fetcher", SimpleNamespace(prefetch=qa_ids.extend)
+    )
+    return qa_ids
+
+
+@pytest.fixture
+def fake_meetask(monkeypatch, prefetched):
+    calls = []
+
+    def fake_ask(question, user):
+        calls.append(question)
+        return {"response": "回答", "qa_id": str(len(calls))}
+
+    monkeypatch.setattr(meetask_event, "meetask_stream_ask_question", fake_ask)
+    monkeypatch.setattr(meetask_event, "MeetAskModel", FakeModel)
+    monkeypatch.setattr(FakeModel, "follow_up_calls", 0)
+    return calls
+
+
+def test_follow_up_bounded_by_max_turns(fake_meetask, prefetched, monkeypatch):
+    """测试追问轮数受上限约束，导出数据按轮次顺序写入并附带耗时"""
+    monkeypatch.setattr(meetask_event, "MAX_TURNS", 3)
+    request = SimpleNamespace(session=SimpleNamespace(export_excel=[]))
+
+    meetask_event.meetask_question_ask(request, query="首问")
+
+    assert fake_meetask == ["首问", "追问1", "追问2"]
+    # 最后一轮不再调用追问判断
+    assert FakeModel.follow_up_calls == 2
+    rows = request.session.export_excel
+    assert [row["timing_turn"] for row in rows] == [1, 2, 3]
+    assert all(
+        "timing_stream_cost" in row
+        and "timing_trace_cost" in row
+        and "timing_export_cost" in row
+        and row["queried"]
+        for row in rows
+    )
+    # 最后一轮的日志由导出任务查询
+    assert prefetched == ["3"]
+
+
+def test_follow_up_stops_on_time_budget(fake_meetask, monkeypatch):
+    """测试超过用例耗时预算后停止追问"""
+    monkeypatch.setattr(meetask_event, "CASE_TIME_BUDGET", 0)
+    request = SimpleNamespace(session=SimpleNamespace(export_excel=[]))
+
+    meetask_event.meetask_question_ask(request, query="首问")
+
+    assert fake_meetask == ["首问"]
+    assert FakeModel.follow_up_calls == 0
+    assert len(request.session.export_excel) == 1
+
+
+def test_export_failure_keeps_other_turns(fake_meetask, monkeypatch):
+    """测试某一轮导出失败时记录错误，其余轮次照常写入，且不掩盖原异常"""
+    monkeypatch.setattr(meetask_event, "MAX_TURNS", 3)
+
+    def to_execl(self):
+        if self.qa_id == "1":
+            raise ValueError("导出失败")
+        return {"query": self.query, "qa_id": self.qa_id}
+
+    def should_follow_up(self):
+        if self.qa_id == "2":
+            raise RuntimeError("追问失败")
+        self.follow_up_question = f"追问{self.qa_id}"
+        return True
+
+    monkeypatch.setattr(FakeModel, "to_execl", to_execl)
+    monkeypatch.setattr(FakeModel, "should_follow_up", should_follow_up)
+    request = SimpleNamespace(session=SimpleNamespace(export_excel=[]))
+
+    with pytest.raises(RuntimeError, match="追问失败"):
+        meetask_event.meetask_question_ask(request, query="首问")
+
+    assert [row["qa_id"] for row in request.session.export_excel] == ["2"]
@@ -0,0 +1,31 @@
+import json
+
+from core.model import meetask_model
+from core.model.meetask_model import MeetAskModel, MeetAskTraceRecord
+
+
+def test_output_drops_raw_json_after_parsing(monkeypatch):
+    """测试文档类字段解析后只导出解析结果，不再保留原始JSON字符串"""
+    monkeypatch.setattr(meetask_model, "count_tokens", lambda text, defer: len(text))
+    docs = [{"id": "d1", "text": "文档"}]
+    model = MeetAskModel(qa_id="1", query="问题", response="回答")
+    model.sql_result = MeetAskTraceRecord(
+        {
+            "qa_id": "1",
+            "faq1_source": json.dumps(docs),
+            "ranked_doc_source": "not json",
+            "merged_doc_source": json.dumps(docs),
+        }
+    )
+
+    output = model.to_execl()
+
+    assert output["faq_97"] == docs
+    assert "faq1_source" not in output
+    assert output["faq_97_len"] == 1
+    # 解析失败时保留原始值
+    assert output["ranked_doc_source"] == "not json"
+    assert "ranked_doc" not in output
+    # merged_doc 按原文导出，不再重复导出原始列
+    assert output["merged_doc"] == json.dumps(docs)
+    assert "merged_doc_source" not in output
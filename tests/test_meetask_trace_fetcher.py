@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from core.model.meetask_model import MeetAskTraceFetcher
+
+
+class FakeDBPool:
+    """按调用次数逐步"写入"日志的假连接池"""
+
+    def __init__(self, ready_after=0):
+        self.calls = []
+        self.ready_after = ready_after
+
+    def query(self, sql, params=None):
+        self.calls.append(params)
+        ready = len(self.calls) > self.ready_after
+        return [
+            {
+                "qa_id": qa_id,
+                "answer": f"回答{qa_id}",
+                "trace_qa_id": qa_id if ready else None,
+            }
+            for qa_id in params
+        ]
+
+
+def test_batch_fetch():
+    """测试预取的 qa_id 在一次 IN 查询中取回"""
+    db_pool = FakeDBPool()
+    fetcher = MeetAskTraceFetcher(db_pool=db_pool)
+    fetcher.prefetch(["1", "2"])
+
+    assert fetcher.get("3")["answer"] == "回答3"
+    assert fetcher.get("1")["answer"] == "回答1"
+    assert fetcher.get("2")["answer"] == "回答2"
+    assert db_pool.calls == [("1", "2", "3")]
+    assert "trace_qa_id" not in fetcher.get("4")
+
+
+def test_retry_until_trace_ready():
+    """测试日志未写入时退避重试"""
+    db_pool = FakeDBPool(ready_after=2)
+    fetcher = MeetAskTraceFetcher(db_pool=db_pool, base_delay=0)
+
+    assert fetcher.get("1")["answer"] == "回答1"
+    assert len(db_pool.calls) == 3
+
+
+def test_fallback_after_max_retries():
+    """测试超过重试次数后返回未关联日志的记录"""
+    db_pool = FakeDBPool(ready_after=100)
+    fetcher = MeetAskTraceFetcher(db_pool=db_pool, max_retries=2, base_delay=0)
+
+    assert fetcher.get("1")["answer"] == "回答1"
+    assert len(db_pool.calls) == 3
+
+
+class FakeAsyncDBPool(FakeDBPool):
+    async def query(self, sql, params=None):
+        return FakeDBPool.query(self, sql, params)
+
+
+def test_async_get():
+    """测试异步查询在日志写入前退避重试"""
+    async_pool = FakeAsyncDBPool(ready_after=1)
+    fetcher = MeetAskTraceFetcher(
+        db_pool=FakeDBPool(), async_db_pool=async_pool, base_delay=0.01
+    )
+
+    row = asyncio.run(fetcher.aget("5"))
+    assert row["answer"] == "回答5"
+    assert "trace_qa_id" not in row
+    assert async_pool.calls == [("5",), ("5",)]
+
+
+class SlowIdDBPool(FakeDBPool):
+    """指定的 qa_id 日志一直未写入"""
+
+    def __init__(self, slow_ids):
+        super().__init__()
+        self.slow_ids = slow_ids
+
+    def query(self, sql, params=None):
+        rows = super().query(sql, params)
+        for row in rows:
+            if row["qa_id"] in self.slow_ids:
+                row["trace_qa_id"] = None
+        return rows
+
+
+def test_ready_id_not_blocked_by_slow_id():
+    """测试调用方的 qa_id 就绪后立即返回，不等待其它 qa_id 的退避重试"""
+    db_pool = SlowIdDBPool(slow_ids={"2"})
+    fetcher = MeetAskTraceFetcher(db_pool=db_pool, max_retries=2, base_delay=10)
+    fetcher.prefetch(["2"])
+
+    assert fetcher.get("1")["answer"] == "回答1"
+    assert db_pool.calls == [("2", "1")]
+    assert fetcher._pending == {"2": 1}
+
+    fetcher.base_delay = 0
+    assert fetcher.get("2")["answer"] == "回答2"
+    assert db_pool.calls[1:] == [("2",), ("2",)]
+
+
+class FailingDBPool(FakeDBPool):
+    def query(self, sql, params=None):
+        self.calls.append(params)
+        raise RuntimeError("数据库不可用")
+
+
+def test_query_error_raised_for_prefetched():
+    """测试查询失败时同一批的 qa_id 都得到异常，而不是返回未找到"""
+    db_pool = FailingDBPool()
+    fetcher = MeetAskTraceFetcher(db_pool=db_pool)
+    fetcher.prefetch(["1"])
+
+    with pytest.raises(RuntimeError):
+        fetcher.get("2")
+    with pytest.raises(RuntimeError):
+        fetcher.get("1")
+    assert db_pool.calls == [("1", "2")]
+    assert not fetcher._errors
+
+
+def test_unclaimed_prefetch_evicted():
+    """测试预取后未被取走的记录按预取顺序淘汰"""
+    fetcher = MeetAskTraceFetcher(db_pool=FakeDBPool(), max_cached_rows=2)
+    fetcher.prefetch(["1", "2", "3"])
+
+    assert fetcher.get("4")["answer"] == "回答4"
+    assert list(fetcher._rows) == ["2", "3"]
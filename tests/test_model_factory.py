@@ -0,0 +1,136 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import core.model.adshub_pre_model  # noqa: F401  注册模型
+from core.model.factory import MODEL_BACKENDS, ModelFactory, factory
+
+
+def test_create_model_decodes_template_json_fields():
+    """测试模板中为列表/字典的字段传入JSON字符串时被解析，其余字段原样保留"""
+    adgroups = [{"adGroupId": "g1"}]
+    campaign = factory.create_model(
+        "adshubcampaign",
+        campaignId="c1",
+        campaignName="[不是JSON",
+        adGroupList=json.dumps(adgroups),
+        extra_field="x",
+    )
+
+    assert campaign.adGroupList == adgroups
+    assert campaign.campaignName == "[不是JSON"
+    assert campaign.extra_field == "x"
+
+
+def test_create_model_keeps_invalid_json():
+    """测试无法解析的JSON字符串保留原值"""
+    campaign = factory.create_model("adshubcampaign", adGroupList="not json")
+    assert campaign.adGroupList == "not json"
+
+
+def test_create_many():
+    """测试批量创建与逐个创建结果一致，且不修改传入的记录"""
+    records = [
+        {"adGroupId": f"g{i}", "countries": json.dumps(["US"])} for i in range(3)
+    ]
+
+    adgroups = factory.create_many("adshubadgroup", records)
+
+    assert [a.adGroupId for a in adgroups] == ["g0", "g1", "g2"]
+    assert adgroups[0].countries == ["US"]
+    assert records[0]["countries"] == '["US"]'
+    assert (
+        adgroups[1].to_dict()
+        == factory.create_model("adshubadgroup", **records[1]).to_dict()
+    )
+    assert factory.create_many("unknown", records) == []
+
+
+def test_slots_backend_matches_pydantic():
+    """测试slots后端与pydantic后端的属性访问和to_dict结果一致"""
+    template = factory.get_template("adshubcampaign")
+    record = dict(template, extra_field="x")
+    pydantic_model = MODEL_BACKENDS["pydantic"]("adshubcampaign", template)
+    slots_model = MODEL_BACKENDS["slots"]("adshubcampaign", template)
+
+    expected = pydantic_model.model_construct(**record)
+    actual = slots_model.model_construct(**record)
+
+    assert actual.to_dict() == expected.to_dict() == record
+    assert actual.campaignId == expected.campaignId
+    assert actual.extra_field == "x"
+    assert not hasattr(actual, "__dict__")
+    with pytest.raises(AttributeError):
+        actual.missing_field
+
+
+def test_slots_backend_defaults_missing_fields():
+    """测试slots后端未传入的模板字段为None，不能作为属性名的字段按额外字段保存"""
+    record_class = MODEL_BACKENDS["slots"]("demo", {"a": 1, "class": 2, "b-c": 3})
+
+    record = record_class(**{"class": "x", "b-c": "y"})
+
+    assert record.a is None
+    assert record.to_dict() == {"a": None, "class": "x", "b-c": "y"}
+    assert record == record_class(**{"class": "x", "b-c": "y"})
+
+
+@pytest.fixture
+def isolated_factory(tmp_path, monkeypatch):
+    """使用临时模板目录和缓存文件的工厂状态，测试结束后还原"""
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "demo.json").write_text(json.dumps({"a": 1, "items": []}))
+    for attr, value in {
+        "_models": {},
+        "_converters": {},
+        "_registrations": {},
+        "_templates": {},
+        "_template_state": {},
+        "_templates_loaded": False,
+        "_reload_listeners": [],
+        "template_dir": template_dir,
+        "registry_cache": tmp_path / "registry.json",
+    }.items():
+        monkeypatch.setattr(ModelFactory, attr, value)
+    return template_dir
+
+
+def _reset_templates():
+    ModelFactory._templates = {}
+    ModelFactory._template_state = {}
+    ModelFactory._templates_loaded = False
+
+
+def test_registry_cache_skips_unchanged_templates(isolated_factory, monkeypatch):
+    """测试模板未变化时从注册表缓存加载，不再读取模板文件"""
+    assert factory.get_template("demo") == {"a": 1, "items": []}
+    assert ModelFactory.registry_cache.exists()
+
+    _reset_templates()
+    monkeypatch.setattr(Path, "read_bytes", lambda self: pytest.fail("读取了模板"))
+    assert factory.get_template("demo") == {"a": 1, "items": []}
+
+
+def test_reload_recompiles_changed_templates(isolated_factory):
+    """测试重新加载只重新编译有变化的模板，并通知回调"""
+
+    @ModelFactory.register("demo")
+    class Demo:
+        pass
+
+    notified = []
+    ModelFactory.add_reload_listener(notified.append)
+    assert ModelFactory.reload() == []
+
+    (isolated_factory / "demo.json").write_text(json.dumps({"a": 1, "b": {}}))
+    assert ModelFactory.reload() == ["demo"]
+    assert notified == [["demo"]]
+    model = factory.create_model("demo", b='{"x": 1}')
+    assert model.b == {"x": 1}
+    assert ModelFactory._models["demo"] is not Demo
+
+    (isolated_factory / "demo.json").unlink()
+    assert ModelFactory.reload() == ["demo"]
+    assert factory.get_template("demo") == {}
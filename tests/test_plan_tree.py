@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+from core.model.factory import factory
+from core.model.plan_tree import PlanTree
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[1] / "core" / "template" / "model"
+
+
+def _plan_detail():
+    """两个渠道的广告系列，分别包含2个和1个广告组，第二个广告系列的广告组为JSON字符串"""
+    plan_detail = json.loads((TEMPLATE_DIR / "adshubad.json").read_text("utf-8"))
+    campaign = plan_detail["campaignList"][0]
+    adgroup = campaign["adGroupList"][0]
+    plan_detail["campaignList"] = [
+        {
+            **campaign,
+            "campaignId": "c1",
+            "channel": "FACEBOOK",
+            "adGroupList": [
+                {**adgroup, "adGroupId": "g1"},
+                {**adgroup, "adGroupId": "g2"},
+            ],
+        },
+        {
+            **campaign,
+            "campaignId": "c2",
+            "channel": "GOOGLE",
+            "adGroupList": json.dumps([{**adgroup, "adGroupId": "g3"}]),
+        },
+        {**campaign, "campaignId": "c3", "adGroupList": []},
+    ]
+    return plan_detail
+
+
+def test_lazy_materialization(monkeypatch):
+    """测试子节点在首次访问时才创建，同一列表的子节点模型批量创建"""
+    batches = []
+    create_many = factory.create_many
+    monkeypatch.setattr(
+        factory,
+        "create_many",
+        lambda name, records: batches.append(name) or create_many(name, records),
+    )
+    tree = PlanTree(_plan_detail())
+    assert tree.root._model is None
+
+    campaigns = tree.campaigns
+    assert batches == ["adshubcampaign"]
+    assert campaigns[0].fields()["campaignId"] == "c1"
+    assert [c._children for c in campaigns] == [{}, {}, {}]
+    assert [g.model.adGroupId for g in campaigns[1].children()] == ["g3"]
+    assert batches == ["adshubcampaign", "adshubadgroup"]
+
+
+def test_iter_leaf_rows():
+    """测试每个广告组一行，包含公共字段、请求字段和各层带前缀的字段"""
+    tree = PlanTree(_plan_detail(), request_fields={"budgetAmount": 100})
+
+    rows = list(tree.iter_leaf_rows(base={"question": "q"}))
+
+    assert [(r["campaign_campaignId"], r["adgroup_adGroupId"]) for r in rows] == [
+        ("c1", "g1"),
+        ("c1", "g2"),
+        ("c2", "g3"),
+    ]
+    assert list(rows[0])[:3] == [
+        "question",
+        "request_budgetAmount",
+        "campaign_budgetAmount",
+    ]
+    assert "campaign_adGroupList" not in rows[0]
+    assert rows[2]["campaign_channel"] == "GOOGLE"
+    rows[0]["question"] = "changed"
+    assert rows[1]["question"] == "q"
+
+
+def test_fields_exclude_extra():
+    """测试各层字段只包含模板字段，模板之外的字段不输出"""
+    plan_detail = _plan_detail()
+    plan_detail["campaignList"][0]["unknownField"] = "x"
+    tree = PlanTree(plan_detail)
+
+    campaign = tree.campaigns[0]
+    assert campaign.model.unknownField == "x"
+    assert "unknownField" not in campaign.fields()
+    assert all("campaign_unknownField" not in row for row in tree.iter_leaf_rows())
+
+
+def test_request_row():
+    """测试请求字段按 adshubrequest 模型解析，只输出实际返回的字段"""
+    tree = PlanTree({}, request_fields={"budgetAmount": 100, "kpi": '["CPA"]'})
+
+    assert tree.request.budgetAmount == 100
+    assert tree.request_row() == {"request_budgetAmount": 100, "request_kpi": ["CPA"]}
+    assert list(tree.iter_leaf_rows()) == []
@@ -0,0 +1,65 @@
+from core.common.prompt_packer import ClaimCheckItem, ClaimPacker, parse_labels
+
+
+def _count_tokens(text):
+    """测试用的简单token计数：按字符数计"""
+    return len(text)
+
+
+def test_pack_shared_reference():
+    """测试共享上下文的claim被合并到同一个prompt"""
+    items = [
+        ClaimCheckItem("问题", "上下文A", [("a", "是", "b"), ("c", "是", "d")]),
+        ClaimCheckItem("问题", "上下文A", ["第三条"]),
+        ClaimCheckItem("问题", "上下文B", ["第四条"]),
+    ]
+    packer = ClaimPacker(_count_tokens, max_prompt_tokens=100000)
+    packed = packer.pack(items)
+
+    assert len(packed) == 2
+    assert packed[0].members == [(0, 0), (0, 1), (1, 0)]
+    assert packed[0].prompt.count("上下文A") == 1
+
+    responses = ["1. Entailment\n2. Contradiction\n3. Neutral", "Entailment"]
+    labels = packer.unpack(items, packed, responses)
+    assert labels == [["Entailment", "Contradiction"], ["Neutral"], ["Entailment"]]
+
+
+def test_pack_respects_budget():
+    """测试达到token预算或claim上限时拆分prompt"""
+    items = [ClaimCheckItem("问题", "上下文", [f"claim{i}" for i in range(5)])]
+
+    packer = ClaimPacker(_count_tokens, max_claims_per_prompt=2)
+    assert [len(p.members) for p in packer.pack(items)] == [2, 2, 1]
+
+    base = _count_tokens(packer._render("问题", "上下文", []))
+    packer = ClaimPacker(_count_tokens, max_prompt_tokens=base + 11)
+    assert [len(p.members) for p in packer.pack(items)] == [1, 1, 1, 1, 1]
+
+
+def test_parse_labels():
+    """测试标签解析的编号回填，缺失的标签为None"""
+    assert parse_labels("2. neutral\n1. Entailment", 3) == [
+        "Entailment",
+        "Neutral",
+        None,
+    ]
+    assert parse_labels("Contradiction\nEntailment", 2) == [
+        "Contradiction",
+        "Entailment",
+    ]
+    assert parse_labels(None, 1) == [None]
+
+
+def test_unpack_keeps_failed_claims_missing():
+    """测试调用失败或缺少编号的claim标签为None，而不是Neutral"""
+    items = [
+        ClaimCheckItem("问题", "上下文A", ["a", "b"]),
+        ClaimCheckItem("问题", "上下文B", ["c"]),
+    ]
+    packer = ClaimPacker(_count_tokens, max_prompt_tokens=100000)
+    packed = packer.pack(items)
+
+    labels = packer.unpack(items, packed, ["1. Entailment", None])
+
+    assert labels == [["Entailment", None], [None]]
@@ -0,0 +1,49 @@
+import pytest
+from core.common.rag_metrics import compute_rag_metrics, select_for_llm_check
+
+
+@pytest.fixture
+def sample_records():
+    return [
+        {
+            "query": "什么是CTR",
+            "response": "CTR是点击率",
+            "gt_answer": "CTR是点击率",
+            "retrieved_context": [
+                {"doc_id": "000", "text": "CTR是点击率，衡量广告吸引力"},
+                {"doc_id": "000", "text": "CTR是点击率，衡量广告吸引力"},
+            ],
+        },
+        {
+            "query": "什么是CPM",
+            "response": "不知道",
+            "gt_answer": "CPM是千次展示费用",
+            "retrieved_context": '[{"id": "001", "text": "天气不错"}]',
+        },
+        {"query": "空数据", "response": None, "gt_answer": None},
+    ]
+
+
+def test_compute_rag_metrics(sample_records):
+    """测试批量低成本指标计算"""
+    metrics = compute_rag_metrics(sample_records)
+
+    assert len(metrics) == 3
+    assert metrics.loc[0, "lexical_overlap"] == pytest.approx(1.0)
+    assert metrics.loc[0, "ngram_similarity"] == pytest.approx(1.0)
+    assert metrics.loc[0, "context_hit_rate"] == pytest.approx(1.0)
+    assert metrics.loc[0, "duplicate_chunk_ratio"] == pytest.approx(0.5)
+
+    assert metrics.loc[1, "lexical_overlap"] == pytest.approx(0.0)
+    assert metrics.loc[1, "context_hit_rate"] == pytest.approx(0.0)
+    assert metrics.loc[1, "duplicate_chunk_ratio"] == pytest.approx(0.0)
+
+    assert metrics.loc[2].sum() == pytest.approx(0.0)
+
+
+def test_select_for_llm_check(sample_records):
+    """测试只将低分或存疑的结果送入LLM评估"""
+    metrics = compute_rag_metrics(sample_records)
+    needs_check = select_for_llm_check(metrics)
+
+    assert needs_check.tolist() == [False, True, True]
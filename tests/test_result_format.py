@@ -0,0 +1,86 @@
+import json
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from core.common.excel_to_json import excel_to_rag_json
+from core.common.method import export_result
+from core.common.result_format import (
+    read_results,
+    read_results_table,
+    results_to_excel,
+    rows_to_table,
+)
+
+
+def test_rows_to_table_keeps_nested_types():
+    """测试嵌套字段保留为 struct/list，类型冲突的列回退为JSON字符串"""
+    table = rows_to_table(
+        [
+            {"id": 1, "source": [{"doc": "a"}], "meta": {"cost": 1.5}, "mixed": "x"},
+            {"id": 2, "source": [], "meta": {"cost": 2.0}, "mixed": {"k": 1}},
+        ]
+    )
+
+    assert str(table.schema.field("source").type) == "list<item: struct<doc: string>>"
+    assert str(table.schema.field("meta").type) == "struct<cost: double>"
+    assert table.column("mixed").to_pylist() == ["x", '{"k": 1}']
+
+
+def test_export_parquet_incremental_and_read(tmp_path):
+    """测试增量导出为分片，读取时对齐各分片的列"""
+    path = tmp_path / "test_results_gw0.parquet"
+    export_result([{"query": "q1", "cost": 1}], path)
+    export_result([{"query": "q2", "cost": 2.5, "all_source": [{"id": "d"}]}], path)
+
+    assert len(list(path.glob("part-*.parquet"))) == 2
+    table = read_results_table(path)
+    assert table.column_names == ["query", "cost", "all_source"]
+    assert table.column("cost").to_pylist() == [1.0, 2.5]
+    assert table.column("all_source").to_pylist() == [None, [{"id": "d"}]]
+
+    df = read_results(path)
+    assert isinstance(df["cost"].dtype, pd.ArrowDtype)
+
+
+def test_read_parts_with_conflicting_types(tmp_path):
+    """测试同一列在不同分片中类型冲突时按JSON字符串合并"""
+    path = tmp_path / "test_results.parquet"
+    export_result([{"a": 1, "meta": {"x": 1}, "n": 1}], path)
+    export_result([{"a": "x", "meta": [1, "y"], "n": 2.5}], path)
+
+    table = read_results_table(path)
+
+    assert table.column("a").to_pylist() == ["1", "x"]
+    assert table.column("meta").to_pylist() == ['{"x": 1}', '[1, "y"]']
+    assert table.column("n").to_pylist() == [1.0, 2.5]
+
+    excel_path = results_to_excel(path, tmp_path / "results.xlsx")
+    assert pd.read_excel(excel_path)["a"].astype(str).tolist() == ["1", "x"]
+
+
+def test_results_to_excel_and_rag_json(tmp_path):
+    """测试按需转换Excel，以及RAG评估直接读取Parquet结果"""
+    path = tmp_path / "test_results.parquet"
+    context = [{"doc_id": "1", "text": "参考资料"}]
+    export_result(
+        [
+            {
+                "query": "问题",
+                "answer": "回答",
+                "gt_answer": "标准",
+                "all_source": context,
+            }
+        ],
+        path,
+    )
+
+    excel_path = results_to_excel(path, tmp_path / "results.xlsx")
+    df = pd.read_excel(excel_path)
+    assert json.loads(df.loc[0, "all_source"]) == context
+
+    rag_json = json.loads(excel_to_rag_json(str(path)))
+    assert rag_json["results"][0]["retrieved_context"] == context
+    assert rag_json["results"][0]["query"] == "问题"
@@ -0,0 +1,84 @@
+import asyncio
+import re
+
+from aiohttp.test_utils import TestClient, TestServer
+from core.model.conversation_info import ConversationInfoLookup
+from core.model.meetask_model import MeetAskTraceFetcher
+from core.utils.sqlite_stub import SQLiteDBPool
+from scripts.stub_server import StubConfig, create_app
+
+FAST = StubConfig(token_rate=0, ttft=0, answer_tokens=3, plan_delay=0.05, write_lag=0)
+
+
+async def _run(db_path, requests_func, config=FAST):
+    client = TestClient(TestServer(create_app(config, db_path)))
+    await client.start_server()
+    try:
+        result = await requests_func(client)
+        await asyncio.sleep(0.05)  # 等待延迟写入完成
+        return result
+    finally:
+        await client.close()
+
+
+def test_meetask_stream_writes_trace(tmp_path):
+    """测试MeetAsk桩服务的流式回答和日志写入可被批量查询器读取"""
+    db_path = tmp_path / "stub.db"
+
+    async def ask(client):
+        resp = await client.post("/meetask/stream/askQuestion", json={"query": "预算"})
+        return await resp.text()
+
+    text = asyncio.run(_run(db_path, ask))
+    qa_id = re.findall(r'"qaId":"(\w+)"', text.split("\n\n")[-2])[0]
+
+    row = MeetAskTraceFetcher(db_pool=SQLiteDBPool(db_path)).get(qa_id)
+    assert row["answer"] == "词0词1词2"
+    assert "doc1" in row["source"]
+    assert row["answer_type"] == 1
+    assert row["ask_time"] <= row["answer_first_char_time"] <= row["answer_time"]
+    assert (row["answer_time"] - row["ask_time"]).total_seconds() >= 0
+
+
+def test_meetask_follow_up_rate(tmp_path):
+    """测试按追问概率写入 answer_type=3，回答可触发追问"""
+    db_path = tmp_path / "stub.db"
+    config = StubConfig(
+        token_rate=0, ttft=0, answer_tokens=1, write_lag=0, follow_up_rate=1.0
+    )
+
+    async def ask(client):
+        resp = await client.post("/meetask/stream/askQuestion", json={})
+        return await resp.text()
+
+    text = asyncio.run(_run(db_path, ask, config))
+    qa_id = re.findall(r'"qaId":"(\w+)"', text)[0]
+    row = MeetAskTraceFetcher(db_pool=SQLiteDBPool(db_path)).get(qa_id)
+    assert row["answer_type"] == 3
+
+
+def test_adshub_plan_and_conversation_info(tmp_path):
+    """测试AdsHub桩服务的会话信息写入和方案状态流转"""
+    db_path = tmp_path / "stub.db"
+
+    async def flow(client):
+        resp = await client.post("/dialogue/agentStreamAskQuestion", json={})
+        text = await resp.text()
+        plan = await (
+            await client.post("/stream/sino-ai-adshub/conversation/generate")
+        ).json()
+        plan_id = plan["result"]["planId"]
+        url = f"/stream/sino-ai-adshub/plan/planInfo?planId={plan_id}"
+        first = await (await client.get(url)).json()
+        await asyncio.sleep(0.06)
+        second = await (await client.get(url)).json()
+        return text, first, second
+
+    text, first, second = asyncio.run(_run(db_path, flow))
+    conversation_id = re.findall(r'(?<="conversationId":)"(\w+)"', text)[0]
+    assert first["result"]["planStatus"] == "PENDING"
+    assert second["result"]["planStatus"] == "SUCCESS"
+    assert "campaignList" in second["result"]["planDetail"]
+
+    fields = ConversationInfoLookup(db_pool=SQLiteDBPool(db_path)).get(conversation_id)
+    assert "objective" in fields["basic"]["fields"]
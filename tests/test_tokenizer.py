@@ -0,0 +1,64 @@
+import pytest
+from core.common.tokenizer import (
+    DeferredTokenCount,
+    TokenizerService,
+    count_tokens,
+    resolve_token_counts,
+)
+
+
+class FakeEncoding:
+    """按字符切分的编码，记录实际编码的次数"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return list(text)
+
+    def encode_batch(self, texts, num_threads=8):
+        self.encoded.extend(texts)
+        return [list(text) for text in texts]
+
+
+@pytest.fixture
+def fake_model():
+    model = "fake-model"
+    encoding = FakeEncoding()
+    TokenizerService._encodings[model] = encoding
+    yield model, encoding
+    TokenizerService._encodings.pop(model, None)
+    TokenizerService._instances.pop(model, None)
+
+
+def test_count_memoized(fake_model):
+    """测试相同内容只编码一次"""
+    model, encoding = fake_model
+    assert count_tokens("abc", model) == 3
+    assert count_tokens("abc", model) == 3
+    assert count_tokens("", model) == 0
+    assert encoding.encoded == ["abc"]
+
+
+def test_count_batch_dedup(fake_model):
+    """测试批量计数去重"""
+    model, encoding = fake_model
+    service = TokenizerService.get_instance(model)
+    assert service.count_batch(["ab", "abcd", "ab", ""]) == [2, 4, 2, 0]
+    assert encoding.encoded == ["ab", "abcd"]
+
+
+def test_resolve_deferred(fake_model):
+    """测试延迟计数在导出时一次性批量计算"""
+    model, encoding = fake_model
+    records = [
+        {"doc_token": count_tokens("xyz", model, defer=True), "query": "q"},
+        {"doc_token": count_tokens("xyz", model, defer=True)},
+    ]
+    assert isinstance(records[0]["doc_token"], DeferredTokenCount)
+    assert encoding.encoded == []
+
+    resolve_token_counts(records)
+    assert records == [{"doc_token": 3, "query": "q"}, {"doc_token": 3}]
+    assert encoding.encoded == ["xyz"]